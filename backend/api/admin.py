@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import CareerPath, CareerAssessment, AssessmentResult, CareerResource, UserProfile
+from .models import (
+    CareerPath, CareerAssessment, AssessmentResult, CareerResource, UserProfile, MaterializedRecommendation,
+    FacetCount, SimilarCareer
+)
 
 
 @admin.register(CareerPath)
@@ -23,6 +26,7 @@ class CareerAssessmentAdmin(admin.ModelAdmin):
 @admin.register(AssessmentResult)
 class AssessmentResultAdmin(admin.ModelAdmin):
     list_display = ['assessment', 'user', 'session_id', 'completed_at']
+    list_select_related = ['assessment', 'user']
     list_filter = ['assessment', 'completed_at']
     search_fields = ['user__username', 'session_id']
     readonly_fields = ['completed_at']
@@ -41,6 +45,34 @@ class CareerResourceAdmin(admin.ModelAdmin):
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'experience_level', 'current_career_path', 'created_at']
+    list_select_related = ['user', 'current_career_path']
     list_filter = ['experience_level', 'current_career_path', 'created_at']
     search_fields = ['user__username', 'user__email']
-    ordering = ['-created_at']
\ No newline at end of file
+    ordering = ['-created_at']
+
+
+@admin.register(MaterializedRecommendation)
+class MaterializedRecommendationAdmin(admin.ModelAdmin):
+    list_display = ['career_title', 'rank', 'score', 'user', 'session_id', 'updated_at']
+    list_select_related = ['user']
+    list_filter = ['career_category', 'updated_at']
+    search_fields = ['user__username', 'session_id', 'career_title']
+    readonly_fields = ['updated_at']
+    ordering = ['user', 'session_id', 'rank']
+
+
+@admin.register(FacetCount)
+class FacetCountAdmin(admin.ModelAdmin):
+    list_display = ['model', 'field', 'value', 'count']
+    list_filter = ['model', 'field']
+    readonly_fields = ['model', 'field', 'value', 'count']
+    ordering = ['model', 'field', 'value']
+
+
+@admin.register(SimilarCareer)
+class SimilarCareerAdmin(admin.ModelAdmin):
+    list_display = ['career', 'rank', 'similar', 'score']
+    list_select_related = ['career', 'similar']
+    search_fields = ['career__title']
+    readonly_fields = ['career', 'similar', 'rank', 'score']
+    ordering = ['career', 'rank']
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
-    verbose_name = 'Career Compass API'
\ No newline at end of file
+    verbose_name = 'Career Compass API'
+
+    def ready(self):
+        from . import signals  # noqa: F401
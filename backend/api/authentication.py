@@ -0,0 +1,86 @@
+"""
+Cached authentication.
+
+Resolving the user of an authenticated request normally costs a query for
+the token (``TokenAuthentication``) or for the session and then its user
+(``SessionAuthentication``) before the view runs. ``CachedTokenAuthentication``
+caches the token with its user under a hash of the key, and
+``CachedModelBackend`` caches the user a session points to, both for
+``API_AUTH_CACHE_TIMEOUT`` seconds. With the ``cached_db`` session engine
+the session itself comes from the cache too, so a repeat request resolves
+its user without a query.
+
+Signal handlers (see ``api.signals``) drop the entries when a token is
+deleted or its user is saved or deleted, which covers password changes
+and deactivation. The timeout bounds what the handlers cannot see: writes
+that send no signals, and other processes when the cache is in-process.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+TOKEN_KEY = 'api:auth:token:{}'
+USER_KEY = 'api:auth:user:{}'
+
+
+def auth_cache_timeout():
+    return getattr(settings, 'API_AUTH_CACHE_TIMEOUT', 60)
+
+
+def token_cache_key(key):
+    # Hashed, so raw tokens never appear in a shared cache
+    return TOKEN_KEY.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def forget_token(key):
+    """Revoke a token from the cache; the next request looks it up again"""
+    cache.delete(token_cache_key(key))
+
+
+def forget_user(user_id):
+    """Drop the cached user and tokens of a user"""
+    keys = [USER_KEY.format(user_id)]
+    keys.extend(
+        token_cache_key(key) for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    )
+    cache.delete_many(keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication resolving the token and its user from the cache"""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related('user').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            cache.set(cache_key, token, auth_cache_timeout())
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend caching the user each session resolves to"""
+
+    def get_user(self, user_id):
+        cache_key = USER_KEY.format(user_id)
+        user = cache.get(cache_key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(cache_key, user, auth_cache_timeout())
+        return user if self.user_can_authenticate(user) else None
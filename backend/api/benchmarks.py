@@ -0,0 +1,228 @@
+"""
+Request benchmarks for the REST API.
+
+A scenario is one endpoint with a URL template; ``{career_id}``,
+``{assessment_id}``, ``{session_id}`` and ``{n}`` are filled in per request
+from the generated catalog, so detail requests spread over many rows and,
+unless the run is ``warm``, every URL is new to the response cache.
+
+``run_in_process`` drives the scenarios one request at a time through the
+Django test client and also counts database queries per request.
+``run_wsgi`` starts a threaded WSGI server on a free local port and hits
+it with concurrent HTTP clients. Both report throughput and latency
+percentiles; ``compare`` checks a run against a stored JSON baseline.
+"""
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.test import Client
+
+from .sample_data import SAMPLE_ASSESSMENT, random_answers
+
+
+def submission_body(values):
+    return {
+        'assessment_id': values['assessment_id'],
+        'answers': random_answers(random.Random(values['n']), SAMPLE_ASSESSMENT['questions']),
+        'session_id': values['session_id'],
+    }
+
+
+# name -> (method, URL template, function building the JSON body or None)
+SCENARIOS = {
+    'careers-list': ('GET', '/api/career-paths/?page={page}&_n={n}', None),
+    'careers-filtered': ('GET', '/api/career-paths/?category=technology&growth_outlook=high&_n={n}', None),
+    'careers-keyset': ('GET', '/api/career-paths/?pagination=keyset&page_size=50&_n={n}', None),
+    'careers-search': ('GET', '/api/career-paths/?search=analyst&_n={n}', None),
+    'careers-salary': ('GET', '/api/career-paths/?salary_min=60000&salary_max=70000&_n={n}', None),
+    'careers-by-skills': ('GET', '/api/career-paths/by-skills/?skills=Python,Communication&_n={n}', None),
+    'careers-facets': ('GET', '/api/career-paths/facets/?category=technology&_n={n}', None),
+    'career-detail': ('GET', '/api/career-paths/{career_id}/', None),
+    'resources-list': ('GET', '/api/resources/?page={page}&_n={n}', None),
+    'resources-featured': ('GET', '/api/resources/featured/?_n={n}', None),
+    'assessments-list': ('GET', '/api/assessments/?_n={n}', None),
+    'assessment-submit': ('POST', '/api/assessments/{assessment_id}/submit/', submission_body),
+    'results-by-session': ('GET', '/api/assessment-results/?session_id={session_id}', None),
+    'recommendations': ('GET', '/api/recommendations/?session_id={session_id}', None),
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class ScenarioContext:
+    """Row IDs the URL templates draw from"""
+
+    def __init__(self, career_ids, assessment_id, session_ids, pages=20, warm=False):
+        self.career_ids = career_ids
+        self.assessment_id = assessment_id
+        self.session_ids = session_ids
+        self.pages = pages
+        self.warm = warm
+
+    def values(self, number):
+        return {
+            'n': 0 if self.warm else number,
+            'page': number % self.pages + 1,
+            'career_id': self.career_ids[number % len(self.career_ids)],
+            'assessment_id': self.assessment_id,
+            'session_id': self.session_ids[number % len(self.session_ids)],
+        }
+
+    def request(self, scenario, number):
+        """(method, URL, JSON body or None) of the ``number``-th request of a scenario"""
+        method, url, body = SCENARIOS[scenario]
+        values = self.values(number)
+        return method, url.format(**values), body(values) if body is not None else None
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, elapsed, errors, queries=None):
+    """Result entry of one scenario; latencies in seconds, reported in milliseconds"""
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else None,
+    }
+    for q in PERCENTILES:
+        value = percentile(latencies, q)
+        summary[f'p{q}_ms'] = round(value * 1000, 3) if value is not None else None
+    if queries is not None:
+        summary['queries'] = round(sum(queries) / len(queries), 2) if queries else None
+    return summary
+
+
+def run_in_process(context, scenarios, requests):
+    """Run each scenario sequentially through the test client"""
+    client = Client()
+    results = {}
+    for scenario in scenarios:
+        # Warm up imports, indexes and the connection outside the timings
+        send(client, *context.request(scenario, requests))
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for number in range(requests):
+            method, url, body = context.request(scenario, number)
+            executed = []
+            with connection.execute_wrapper(lambda execute, *args: executed.append(1) or execute(*args)):
+                request_started = time.perf_counter()
+                status_code = send(client, method, url, body)
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(executed))
+            errors += status_code >= 400
+        results[scenario] = summarize(latencies, time.perf_counter() - started, errors, queries)
+    return results
+
+
+def send(client, method, url, body):
+    if method == 'POST':
+        response = client.post(url, json.dumps(body), content_type='application/json')
+    else:
+        response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response.status_code
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchmarkServer:
+    """Threaded WSGI server on a free local port, running in a background thread"""
+
+    def __init__(self):
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+        self.server.set_app(WSGIHandler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+def http_request(base_url, method, url, body):
+    """Status code and latency of one HTTP request"""
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = Request(base_url + url, data=data, method=method, headers={'Content-Type': 'application/json'})
+    started = time.perf_counter()
+    try:
+        with urlopen(request, timeout=60) as response:
+            response.read()
+            status_code = response.status
+    except HTTPError as exc:
+        status_code = exc.code
+    except URLError:
+        status_code = 599
+    return status_code, time.perf_counter() - started
+
+
+def run_wsgi(context, scenarios, requests, concurrency):
+    """Run each scenario with ``concurrency`` clients against a local WSGI server"""
+    results = {}
+    with BenchmarkServer() as server, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for scenario in scenarios:
+            http_request(server.base_url, *context.request(scenario, requests))
+            calls = [context.request(scenario, number) for number in range(requests)]
+            started = time.perf_counter()
+            outcomes = list(pool.map(lambda call: http_request(server.base_url, *call), calls))
+            elapsed = time.perf_counter() - started
+            errors = sum(status_code >= 400 for status_code, _ in outcomes)
+            results[scenario] = summarize([latency for _, latency in outcomes], elapsed, errors)
+    return results
+
+
+def compare(current, baseline, threshold):
+    """
+    Regressions of ``current`` against ``baseline`` (both ``{mode: {scenario: summary}}``).
+
+    Flags a p95 latency or mean query count above, or a throughput below,
+    the baseline by more than ``threshold`` (a fraction). Returns rows of
+    (mode, scenario, metric, baseline value, current value, change, regressed).
+    """
+    rows = []
+    for mode, scenarios in current.items():
+        for scenario, summary in scenarios.items():
+            before = baseline.get(mode, {}).get(scenario)
+            if not before:
+                continue
+            for metric, higher_is_worse in (('p95_ms', True), ('throughput', False), ('queries', True)):
+                old, new = before.get(metric), summary.get(metric)
+                if old is None or new is None:
+                    continue
+                change = (new - old) / old if old else (math.inf if new > old else 0.0)
+                regressed = change > threshold if higher_is_worse else change < -threshold
+                if metric == 'queries':
+                    # Query counts are deterministic: any increase is a regression
+                    regressed = new > old
+                rows.append((mode, scenario, metric, old, new, change, regressed))
+    return rows
@@ -0,0 +1,154 @@
+"""
+Bulk assessment submission.
+
+Schools upload whole classrooms of completed assessments at once. Rows are
+read from a JSON array or an NDJSON stream, validated, scored against the
+career matrix a chunk at a time and written with ``bulk_create``; each chunk
+is committed in its own transaction before its outcome is streamed back, so
+every ID the client receives is durable and memory stays bounded by the
+chunk size.
+"""
+import json
+
+from django.db import transaction
+
+from .matching import matcher
+from .models import AssessmentResult
+from .recommendations import invalidate_sessions
+from .tasks import RECOMMENDATION_LIMIT
+
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+
+BULK_CHUNK_SIZE = 500
+MAX_BULK_ROWS = 10000
+
+
+class BulkInputError(Exception):
+    """The upload could not be read at all"""
+
+
+def is_ndjson(request):
+    return request.content_type.split(';')[0].strip() in NDJSON_CONTENT_TYPES
+
+
+def read_rows(request):
+    """
+    Rows of an upload as (row_number, object) pairs.
+
+    A JSON array is parsed up front so a malformed body can be rejected
+    before streaming starts; an NDJSON body is read lazily line by line and
+    a bad line only fails its own row.
+    """
+    if is_ndjson(request):
+        return iter_ndjson_rows(request.stream)
+
+    rows = request.data
+    if isinstance(rows, dict):
+        rows = rows.get('results')
+    if not isinstance(rows, list):
+        raise BulkInputError('Expected a JSON array of submissions or an NDJSON stream.')
+    return enumerate(rows)
+
+
+def iter_ndjson_rows(stream):
+    if stream is None:
+        return
+    for row_number, line in enumerate(iter(stream.readline, b'')):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as exc:
+            yield row_number, BulkInputError(f'Invalid JSON: {exc}')
+
+
+def row_errors(row, validate_answers):
+    """Validation errors for a single submission, or None"""
+    if isinstance(row, BulkInputError):
+        return {'non_field_errors': [str(row)]}
+    if not isinstance(row, dict):
+        return {'non_field_errors': ['Each submission must be an object.']}
+    errors = {}
+    if 'answers' not in row:
+        errors['answers'] = ['This field is required.']
+    else:
+        answer_errors = validate_answers(row['answers'])
+        if answer_errors:
+            errors['answers'] = answer_errors
+    session_id = row.get('session_id')
+    if session_id is not None and (not isinstance(session_id, str) or len(session_id) > 100):
+        errors['session_id'] = ['Must be a string of at most 100 characters.']
+    return errors or None
+
+
+def process_chunk(assessment, chunk, validate_answers):
+    """Validate, score and persist one chunk; returns the output records in row order"""
+    records = {}
+    valid = []
+    for row_number, row in chunk:
+        errors = row_errors(row, validate_answers)
+        if errors:
+            records[row_number] = {'row': row_number, 'errors': errors}
+        else:
+            valid.append((row_number, row))
+
+    if valid:
+        recommendations = matcher.recommend_many([row['answers'] for _, row in valid], limit=RECOMMENDATION_LIMIT)
+        results = [
+            AssessmentResult(
+                assessment=assessment,
+                answers=row['answers'],
+                session_id=row.get('session_id') or None,
+                recommended_careers=[r['id'] for r in recommended],
+            )
+            for (_, row), recommended in zip(valid, recommendations)
+        ]
+        with transaction.atomic():
+            AssessmentResult.objects.bulk_create(results, batch_size=BULK_CHUNK_SIZE)
+            # bulk_create sends no signals; drop stale materialized recommendations
+            invalidate_sessions(result.session_id for result in results)
+        for (row_number, _), result in zip(valid, results):
+            records[row_number] = {
+                'row': row_number, 'id': result.pk, 'recommended_careers': result.recommended_careers,
+            }
+
+    return [records[row_number] for row_number, _ in chunk]
+
+
+def bulk_submit(assessment, rows, validate_answers, chunk_size=None, max_rows=MAX_BULK_ROWS):
+    """
+    Process an upload, yielding one NDJSON line per row and a final summary.
+
+    ``validate_answers`` returns a list of error messages for an answer
+    payload (empty when valid).
+    """
+    chunk_size = chunk_size or BULK_CHUNK_SIZE
+    created = failed = 0
+    chunk = []
+
+    def flush():
+        nonlocal created, failed
+        for record in process_chunk(assessment, chunk, validate_answers):
+            if 'id' in record:
+                created += 1
+            else:
+                failed += 1
+            yield json.dumps(record) + '\n'
+        chunk.clear()
+
+    truncated = False
+    for row_number, row in rows:
+        if row_number >= max_rows:
+            truncated = True
+            break
+        chunk.append((row_number, row))
+        if len(chunk) >= chunk_size:
+            yield from flush()
+    yield from flush()
+
+    summary = {'created': created, 'failed': failed}
+    if truncated:
+        summary['errors'] = {'non_field_errors': [f'Only the first {max_rows} rows were processed.']}
+    yield json.dumps(summary) + '\n'
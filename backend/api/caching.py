@@ -0,0 +1,195 @@
+"""
+Cache helpers shared by the API.
+
+Generation counters are small integers stored in the Django cache, one per
+model. Signal handlers bump them on every write; anything derived from a
+model's rows (cached responses, in-process ID arrays) records the generation
+it was built from and is considered stale once the counter moves on. With a
+shared cache backend this also invalidates derived data in other processes.
+Per-user counters do the same for data built from one user's own rows.
+
+``CachedResponseMixin`` uses the counters to cache serialized catalog
+responses keyed by the full request URL, and answers conditional requests
+with 304 Not Modified from the ETag/Last-Modified alone. A response read
+from a replica is only stored once the replicas have been synced at the
+current generation, so a lagging replica never fills an entry under a
+generation it has not seen.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .replicas import REPLICA_MODELS, is_pinned, replica_aliases
+
+
+GENERATION_KEY = 'api:generation:{}'
+USER_GENERATION_KEY = 'api:user-generation:{}'
+MODIFIED_KEY = 'api:modified:{}'
+REPLICA_SYNC_KEY = 'api:replica-synced:{}'
+RESPONSE_KEY = 'api:response:{}'
+
+RESPONSE_CACHE_ALIAS = 'api'
+
+
+def model_label(model):
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+def get_generation(model):
+    """Current generation of a model (a model class or 'app.model' label)"""
+    key = GENERATION_KEY.format(model_label(model))
+    value = cache.get(key)
+    if value is None:
+        # Seed from the clock so a counter lost to eviction never repeats an old value
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def get_last_modified(model):
+    """Unix time of the last write to a model seen by the signal handlers"""
+    key = MODIFIED_KEY.format(model_label(model))
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, int(time.time()), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def bump_generation(model):
+    """Move a model to a new generation after one of its rows changed"""
+    label = model_label(model)
+    cache.set(MODIFIED_KEY.format(label), int(time.time()), timeout=None)
+    key = GENERATION_KEY.format(label)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+
+def get_user_generation(user_id):
+    """Current generation of a user's own rows (profile, results, recommendations)"""
+    key = USER_GENERATION_KEY.format(user_id)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        value = cache.get(key)
+    return value
+
+
+def bump_user_generation(user_id):
+    """Mark data derived from a user's own rows as stale"""
+    if user_id is None:
+        return None
+    key = USER_GENERATION_KEY.format(user_id)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+        return cache.get(key)
+
+
+def replica_generations():
+    """{label: generation} of the models read from replicas, taken before copying them"""
+    return {label: get_generation(label) for label in sorted(REPLICA_MODELS)}
+
+
+def mark_replicas_synced(generations):
+    """Record that every replica now holds the rows of ``generations``"""
+    cache.set_many({REPLICA_SYNC_KEY.format(label): value for label, value in generations.items()}, timeout=None)
+
+
+def replicas_synced(models):
+    """Whether the replicas were last synced at the current generation of ``models``"""
+    labels = [label for label in map(model_label, models) if label in REPLICA_MODELS]
+    synced = cache.get_many([REPLICA_SYNC_KEY.format(label) for label in labels])
+    return all(synced.get(REPLICA_SYNC_KEY.format(label)) == get_generation(label) for label in labels)
+
+
+def response_cache():
+    if RESPONSE_CACHE_ALIAS in settings.CACHES:
+        return caches[RESPONSE_CACHE_ALIAS]
+    return cache
+
+
+def cached_response(handler):
+    """Cache a GET viewset action with ``CachedResponseMixin.cached_response``"""
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        return self.cached_response(
+            functools.partial(handler, self), request, *args, **kwargs
+        )
+    return wrapper
+
+
+class CachedResponseMixin:
+    """
+    Versioned response cache for read-only viewset actions.
+
+    ``list`` and ``retrieve`` are cached; other actions opt in with the
+    ``@cached_response`` decorator. Responses are stored before rendering,
+    keyed by the full request URL and the generations of ``cache_models``
+    (the viewset's model by default), so any write to those models makes
+    every cached entry unreachable; stale entries are then evicted by the
+    cache's TTL and LRU culling.
+    """
+    cache_models = None
+
+    def get_cache_models(self):
+        return self.cache_models or [self.queryset.model]
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+
+        models = self.get_cache_models()
+        generations = ':'.join(str(get_generation(model)) for model in models)
+        last_modified = max(get_last_modified(model) for model in models)
+        digest = hashlib.sha1(request.build_absolute_uri().encode('utf-8')).hexdigest()
+        key = RESPONSE_KEY.format(f'{digest}:{generations}')
+        etag = '"{}"'.format(hashlib.sha1(
+            f'{key}:{request.accepted_renderer.format}'.encode('utf-8')
+        ).hexdigest()[:32])
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            self._set_validators(not_modified, etag, last_modified)
+            return not_modified
+
+        store = response_cache()
+        data = store.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            from_replica = replica_aliases() and not is_pinned()
+            if from_replica and not replicas_synced(models):
+                # The replica may predate this generation; serve it but do not store it
+                response['X-Cache'] = 'BYPASS'
+            else:
+                store.set(key, response.data)
+                response['X-Cache'] = 'MISS'
+        self._set_validators(response, etag, last_modified)
+        return response
+
+    @staticmethod
+    def _set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept'])
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,318 @@
+"""
+Bulk catalog import.
+
+Loads career paths or resources from CSV, NDJSON or a JSON array. Records
+are validated against the model's choice fields, then handled a batch at a
+time: one ``title__in`` query fetches the existing rows of the batch, new
+titles are inserted with ``bulk_create``, rows that differ are written with
+one ``bulk_update`` and unchanged rows are skipped. Each batch commits in its
+own transaction, so an interrupted import can resume after the last
+committed batch.
+
+Bulk writes send no model signals, so derived data is refreshed once by
+``refresh_derived_data`` at the end. The stored data (facet counts, the FTS5
+search table, materialized recommendations, similar careers) is rewritten in
+the database; the in-process indexes of the web workers (matcher, skill,
+salary and in-memory search indexes) check the model generation on access,
+so bumping it makes every worker sharing the cache rebuild them on next use.
+"""
+import csv
+import json
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_generation
+from .facets import rebuild_counts
+from .matching import SCORED_FIELDS
+from .models import CareerPath, CareerResource, MaterializedRecommendation
+from .recommendations import sync_careers
+from .search import get_search_backend
+from .similarity import build_similar_careers
+
+
+IMPORT_BATCH_SIZE = 1000
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f', ''}
+
+# Importable fields per model: (name, kind, required)
+IMPORT_FIELDS = {
+    CareerPath: (
+        ('title', 'text', True),
+        ('description', 'text', True),
+        ('category', 'choice', True),
+        ('salary_range_min', 'int', False),
+        ('salary_range_max', 'int', False),
+        ('education_level', 'choice', True),
+        ('required_skills', 'list', False),
+        ('growth_outlook', 'choice', True),
+        ('work_environment', 'choice', True),
+        ('is_active', 'bool', False),
+    ),
+    CareerResource: (
+        ('title', 'text', True),
+        ('content', 'text', True),
+        ('resource_type', 'choice', True),
+        ('category', 'choice', True),
+        ('difficulty_level', 'choice', True),
+        ('estimated_time', 'int', False),
+        ('tags', 'list', False),
+        ('is_featured', 'bool', False),
+        ('is_active', 'bool', False),
+    ),
+}
+
+NATURAL_KEY = 'title'
+
+
+class ImportFormatError(Exception):
+    """The input file could not be read"""
+
+
+def read_records(stream, input_format):
+    """
+    (line_number, dict) pairs of an input file.
+
+    CSV and NDJSON are read lazily line by line; a JSON array is parsed up
+    front. A line that is not valid JSON yields an ImportFormatError in
+    place of its record.
+    """
+    if input_format == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif input_format == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as exc:
+                yield line_number, ImportFormatError(f'Invalid JSON: {exc}')
+    else:
+        try:
+            records = json.load(stream)
+        except ValueError as exc:
+            raise ImportFormatError(f'Invalid JSON: {exc}')
+        if not isinstance(records, list):
+            raise ImportFormatError('Expected a JSON array of records.')
+        yield from enumerate(records, start=1)
+
+
+def choice_lookup(model, name):
+    """Accepted spellings of a choice field (values and labels, any case) -> stored value"""
+    lookup = {}
+    for value, label in model._meta.get_field(name).choices:
+        lookup[str(value).lower()] = value
+        lookup[str(label).lower()] = value
+    return lookup
+
+
+class RecordValidator:
+    """Cleans raw records into model field values"""
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = IMPORT_FIELDS[model]
+        self.choices = {name: choice_lookup(model, name) for name, kind, _ in self.fields if kind == 'choice'}
+        self.max_lengths = {
+            name: model._meta.get_field(name).max_length for name, kind, _ in self.fields if kind == 'text'
+        }
+
+    def clean(self, record):
+        """(values, errors) for one record; values only holds the fields present in it"""
+        if isinstance(record, ImportFormatError):
+            return None, [str(record)]
+        if not isinstance(record, dict):
+            return None, ['Each record must be an object.']
+
+        values, errors = {}, []
+        for name, kind, required in self.fields:
+            raw = record.get(name)
+            if raw is None or (isinstance(raw, str) and not raw.strip() and kind != 'text'):
+                if required:
+                    errors.append(f'{name}: this field is required.')
+                continue
+            try:
+                values[name] = getattr(self, f'clean_{kind}')(name, raw)
+            except ValueError as exc:
+                errors.append(f'{name}: {exc}')
+        if not errors and not values.get(NATURAL_KEY):
+            errors.append(f'{NATURAL_KEY}: this field is required.')
+        return (None, errors) if errors else (values, [])
+
+    def clean_text(self, name, raw):
+        value = str(raw).strip()
+        max_length = self.max_lengths[name]
+        if max_length and len(value) > max_length:
+            raise ValueError(f'longer than {max_length} characters.')
+        return value
+
+    def clean_choice(self, name, raw):
+        value = self.choices[name].get(str(raw).strip().lower())
+        if value is None:
+            raise ValueError(f'"{str(raw)[:50]}" is not a valid choice.')
+        return value
+
+    @staticmethod
+    def clean_int(name, raw):
+        try:
+            return int(str(raw).strip().replace(',', '')) if not isinstance(raw, int) else raw
+        except ValueError:
+            raise ValueError(f'"{str(raw)[:50]}" is not a whole number.')
+
+    @staticmethod
+    def clean_bool(name, raw):
+        if isinstance(raw, bool):
+            return raw
+        value = str(raw).strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        raise ValueError(f'"{str(raw)[:50]}" is not a boolean.')
+
+    @staticmethod
+    def clean_list(name, raw):
+        """JSON arrays, or strings separated by ';' or '|' (CSV cells)"""
+        if isinstance(raw, str):
+            text = raw.strip()
+            if text.startswith('['):
+                raw = json.loads(text)
+            else:
+                separator = ';' if ';' in text else '|'
+                raw = [item for item in (part.strip() for part in text.split(separator)) if item]
+        if not isinstance(raw, list):
+            raise ValueError('expected a list.')
+        return [str(item).strip() for item in raw if str(item).strip()]
+
+
+class ImportStats:
+    """Counters of an import run"""
+
+    def __init__(self):
+        self.read = self.created = self.updated = self.unchanged = self.invalid = 0
+        self.started = time.monotonic()
+        self.updated_ids = set()
+        # Updated careers whose scored fields changed
+        self.rescored_ids = set()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+class CatalogImporter:
+    """Diffs batches of records against existing rows and applies them in bulk"""
+
+    def __init__(self, model, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+        self.model = model
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.validator = RecordValidator(model)
+        self.field_names = [name for name, _, _ in IMPORT_FIELDS[model]]
+
+    def run(self, records, skip=0, on_batch=None, on_error=None):
+        """
+        Import ``records`` ((line, record) pairs), skipping the first ``skip``.
+
+        ``on_batch(stats, records_done)`` is called after every committed
+        batch and ``on_error(line, errors)`` for each invalid record.
+        """
+        stats = ImportStats()
+        batch = []
+        done = 0
+        for line, record in records:
+            done += 1
+            if done <= skip:
+                continue
+            stats.read += 1
+            values, errors = self.validator.clean(record)
+            if errors:
+                stats.invalid += 1
+                if on_error is not None:
+                    on_error(line, errors)
+                continue
+            batch.append(values)
+            if len(batch) >= self.batch_size:
+                self.apply(batch, stats)
+                batch = []
+                if on_batch is not None:
+                    on_batch(stats, done)
+        if batch:
+            self.apply(batch, stats)
+        if on_batch is not None:
+            on_batch(stats, done)
+        return stats
+
+    def apply(self, batch, stats):
+        # Later records win over earlier ones with the same title
+        by_key = {values[NATURAL_KEY]: values for values in batch}
+        existing = {
+            getattr(instance, NATURAL_KEY): instance
+            for instance in self.model.objects.filter(**{f'{NATURAL_KEY}__in': list(by_key)}).only(
+                'pk', *self.field_names
+            )
+        }
+        to_create, to_update, changed_fields, rescored = [], [], set(), set()
+        for key, values in by_key.items():
+            instance = existing.get(key)
+            if instance is None:
+                to_create.append(self.model(**values))
+                continue
+            changed = [name for name, value in values.items() if getattr(instance, name) != value]
+            if not changed:
+                stats.unchanged += 1
+                continue
+            for name in changed:
+                setattr(instance, name, values[name])
+            changed_fields.update(changed)
+            to_update.append(instance)
+            if set(changed) & set(SCORED_FIELDS):
+                rescored.add(instance.pk)
+        stats.unchanged += len(batch) - len(by_key)
+
+        if not self.dry_run:
+            with transaction.atomic():
+                self.model.objects.bulk_create(to_create, batch_size=self.batch_size)
+                if to_update:
+                    # bulk_update skips auto_now
+                    now = timezone.now()
+                    for instance in to_update:
+                        instance.updated_at = now
+                    self.model.objects.bulk_update(
+                        to_update, sorted(changed_fields) + ['updated_at'], batch_size=self.batch_size
+                    )
+            stats.updated_ids.update(instance.pk for instance in to_update)
+            stats.rescored_ids.update(instance.pk for instance in to_update if instance.pk in rescored)
+        stats.created += len(to_create)
+        stats.updated += len(to_update)
+
+
+def refresh_derived_data(model, updated_ids=None, rescored_ids=None):
+    """
+    Bring caches and indexes up to date after bulk writes, which send no signals.
+
+    The generation bump is what reaches other processes: their in-process
+    indexes compare it on access and rebuild from the database.
+
+    ``updated_ids`` are the careers whose rows changed and ``rescored_ids``
+    those among them whose scored fields changed (all of them when None).
+    None for ``updated_ids`` resyncs every career referenced by
+    materialized recommendations.
+    """
+    bump_generation(model)
+    rebuild_counts(model)
+    with transaction.atomic():
+        get_search_backend().rebuild(model)
+    if model is CareerPath:
+        if updated_ids is None:
+            updated_ids = list(MaterializedRecommendation.objects.values_list('career_id', flat=True).distinct())
+        sync_careers(updated_ids, updated_ids if rescored_ids is None else rescored_ids)
+        build_similar_careers()
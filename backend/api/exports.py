@@ -0,0 +1,136 @@
+"""
+Streaming export of assessment results.
+
+Rows are read with ``.iterator(chunk_size=...)`` from a single
+``values_list()`` query (the assessment title comes from a JOIN) and turned
+into output as they arrive, so memory stays bounded by the chunk size
+however many results are exported. The same generators back the
+``assessment-results/export/`` endpoint and the
+``export_assessment_results`` management command.
+
+Formats:
+
+* ``ndjson``: one JSON object per result
+* ``csv``: a header row, then one row per result; ``answers`` and
+  ``recommended_careers`` are JSON-encoded cells
+* ``columns``: one JSON object per chunk mapping each column name to the
+  list of its values, a columnar layout that loads straight into a data frame
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta, timezone
+
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import AssessmentResult
+
+
+EXPORT_FORMATS = ('ndjson', 'csv', 'columns')
+EXPORT_CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'columns': 'application/x-ndjson',
+}
+
+# Output column name -> values_list() lookup
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('assessment_id', 'assessment_id'),
+    ('assessment_title', 'assessment__title'),
+    ('user_id', 'user_id'),
+    ('session_id', 'session_id'),
+    ('answers', 'answers'),
+    ('recommended_careers', 'recommended_careers'),
+    ('recommendation_status', 'recommendation_status'),
+    ('completed_at', 'completed_at'),
+)
+COLUMN_NAMES = tuple(name for name, _ in EXPORT_COLUMNS)
+COMPLETED_AT = COLUMN_NAMES.index('completed_at')
+JSON_COLUMNS = tuple(COLUMN_NAMES.index(name) for name in ('answers', 'recommended_careers'))
+
+
+def export_rows(assessment_id=None, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Result tuples in ``EXPORT_COLUMNS`` order, oldest first, fetched ``chunk_size`` at a time"""
+    queryset = AssessmentResult.objects.all()
+    if assessment_id is not None:
+        queryset = queryset.filter(assessment_id=assessment_id)
+    if since is not None:
+        queryset = queryset.filter(completed_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(completed_at__lt=until)
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    for row in queryset.order_by('id').values_list(*lookups).iterator(chunk_size=chunk_size):
+        row = list(row)
+        row[COMPLETED_AT] = format_datetime(row[COMPLETED_AT])
+        yield row
+
+
+def parse_bound(value, end=False):
+    """
+    A ``since``/``until`` filter value as an aware datetime.
+
+    Dates cover the whole day, so ``until=2025-01-31`` includes results
+    completed on January 31st. Raises ValueError for anything else.
+    """
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError('Enter an ISO 8601 date or datetime.')
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def format_datetime(value):
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(COLUMN_NAMES, row)), ensure_ascii=False) + '\n'
+
+
+class _LineBuffer:
+    """File-like object handing back what csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(COLUMN_NAMES)
+    for row in rows:
+        for index in JSON_COLUMNS:
+            row[index] = json.dumps(row[index], ensure_ascii=False)
+        yield writer.writerow(row)
+
+
+def iter_columns(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    columns = [[] for _ in COLUMN_NAMES]
+    count = 0
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(value)
+        count += 1
+        if count == chunk_size:
+            yield json.dumps(dict(zip(COLUMN_NAMES, columns)), ensure_ascii=False) + '\n'
+            columns = [[] for _ in COLUMN_NAMES]
+            count = 0
+    if count:
+        yield json.dumps(dict(zip(COLUMN_NAMES, columns)), ensure_ascii=False) + '\n'
+
+
+def export_results(export_format='ndjson', chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """Lines of an export in ``export_format``, produced lazily"""
+    rows = export_rows(chunk_size=chunk_size, **filters)
+    if export_format == 'csv':
+        return iter_csv(rows)
+    if export_format == 'columns':
+        return iter_columns(rows, chunk_size)
+    return iter_ndjson(rows)
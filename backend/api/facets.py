@@ -0,0 +1,166 @@
+"""
+Catalog facet counts.
+
+The filter sidebar shows, for every facet field, how many active rows carry
+each choice. Unfiltered counts live in the FacetCount table: signal
+handlers apply +1/-1 deltas as rows are created, edited, deactivated or
+deleted, so the common "load the sidebar" request is a single small read.
+For a filtered list, every facet is counted in one aggregate query with a
+filtered COUNT per (field, choice), which scans the matching rows once.
+
+A row loaded with deferred facet fields has no known state; its stored
+values are read back by primary key around the write instead. Bulk writes
+send no signals; ``rebuild_counts`` recounts a model from scratch after
+them.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Q
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .caching import cached_response
+from .models import CareerPath, CareerResource, FacetCount
+
+
+FACET_FIELDS = {
+    CareerPath: ('category', 'education_level', 'growth_outlook', 'work_environment'),
+    CareerResource: ('category', 'resource_type', 'difficulty_level'),
+}
+
+
+def model_label(model):
+    return model._meta.label_lower
+
+
+def facet_state(instance):
+    """
+    Facet values an instance contributes to the counts (None when inactive).
+
+    Returns False when a facet field was deferred and the state is unknown.
+    """
+    names = ('is_active',) + FACET_FIELDS[type(instance)]
+    if any(name not in instance.__dict__ for name in names):
+        return False
+    if not instance.is_active:
+        return None
+    return tuple(getattr(instance, name) for name in FACET_FIELDS[type(instance)])
+
+
+def stored_state(instance):
+    """Facet state of ``instance`` as stored in its database row, for deferred instances"""
+    model = type(instance)
+    row = model.objects.using(instance._state.db).filter(pk=instance.pk).values(
+        'is_active', *FACET_FIELDS[model]
+    ).first()
+    if row is None or not row['is_active']:
+        return None
+    return tuple(row[name] for name in FACET_FIELDS[model])
+
+
+def apply_change(model, old, new):
+    """Move counts from the ``old`` facet state of a row to its ``new`` one"""
+    if old == new:
+        return
+    label = model_label(model)
+    for position, field in enumerate(FACET_FIELDS[model]):
+        before = old[position] if old else None
+        after = new[position] if new else None
+        if before == after:
+            continue
+        if before is not None:
+            FacetCount.objects.filter(model=label, field=field, value=before, count__gt=0).update(
+                count=F('count') - 1
+            )
+        if after is not None:
+            updated = FacetCount.objects.filter(model=label, field=field, value=after).update(
+                count=F('count') + 1
+            )
+            if not updated:
+                FacetCount.objects.get_or_create(model=label, field=field, value=after, defaults={'count': 1})
+
+
+def aggregate_counts(model, queryset):
+    """{field: {value: count}} and the row total of ``queryset``, in one query"""
+    aggregates = {'total': Count('pk')}
+    keys = {}
+    for field in FACET_FIELDS[model]:
+        for position, (value, _) in enumerate(model._meta.get_field(field).choices):
+            alias = f'{field}__{position}'
+            aggregates[alias] = Count('pk', filter=Q(**{field: value}))
+            keys[alias] = (field, value)
+    row = queryset.order_by().aggregate(**aggregates)
+    counts = {field: {} for field in FACET_FIELDS[model]}
+    for alias, (field, value) in keys.items():
+        counts[field][value] = row[alias]
+    return counts, row['total']
+
+
+def stored_counts(model):
+    """{field: {value: count}} and the row total from the counter table"""
+    counts = {field: {} for field in FACET_FIELDS[model]}
+    for field, value, count in FacetCount.objects.filter(model=model_label(model)).values_list(
+        'field', 'value', 'count'
+    ):
+        if field in counts:
+            counts[field][value] = count
+    # Every active row has exactly one value per facet
+    total = sum(counts[FACET_FIELDS[model][0]].values())
+    return counts, total
+
+
+def rebuild_counts(model):
+    """Recount every facet of ``model`` from its active rows"""
+    counts, _ = aggregate_counts(model, model.objects.filter(is_active=True))
+    label = model_label(model)
+    with transaction.atomic():
+        FacetCount.objects.filter(model=label).delete()
+        FacetCount.objects.bulk_create([
+            FacetCount(model=label, field=field, value=value, count=count)
+            for field, values in counts.items()
+            for value, count in values.items()
+            if count
+        ])
+
+
+def facets_payload(model, counts, total):
+    """Response body listing every choice of every facet, zero counts included"""
+    facets = {}
+    for field in FACET_FIELDS[model]:
+        values = counts.get(field, {})
+        facets[field] = [
+            {'value': value, 'label': str(label), 'count': values.get(value, 0)}
+            for value, label in model._meta.get_field(field).choices
+        ]
+    return {'total': total, 'facets': facets}
+
+
+def facet_values(model, field):
+    """Values of ``field`` carried by at least one active row, in value order"""
+    return list(
+        FacetCount.objects.filter(model=model_label(model), field=field, count__gt=0).values_list('value', flat=True)
+    )
+
+
+class FacetsMixin:
+    """
+    Adds a ``facets`` action to a catalog viewset.
+
+    Without filter or search parameters the counts come from the counter
+    table; otherwise they are aggregated over the filtered queryset.
+    """
+    facet_query_params = ('search',)
+
+    def is_filtered(self, request):
+        names = set(getattr(self, 'filterset_fields', ())) | set(self.facet_query_params)
+        return any(request.query_params.get(name) for name in names)
+
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def facets(self, request):
+        """Get counts per value of every facet field for the current filters"""
+        model = self.queryset.model
+        if self.is_filtered(request):
+            counts, total = aggregate_counts(model, self.filter_queryset(self.get_queryset()))
+        else:
+            counts, total = stored_counts(model)
+        return Response(facets_payload(model, counts, total))
@@ -0,0 +1,198 @@
+"""
+High-throughput list rendering for hot catalog endpoints.
+
+``ModelSerializer`` builds a model instance per row and walks every field's
+``get_attribute``/``to_representation``, and the stdlib JSON encoder then
+walks the result again. For plain column fields none of that is needed:
+``FastListMixin`` reads ``values()`` rows, maps them to output dicts through
+a field map computed once per serializer shape (only datetimes and the like
+keep a converter) and ``FastJSONRenderer`` encodes with orjson when it is
+installed. The output is the same as the serializer's; serializers with
+computed or nested fields fall back to the regular path.
+"""
+import json
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .fieldsets import ordering_columns
+from .metrics import serializer_timer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+# Fields whose to_representation returns column values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.ChoiceField, serializers.JSONField,
+)
+
+
+# Marks DateTimeFields rendered as ISO 8601 in the active timezone
+ISO_DATETIME = object()
+
+_fallback_encoder = JSONEncoder()
+
+
+def is_iso_datetime_field(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    return (type(field) is serializers.DateTimeField and not hasattr(field, 'timezone')
+            and isinstance(output_format, str) and output_format.lower() == ISO_8601 and settings.USE_TZ)
+
+
+def iso_datetime_converter(tz):
+    """What DateTimeField.to_representation returns for aware datetimes, for a fixed timezone"""
+    def to_iso(value):
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return to_iso
+
+
+def dumps(data):
+    """Encode ``data`` as compact UTF-8 JSON, with orjson when available"""
+    if orjson is not None:
+        # Types orjson does not know (Decimal, lazy strings, ...) go through DRF's encoder
+        return orjson.dumps(data, default=_fallback_encoder.default)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson; indented output still uses the stdlib encoder"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class RowEncoder:
+    """Turns ``values()`` rows into the representation a serializer would produce"""
+
+    def __init__(self, columns, field_map):
+        self.columns = columns
+        self.field_map = field_map
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """Encoder for a serializer's readable fields, or None if any is not a plain column"""
+        model = serializer.Meta.model
+        concrete = {field.name: field for field in model._meta.concrete_fields}
+        field_map = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source == '*' or len(field.source_attrs) != 1 or field.source_attrs[0] not in concrete:
+                return None
+            column = field.source_attrs[0]
+            if isinstance(field, serializers.PrimaryKeyRelatedField) or concrete[column].is_relation:
+                return None
+            if isinstance(field, PASSTHROUGH_FIELDS):
+                converter = None
+            elif is_iso_datetime_field(field):
+                converter = ISO_DATETIME
+            else:
+                converter = field.to_representation
+            field_map.append((name, column, converter))
+        columns = tuple(dict.fromkeys(column for _, column, _ in field_map))
+        return cls(columns, tuple(field_map))
+
+    def encode(self, rows, search_hits=None):
+        field_map = self.field_map
+        if any(converter is ISO_DATETIME for _, _, converter in field_map):
+            # Resolve the active timezone once per response rather than once per value
+            to_iso = iso_datetime_converter(timezone.get_current_timezone())
+            field_map = [
+                (name, column, to_iso if converter is ISO_DATETIME else converter)
+                for name, column, converter in field_map
+            ]
+        if search_hits:
+            search_hits.load([row['id'] for row in rows])
+        encoded = []
+        for row in rows:
+            data = {
+                name: row[column] if converter is None or row[column] is None else converter(row[column])
+                for name, column, converter in field_map
+            }
+            if search_hits:
+                hit = search_hits.get(row['id'])
+                if hit is not None:
+                    data['search_score'] = hit.score
+                    data['search_snippet'] = hit.snippet
+            encoded.append(data)
+        return encoded
+
+
+_encoders = {}
+_encoders_lock = threading.Lock()
+
+
+def get_row_encoder(serializer):
+    """Cached RowEncoder for a serializer class and its selected field names"""
+    key = (type(serializer), tuple(serializer.fields))
+    encoder = _encoders.get(key, False)
+    if encoder is False:
+        encoder = RowEncoder.for_serializer(serializer)
+        with _encoders_lock:
+            _encoders[key] = encoder
+    return encoder
+
+
+class FastListMixin:
+    """
+    Viewset mixin serving ``list`` from ``values()`` rows.
+
+    Enabled by the ``API_FAST_LIST`` setting. Responses are encoded with
+    ``FastJSONRenderer``.
+    """
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get_row_encoder(self):
+        if not getattr(settings, 'API_FAST_LIST', True):
+            return None
+        return get_row_encoder(self.get_field_serializer())
+
+    def row_columns(self, encoder):
+        # The keyset paginator reads the sort key from each row
+        return dict.fromkeys(('id',) + encoder.columns + tuple(sorted(ordering_columns(self))))
+
+    def list(self, request, *args, **kwargs):
+        encoder = self.get_row_encoder()
+        if encoder is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.filter_queryset(self.get_queryset()).values(*self.row_columns(encoder))
+        page = self.paginate_queryset(rows)
+        rows = page if page is not None else list(rows)
+        with serializer_timer():
+            data = encoder.encode(rows, getattr(request, 'search_hits', None))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def represent(self, queryset, ids=None):
+        """Representation of ``queryset`` rows, in the order of ``ids`` when given"""
+        encoder = self.get_row_encoder()
+        if encoder is None:
+            if ids is None:
+                return self.get_serializer(queryset, many=True).data
+            instances = queryset.in_bulk(ids)
+            return self.get_serializer([instances[pk] for pk in ids if pk in instances], many=True).data
+
+        rows = queryset.values(*self.row_columns(encoder))
+        if ids is not None:
+            by_id = {row['id']: row for row in rows.filter(pk__in=ids)}
+            rows = [by_id[pk] for pk in ids if pk in by_id]
+        rows = list(rows)
+        with serializer_timer():
+            return encoder.encode(rows)
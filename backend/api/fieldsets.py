@@ -0,0 +1,125 @@
+"""
+Sparse fieldsets.
+
+Clients pick the fields they need with ``?fields=id,title,tags`` or drop
+some with ``?omit=content``. Catalog list views also use a compact list
+serializer without the heavy text/JSON columns, which are only returned by
+``retrieve``. The view mixin defers every column the chosen serializer does
+not read (``QuerySet.only()``), so fewer bytes leave the database as well as
+fewer reach the client.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_field_list(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin applying ``?fields=`` / ``?omit=`` to the top-level serializer.
+
+    Nested serializers keep all their fields, and only safe requests are
+    affected. Unknown field names are rejected with a 400.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self.is_top_level():
+            return fields
+
+        requested = parse_field_list(request.query_params.get(FIELDS_PARAM))
+        omitted = parse_field_list(request.query_params.get(OMIT_PARAM))
+        unknown = [name for name in requested + omitted if name not in fields]
+        if unknown:
+            param = FIELDS_PARAM if any(name in requested for name in unknown) else OMIT_PARAM
+            raise serializers.ValidationError({param: [f"Unknown field(s): {', '.join(unknown)}"]})
+
+        if requested:
+            fields = {name: field for name, field in fields.items() if name in requested}
+        for name in omitted:
+            fields.pop(name, None)
+        return fields
+
+    def is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def model_columns(self):
+        """Concrete model fields read by the selected fields, or None when it cannot tell"""
+        model = self.Meta.model
+        concrete = {field.name: field for field in model._meta.concrete_fields}
+        columns = {model._meta.pk.name}
+        for field in self.fields.values():
+            if field.source == '*':
+                return None
+            name = field.source_attrs[0]
+            if name in concrete:
+                columns.add(name)
+            elif name.endswith('_id') and name[:-3] in concrete:
+                columns.add(name[:-3])
+        return columns
+
+
+class SparseFieldsetViewMixin:
+    """
+    Viewset mixin that serves lean list representations.
+
+    ``list`` uses ``list_serializer_class`` when set, and the read actions in
+    ``sparse_actions`` load only the columns the selected serializer fields
+    need, plus the columns the view filters and paginates on. Other actions
+    render with their own serializers and keep every column, so their rows
+    never lazy-load deferred fields one query at a time.
+    """
+    list_serializer_class = None
+    sparse_actions = ('list', 'retrieve')
+
+    def get_serializer_class(self):
+        if self.list_serializer_class is not None and self.action == 'list':
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_field_serializer(self):
+        """Unbound serializer with the fields selected for this request, built once per request"""
+        serializer = getattr(self, '_field_serializer', None)
+        if serializer is None or type(serializer) is not self.get_serializer_class():
+            serializer = self._field_serializer = self.get_serializer()
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return queryset
+        if self.action not in self.sparse_actions:
+            return queryset
+        serializer = self.get_field_serializer()
+        if not isinstance(serializer, SparseFieldsMixin):
+            return queryset
+        columns = serializer.model_columns()
+        if columns is None:
+            return queryset
+
+        columns |= ordering_columns(self)
+        if columns >= {field.name for field in queryset.model._meta.concrete_fields}:
+            return queryset
+        return queryset.only(*sorted(columns))
+
+
+def ordering_columns(view):
+    """Model columns a view may sort or seek on"""
+    concrete = {field.name for field in view.queryset.model._meta.concrete_fields}
+    columns = set()
+    for attr in ('keyset_ordering', 'ordering_fields', 'ordering'):
+        names = getattr(view, attr, None) or []
+        if isinstance(names, str):
+            continue
+        columns.update(name.lstrip('-') for name in names if name.lstrip('-') in concrete)
+    return columns
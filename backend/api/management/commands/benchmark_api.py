@@ -0,0 +1,201 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.settings import api_settings
+
+from api.benchmarks import SCENARIOS, ScenarioContext, compare, run_in_process, run_wsgi
+from api.models import AssessmentResult, CareerAssessment, CareerPath
+from api.sample_data import SAMPLE_ASSESSMENT, generate_catalog
+
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+MODES = ('inprocess', 'wsgi')
+
+# Benchmark runs must not touch shared caches
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-default'},
+    'api': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-api'},
+}
+
+
+def parse_scale(value):
+    if value in SCALES:
+        return SCALES[value]
+    try:
+        return int(value)
+    except ValueError:
+        raise CommandError(f"--scale must be one of {', '.join(SCALES)} or a number of rows.")
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the main API endpoints on a separate database filled with synthetic data, '
+        'in-process and through a local WSGI server, and compare against a JSON baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', default='1k',
+            help='Careers, resources and assessment results generated: 1k, 10k, 100k or a number'
+        )
+        parser.add_argument('--mode', choices=MODES + ('both',), default='both', help='How requests are sent')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients in wsgi mode')
+        parser.add_argument(
+            '--scenarios', help=f"Comma-separated scenarios to run (default: all of {', '.join(SCENARIOS)})"
+        )
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Repeat the same URLs so list endpoints are served from the response cache'
+        )
+        parser.add_argument(
+            '--db-file',
+            help='SQLite file for the benchmark database (default: a temporary file, removed afterwards)'
+        )
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Keep the benchmark database and reuse its data on the next run (needs --db-file on SQLite)'
+        )
+        parser.add_argument('--output', '-o', help='Write the results to this JSON file (a new baseline)')
+        parser.add_argument('--compare', help='Baseline JSON file to compare the results against')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Relative change in p95 latency or throughput reported as a regression'
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true', help='Exit with an error when a regression is found'
+        )
+
+    def handle(self, *args, **options):
+        scale = parse_scale(options['scale'])
+        scenarios = options['scenarios'].split(',') if options['scenarios'] else list(SCENARIOS)
+        unknown = [name for name in scenarios if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(unknown)}")
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1.')
+        baseline = self.load_baseline(options['compare']) if options['compare'] else None
+        modes = MODES if options['mode'] == 'both' else (options['mode'],)
+
+        temporary = None
+        if connection.vendor == 'sqlite':
+            if options['keepdb'] and not options['db_file']:
+                raise CommandError('--keepdb needs --db-file on SQLite.')
+            db_file = options['db_file']
+            if db_file is None:
+                temporary = tempfile.TemporaryDirectory()
+                db_file = os.path.join(temporary.name, 'benchmark.sqlite3')
+            # An on-disk file, so server threads share the data and I/O is part of the timings
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = db_file
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'])
+        try:
+            allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1']
+            with override_settings(CACHES=BENCHMARK_CACHES, ALLOWED_HOSTS=allowed_hosts):
+                context = self.prepare(scale, options)
+                results = {}
+                for mode in modes:
+                    self.stdout.write(self.style.MIGRATE_HEADING(
+                        f"{mode} ({options['requests']} requests per scenario)"
+                    ))
+                    if mode == 'inprocess':
+                        results[mode] = run_in_process(context, scenarios, options['requests'])
+                    else:
+                        results[mode] = run_wsgi(context, scenarios, options['requests'], options['concurrency'])
+                    self.print_results(results[mode])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            if temporary is not None:
+                temporary.cleanup()
+
+        report = {
+            'created': timezone.now().isoformat(),
+            'commit': current_commit(),
+            'scale': scale,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'warm': options['warm'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            self.report_comparison(results, baseline, scale, options)
+
+    def prepare(self, scale, options):
+        """Generate the synthetic catalog unless a kept database already has it"""
+        if not (options['keepdb'] and CareerPath.objects.count() >= scale):
+            self.stdout.write(f'Generating {scale} careers, resources and assessment results...')
+            generate_catalog(careers=scale, resources=scale, results=scale)
+        assessment = CareerAssessment.objects.get(title=SAMPLE_ASSESSMENT['title'])
+        career_ids = list(CareerPath.objects.filter(is_active=True).values_list('id', flat=True)[:1000])
+        session_ids = list(
+            AssessmentResult.objects.exclude(session_id=None).order_by('session_id')
+            .values_list('session_id', flat=True).distinct()[:1000]
+        )
+        # List requests cycle through the first pages that exist for both catalogs
+        pages = max(min(scale // (api_settings.PAGE_SIZE or 20), 20), 1)
+        return ScenarioContext(
+            career_ids, assessment.id, session_ids or ['none'], pages=pages, warm=options['warm']
+        )
+
+    @staticmethod
+    def load_baseline(path):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read baseline {path}: {exc}')
+
+    def print_results(self, results):
+        width = max(len(name) for name in results)
+        self.stdout.write(
+            f"{'scenario':<{width}}  {'req/s':>9}  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  "
+            f"{'queries':>7}  {'errors':>6}"
+        )
+        for name, summary in results.items():
+            queries = summary.get('queries')
+            self.stdout.write(
+                f"{name:<{width}}  {summary['throughput']:>9.1f}  {summary['p50_ms']:>8.2f}  "
+                f"{summary['p95_ms']:>8.2f}  {summary['p99_ms']:>8.2f}  "
+                f"{'-' if queries is None else f'{queries:.1f}':>7}  {summary['errors']:>6}"
+            )
+
+    def report_comparison(self, results, baseline, scale, options):
+        if baseline.get('scale') != scale:
+            self.stderr.write(f"Baseline was recorded at scale {baseline.get('scale')}; numbers may not compare.")
+        rows = compare(results, baseline.get('results', {}), options['threshold'])
+        regressions = [row for row in rows if row[-1]]
+        for mode, scenario, metric, old, new, change, regressed in rows:
+            line = f'{mode:<9} {scenario:<20} {metric:<10} {old:>10.2f} -> {new:>10.2f} ({change:+.0%})'
+            self.stdout.write(self.style.ERROR(line) if regressed else line)
+        if regressions:
+            message = f"{len(regressions)} regression(s) against {options['compare']} (commit {baseline.get('commit')})"
+            if options['fail_on_regression']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}"))
@@ -0,0 +1,127 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.fastpath import dumps, get_row_encoder
+from api.models import CareerPath, CareerResource
+from api.serializers import CareerPathSerializer, CareerResourceListSerializer
+from api.views import CareerPathViewSet, CareerResourceViewSet
+
+
+ENDPOINTS = [
+    ('career-paths', CareerPathViewSet, CareerPath, CareerPathSerializer),
+    ('resources', CareerResourceViewSet, CareerResource, CareerResourceListSerializer),
+]
+
+MODES = [('serializers', False), ('fast', True)]
+
+# Bypass the response cache so every request renders
+BENCHMARK_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'},
+    'api': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def fixture_careers(count):
+    categories = ['technology', 'healthcare', 'business', 'education', 'finance']
+    return [
+        CareerPath(
+            title=f'Benchmark Career {number:05d}',
+            description='Plans, builds and maintains systems for a living. ' * 8,
+            category=categories[number % len(categories)],
+            salary_range_min=40000 + number % 50 * 1000,
+            salary_range_max=80000 + number % 50 * 2000,
+            education_level='bachelors',
+            required_skills=['Communication', 'Teamwork', f'Skill {number % 200}'],
+            growth_outlook='high',
+            work_environment='office',
+        )
+        for number in range(count)
+    ]
+
+
+def fixture_resources(count):
+    return [
+        CareerResource(
+            title=f'Benchmark Guide {number:05d}',
+            content='A long article body. ' * 200,
+            resource_type='guide',
+            category='resume',
+            difficulty_level='beginner',
+            estimated_time=10 + number % 50,
+            tags=['resume', f'tag-{number % 100}'],
+            is_featured=number % 10 == 0,
+        )
+        for number in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests per second of the serializer and values()/orjson list paths '
+        'on a generated catalog in a separate, temporary database'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows generated per model')
+        parser.add_argument('--requests', type=int, default=200, help='Requests timed per endpoint and mode')
+        parser.add_argument('--page-size', type=int, default=100, help='page_size of each list request')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        # A throwaway test database, so a live database is neither written nor locked
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                CareerPath.objects.bulk_create(fixture_careers(rows), batch_size=1000)
+                CareerResource.objects.bulk_create(fixture_resources(rows), batch_size=1000)
+                self.stdout.write(f'Generated {rows} careers and {rows} resources')
+
+                for name, viewset, model, serializer_class in ENDPOINTS:
+                    self.benchmark_requests(name, viewset, options['requests'], options['page_size'], rows)
+                    self.benchmark_encoding(name, model, serializer_class)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def benchmark_requests(self, name, viewset, requests, page_size, rows):
+        factory = APIRequestFactory()
+        view = viewset.as_view({'get': 'list'})
+        pages = max(rows // page_size, 1)
+        rates = {}
+        for mode, enabled in MODES:
+            with override_settings(API_FAST_LIST=enabled):
+                view(factory.get(f'/api/{name}/', {'page_size': page_size})).render()  # warm up
+                started = time.perf_counter()
+                for number in range(requests):
+                    request = factory.get(f'/api/{name}/', {'page_size': page_size, 'page': number % pages + 1})
+                    view(request).render()
+                elapsed = time.perf_counter() - started
+            rates[mode] = requests / elapsed
+            self.stdout.write(
+                f'{name:<13} {mode:<12} {rates[mode]:8.1f} req/s  {elapsed / requests * 1000:7.2f} ms/request'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{name:<13} fast path is {rates['fast'] / rates['serializers']:.2f}x faster (page_size={page_size})"
+        ))
+
+    def benchmark_encoding(self, name, model, serializer_class):
+        queryset = model.objects.filter(is_active=True)
+        serializer = serializer_class()
+
+        started = time.perf_counter()
+        JSONRenderer().render(serializer_class(queryset, many=True).data)
+        slow = time.perf_counter() - started
+
+        started = time.perf_counter()
+        encoder = get_row_encoder(serializer)
+        dumps(encoder.encode(queryset.values(*encoder.columns)))
+        fast = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{name:<13} full catalog: serializers {slow:.2f}s, fast {fast:.2f}s ({slow / fast:.2f}x)'
+        )
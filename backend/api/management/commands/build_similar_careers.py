@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.similarity import SIMILAR_LIMIT, build_similar_careers
+
+
+class Command(BaseCommand):
+    help = f'Recompute the {SIMILAR_LIMIT} most similar careers of every active career path'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int,
+            help='Processes used to vectorize and score the catalog (default: CPU count for large catalogs, else 1)'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        started = time.monotonic()
+        count = build_similar_careers(workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed similar careers for {count} career paths in {time.monotonic() - started:.2f}s'
+        ))
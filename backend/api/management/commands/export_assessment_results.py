@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_results, parse_bound
+
+
+class Command(BaseCommand):
+    help = 'Export assessment results as NDJSON, CSV or columnar JSON chunks, streaming row by row'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', help='Output format')
+        parser.add_argument('--assessment', type=int, help='Only export results of this assessment ID')
+        parser.add_argument('--since', help='Only results completed at or after this ISO date/datetime')
+        parser.add_argument('--until', help='Only results completed before this ISO datetime (dates are inclusive)')
+        parser.add_argument(
+            '--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+            help='Rows fetched from the database at a time'
+        )
+        parser.add_argument('--output', '-o', default='-', help='File to write to (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_bound(options['since']) if options['since'] else None
+            until = parse_bound(options['until'], end=True) if options['until'] else None
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        lines = export_results(
+            options['format'], chunk_size=options['chunk_size'],
+            assessment_id=options['assessment'], since=since, until=until,
+        )
+        to_stdout = options['output'] == '-'
+        output = self.stdout if to_stdout else open(options['output'], 'w', encoding='utf-8', newline='')
+        written = 0
+        try:
+            for line in lines:
+                if to_stdout:
+                    output.write(line, ending='')
+                else:
+                    output.write(line)
+                written += 1
+        finally:
+            if not to_stdout:
+                output.close()
+
+        # Keep stdout clean for piping
+        log = self.stderr if to_stdout else self.stdout
+        log.write(f'Wrote {written} lines', style_func=self.style.SUCCESS)
@@ -0,0 +1,128 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalog_import import (
+    IMPORT_BATCH_SIZE, CatalogImporter, ImportFormatError, read_records, refresh_derived_data
+)
+from api.models import CareerPath, CareerResource
+
+
+MODELS = {
+    'careers': CareerPath,
+    'resources': CareerResource,
+}
+
+FORMATS = ('csv', 'ndjson', 'json')
+EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'json'}
+
+
+class Command(BaseCommand):
+    help = 'Import career paths or resources from CSV, NDJSON or JSON, creating and updating rows by title in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin")
+        parser.add_argument('--model', choices=sorted(MODELS), required=True, help='What the file contains')
+        parser.add_argument('--format', choices=FORMATS, help='Input format (default: from the file extension)')
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help='Records diffed and written per transaction'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Validate and diff without writing anything')
+        parser.add_argument(
+            '--checkpoint',
+            help='Progress file: written after every batch and used to resume an interrupted import'
+        )
+        parser.add_argument('--max-errors', type=int, default=20, help='Invalid records to print')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        model = MODELS[options['model']]
+        input_format = options['format'] or EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if input_format is None:
+            raise CommandError('Cannot tell the input format from the file name; pass --format.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        checkpoint_path = options['checkpoint']
+        if checkpoint_path and (path == '-' or options['dry_run']):
+            raise CommandError('--checkpoint needs an input file and cannot be combined with --dry-run.')
+        checkpoint = self.checkpoint_for(path, options['model'])
+        skip = self.load_checkpoint(checkpoint_path, checkpoint) if checkpoint_path else 0
+        if skip:
+            self.stdout.write(f'Resuming after {skip} records from {checkpoint_path}')
+
+        errors_shown = 0
+
+        def on_error(line, errors):
+            nonlocal errors_shown
+            if errors_shown < options['max_errors']:
+                self.stderr.write(f"Line {line}: {'; '.join(errors)}")
+            errors_shown += 1
+
+        def on_batch(stats, records_done):
+            if checkpoint_path:
+                self.save_checkpoint(checkpoint_path, dict(checkpoint, records=records_done))
+            self.stdout.write(
+                f'{records_done} records, {stats.created} created, {stats.updated} updated '
+                f'({stats.rate:.0f} records/s)'
+            )
+
+        importer = CatalogImporter(model, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            stats = importer.run(read_records(stream, input_format), skip=skip, on_batch=on_batch, on_error=on_error)
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(
+            f'{prefix}Read {stats.read} records in {stats.elapsed:.2f}s ({stats.rate:.0f} records/s): '
+            f'{stats.created} created, {stats.updated} updated, {stats.unchanged} unchanged, '
+            f'{stats.invalid} invalid'
+        )
+        if options['dry_run']:
+            return
+
+        # Rows updated by an earlier, interrupted run are not known here, so resync everything
+        if skip:
+            refresh_derived_data(model)
+        else:
+            refresh_derived_data(model, updated_ids=stats.updated_ids, rescored_ids=stats.rescored_ids)
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS('Catalog imported!'))
+
+    @staticmethod
+    def checkpoint_for(path, model_name):
+        if path == '-':
+            return None
+        stat = os.stat(path)
+        return {'source': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime, 'model': model_name}
+
+    @staticmethod
+    def load_checkpoint(checkpoint_path, checkpoint):
+        if not os.path.exists(checkpoint_path):
+            return 0
+        try:
+            with open(checkpoint_path, encoding='utf-8') as handle:
+                saved = json.load(handle)
+        except ValueError:
+            raise CommandError(f'{checkpoint_path} is not a valid checkpoint file.')
+        if any(saved.get(key) != value for key, value in checkpoint.items()):
+            raise CommandError(
+                f'{checkpoint_path} was written for a different input or model; delete it to start over.'
+            )
+        return int(saved.get('records', 0))
+
+    @staticmethod
+    def save_checkpoint(checkpoint_path, data):
+        temporary = f'{checkpoint_path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            json.dump(data, handle)
+        os.replace(temporary, checkpoint_path)
@@ -0,0 +1,75 @@
+import sys
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.metrics import METRIC_NAMES, parse_prometheus, quantile
+
+
+METRICS = dict(zip(('duration', 'queries', 'db', 'serializer', 'bytes'), METRIC_NAMES))
+# Time metrics are shown in milliseconds
+SCALES = {'duration': 1000, 'db': 1000, 'serializer': 1000}
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Command(BaseCommand):
+    help = 'Print p50/p95/p99 per API route from the /metrics endpoint of a running server'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source', nargs='?', default='http://127.0.0.1:8000/metrics',
+            help="URL of a /metrics endpoint, a file holding its output, or '-' for stdin"
+        )
+        parser.add_argument(
+            '--metric', choices=list(METRICS), default='duration',
+            help='What to summarize (times in milliseconds)'
+        )
+        parser.add_argument('--limit', type=int, default=50, help='Routes to show, slowest p95 first')
+
+    def handle(self, *args, **options):
+        histograms = parse_prometheus(self.read(options['source']))
+        metric = options['metric']
+        scale = SCALES.get(metric, 1)
+
+        rows = []
+        for route, metrics in histograms.items():
+            buckets = metrics.get(METRICS[metric])
+            if not buckets or not max(count for _, count in buckets):
+                continue
+            values = [quantile(buckets, q) * scale for q in QUANTILES]
+            rows.append((route, int(max(count for _, count in buckets)), *values))
+        if not rows:
+            self.stdout.write('No requests recorded')
+            return
+
+        rows.sort(key=lambda row: -row[3])
+        width = max(len('route'), *(len(row[0]) for row in rows[:options['limit']]))
+        unit = ' (ms)' if metric in SCALES else ''
+        self.stdout.write(f"{'route':<{width}}  {'requests':>8}  {'p50':>10}  {'p95':>10}  {'p99':>10}{unit}")
+        for route, count, p50, p95, p99 in rows[:options['limit']]:
+            self.stdout.write(f'{route:<{width}}  {count:>8}  {p50:>10.2f}  {p95:>10.2f}  {p99:>10.2f}')
+
+    @staticmethod
+    def read(source):
+        if source == '-':
+            return sys.stdin.read()
+        if source.startswith(('http://', 'https://')):
+            try:
+                with urlopen(source, timeout=10) as response:
+                    return response.read().decode('utf-8')
+            except HTTPError as exc:
+                if exc.code == 403:
+                    raise CommandError(
+                        f'{source} refused the request (403). Start the server with API_METRICS_IPS listing '
+                        "this machine's address (e.g. API_METRICS_IPS=127.0.0.1,::1), or pass a saved "
+                        "/metrics output file or '-' for stdin."
+                    )
+                raise CommandError(f'Could not fetch {source}: {exc}')
+            except URLError as exc:
+                raise CommandError(f'Could not fetch {source}: {exc}')
+        try:
+            with open(source, encoding='utf-8') as handle:
+                return handle.read()
+        except OSError as exc:
+            raise CommandError(str(exc))
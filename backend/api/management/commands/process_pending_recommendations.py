@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.models import AssessmentResult
+from api.tasks import compute_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Compute recommendations for assessment results still marked as pending'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed', action='store_true',
+            help='Also retry results whose recommendation job failed'
+        )
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            AssessmentResult.objects.filter(recommendation_status='failed').update(
+                recommendation_status='pending'
+            )
+
+        pending = AssessmentResult.objects.filter(recommendation_status='pending').values_list('id', flat=True)
+        processed = failed = 0
+        for result_id in pending.iterator(chunk_size=500):
+            if compute_recommendations(result_id):
+                processed += 1
+            else:
+                failed += 1
+
+        self.stdout.write(f'Processed {processed} pending results ({failed} failed)')
+        self.stdout.write(self.style.SUCCESS('Pending recommendations processed!'))
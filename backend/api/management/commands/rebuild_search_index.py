@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import CareerPath, CareerResource
+from api.search import get_search_backend
+
+
+MODELS = {
+    'careers': CareerPath,
+    'resources': CareerResource,
+}
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for career paths and resources'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model', choices=sorted(MODELS), action='append',
+            help='Only rebuild the index for this model (repeatable, default: all)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of documents written per batch'
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f'Using {type(backend).__name__}')
+
+        for name in options['model'] or sorted(MODELS):
+            started = time.monotonic()
+            with transaction.atomic():
+                count = backend.rebuild(MODELS[name], batch_size=options['batch_size'])
+            self.stdout.write(f'Indexed {count} {name} in {time.monotonic() - started:.2f}s')
+
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt!'))
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+
+from api.models import AssessmentResult, CareerAssessment
+from api.sample_data import SAMPLE_ASSESSMENT
+from api.writes import create_result, get_write_queue
+
+
+def write_results(assessment_id, writers, requests, use_queue):
+    """
+    Insert ``writers * requests`` results from ``writers`` threads.
+
+    Returns (written, lock errors, other errors, write queue batches).
+    """
+    written = lock_errors = other_errors = 0
+    counter_lock = threading.Lock()
+
+    def writer(number):
+        nonlocal written, lock_errors, other_errors
+        for request in range(requests):
+            try:
+                create_result(
+                    assessment_id=assessment_id, answers=['Solving complex problems'],
+                    session_id=f'stress-{os.getpid()}-{number}-{request}',
+                )
+                outcome = 'written'
+            except OperationalError as exc:
+                outcome = 'locked' if 'locked' in str(exc) or 'busy' in str(exc) else 'error'
+            except Exception:
+                outcome = 'error'
+            with counter_lock:
+                if outcome == 'written':
+                    written += 1
+                elif outcome == 'locked':
+                    lock_errors += 1
+                else:
+                    other_errors += 1
+        connections.close_all()
+
+    batches = get_write_queue().batches
+    with override_settings(API_WRITE_QUEUE=use_queue):
+        threads = [threading.Thread(target=writer, args=(number,)) for number in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return written, lock_errors, other_errors, get_write_queue().batches - batches if use_queue else written
+
+
+def process_main(assessment_id, writers, requests, use_queue, results):
+    results.put(write_results(assessment_id, writers, requests, use_queue))
+
+
+class Command(BaseCommand):
+    help = (
+        'Stress concurrent AssessmentResult writes on a scratch SQLite file from several processes '
+        'and threads; fails if any write hits "database is locked"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='Writer processes (like gunicorn workers)')
+        parser.add_argument('--writers', type=int, default=8, help='Writer threads per process')
+        parser.add_argument('--requests', type=int, default=50, help='Results written per thread')
+        parser.add_argument(
+            '--plain', action='store_true',
+            help='Use the default SQLite settings (no WAL, busy timeout or write queue) for comparison'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This stress test is for SQLite databases.')
+        processes, writers, requests = options['processes'], options['writers'], options['requests']
+        if min(processes, writers, requests) < 1:
+            raise CommandError('--processes, --writers and --requests must be at least 1.')
+        use_queue = not options['plain']
+
+        directory = tempfile.TemporaryDirectory()
+        old_name = connection.settings_dict['NAME']
+        old_options = connection.settings_dict.get('OPTIONS', {})
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directory.name, 'stress.sqlite3')
+        connection.settings_dict['OPTIONS'] = {} if options['plain'] else dict(settings.SQLITE_PRODUCTION_OPTIONS)
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            assessment = CareerAssessment.objects.create(**SAMPLE_ASSESSMENT)
+            connections.close_all()
+
+            started = time.perf_counter()
+            outcomes = self.run_writers(assessment.pk, processes, writers, requests, use_queue)
+            elapsed = time.perf_counter() - started
+            stored = AssessmentResult.objects.count()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            connection.settings_dict['OPTIONS'] = old_options
+            directory.cleanup()
+
+        written = sum(outcome[0] for outcome in outcomes)
+        lock_errors = sum(outcome[1] for outcome in outcomes)
+        other_errors = sum(outcome[2] for outcome in outcomes)
+        transactions = sum(outcome[3] for outcome in outcomes)
+        expected = processes * writers * requests
+        mode = 'plain' if options['plain'] else 'WAL + write queue'
+        self.stdout.write(
+            f'{mode}: {processes} processes x {writers} writers x {requests} results in {elapsed:.2f}s '
+            f'({written / elapsed:.0f} writes/s, {written / max(transactions, 1):.1f} rows per transaction)'
+        )
+        self.stdout.write(
+            f'{written} written, {stored} stored, {lock_errors} lock errors, {other_errors} other errors'
+        )
+        if lock_errors or other_errors or written != expected or stored != expected:
+            raise CommandError(f'Expected {expected} stored results and no errors.')
+        self.stdout.write(self.style.SUCCESS('No lock errors'))
+
+    def run_writers(self, assessment_id, processes, writers, requests, use_queue):
+        if processes == 1 or 'fork' not in multiprocessing.get_all_start_methods():
+            return [write_results(assessment_id, writers, requests, use_queue) for _ in range(processes)]
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(target=process_main, args=(assessment_id, writers, requests, use_queue, results))
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        outcomes = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        return outcomes
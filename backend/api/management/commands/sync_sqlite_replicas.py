@@ -0,0 +1,57 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.caching import mark_replicas_synced, replica_generations
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database onto the replica files in DATABASE_REPLICAS, '
+        'once or every --interval seconds, and record the catalog generations they hold'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep running and copy again every this many seconds (the replication lag)'
+        )
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        replicas = [connections[alias].settings_dict for alias in settings.API_DB_REPLICAS]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_sqlite_replicas only copies SQLite databases.')
+        if not replicas:
+            raise CommandError('No replicas configured; set DATABASE_REPLICAS.')
+        for replica in replicas:
+            if replica['NAME'] == primary['NAME']:
+                raise CommandError(f"Replica {replica['NAME']} must be a separate file.")
+
+        while True:
+            started = time.perf_counter()
+            # Read before copying: a write during the copy moves past these and stays uncached
+            generations = replica_generations()
+            for replica in replicas:
+                self.copy(primary['NAME'], replica['NAME'])
+            mark_replicas_synced(generations)
+            self.stdout.write(
+                f"Copied {primary['NAME']} to {len(replicas)} replica(s) in {time.perf_counter() - started:.2f}s"
+            )
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+
+    @staticmethod
+    def copy(source_name, target_name):
+        # The online backup API gives a consistent snapshot while the primary is in use
+        source = sqlite3.connect(source_name)
+        target = sqlite3.connect(target_name)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
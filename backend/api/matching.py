@@ -0,0 +1,360 @@
+"""
+Vectorized career matching engine.
+
+Every active CareerPath is encoded once into a row of a dense NumPy feature
+matrix (one-hot categorical fields, salary bands and hashed skill tokens).
+An answer set is turned into a feature vector of the same width, so scoring
+the whole catalog is a single matrix-vector product and the top matches are
+picked with ``argpartition`` instead of sorting every career.
+
+The matrix is rebuilt lazily. Each snapshot records the CareerPath
+generation it was read at, and the next recommendation request after the
+generation moves rebuilds it from the database. With a shared cache this
+reaches every worker process, not just the one that handled the write.
+"""
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from .caching import get_generation
+from .models import CareerPath
+from .replicas import PRIMARY
+
+
+# Fields of CareerPath encoded as one-hot columns
+CATEGORICAL_FIELDS = ['category', 'education_level', 'work_environment', 'growth_outlook']
+
+# Every CareerPath field a career's feature columns are built from
+SCORED_FIELDS = (*CATEGORICAL_FIELDS, 'required_skills', 'salary_range_min', 'salary_range_max')
+
+# Salary bands (half-open, in dollars) mirroring the assessment salary question
+SALARY_BANDS = [
+    (0, 50000),
+    (50000, 70000),
+    (70000, 90000),
+    (90000, 120000),
+    (120000, float('inf')),
+]
+
+# Number of hashed columns used for required_skills tokens. Hashing keeps the
+# matrix width fixed no matter how large the skill vocabulary grows.
+SKILL_BUCKETS = 128
+
+# Relative weight of each feature group in the final score
+FEATURE_WEIGHTS = {
+    'category': 3.0,
+    'work_environment': 2.0,
+    'education_level': 1.5,
+    'salary': 1.5,
+    'growth_outlook': 1.0,
+    'skill': 1.0,
+}
+
+# Answer keywords (single tokens or joined bigrams) mapped to career features
+ANSWER_KEYWORDS = {
+    # Work environment
+    'office': [('work_environment', 'office')],
+    'remote': [('work_environment', 'remote')],
+    'hybrid': [('work_environment', 'hybrid')],
+    'field': [('work_environment', 'field')],
+    'travel': [('work_environment', 'field')],
+    'hospital': [('work_environment', 'hospital')],
+    'clinical': [('work_environment', 'hospital')],
+    'laboratory': [('work_environment', 'laboratory')],
+    'research': [('work_environment', 'laboratory'), ('category', 'science')],
+    'classroom': [('work_environment', 'school')],
+    # Education
+    'high_school': [('education_level', 'high_school')],
+    'diploma': [('education_level', 'high_school')],
+    'associate': [('education_level', 'associates')],
+    'associates': [('education_level', 'associates')],
+    'bachelor': [('education_level', 'bachelors')],
+    'bachelors': [('education_level', 'bachelors')],
+    'master': [('education_level', 'masters')],
+    'masters': [('education_level', 'masters')],
+    'phd': [('education_level', 'phd')],
+    'doctorate': [('education_level', 'phd')],
+    'certification': [('education_level', 'certification')],
+    'certificate': [('education_level', 'certification')],
+    # Activities and interests
+    'technology': [('category', 'technology')],
+    'programming': [('category', 'technology')],
+    'coding': [('category', 'technology')],
+    'problems': [('category', 'technology'), ('category', 'engineering'), ('category', 'science')],
+    'creating': [('category', 'arts')],
+    'designing': [('category', 'arts')],
+    'creative': [('category', 'arts')],
+    'helping': [('category', 'healthcare'), ('category', 'education')],
+    'caring': [('category', 'healthcare')],
+    'medical': [('category', 'healthcare')],
+    'healthcare': [('category', 'healthcare')],
+    'teaching': [('category', 'education')],
+    'analyzing': [('category', 'science'), ('category', 'finance'), ('category', 'technology')],
+    'data': [('category', 'science'), ('category', 'technology')],
+    'numbers': [('category', 'finance')],
+    'mathematical': [('category', 'finance'), ('category', 'science'), ('category', 'engineering')],
+    'leading': [('category', 'business'), ('category', 'marketing')],
+    'managing': [('category', 'business'), ('category', 'marketing')],
+    'leadership': [('category', 'business')],
+    'management': [('category', 'business')],
+    'business': [('category', 'business')],
+    'finance': [('category', 'finance')],
+    'marketing': [('category', 'marketing')],
+    'engineering': [('category', 'engineering')],
+    'science': [('category', 'science')],
+    # Growth outlook
+    'growth': [('growth_outlook', 'high')],
+    'growing': [('growth_outlook', 'high')],
+    'stable': [('growth_outlook', 'stable')],
+    'stability': [('growth_outlook', 'stable')],
+    'security': [('growth_outlook', 'stable')],
+}
+
+# Words that carry no skill signal
+STOPWORDS = frozenset(['a', 'an', 'and', 'or', 'of', 'the', 'to', 'in', 'on', 'for', 'with', 'at', 'my', 'i'])
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+SALARY_RE = re.compile(r'\$?\s*(\d[\d,]*)\s*(k\b)?')
+
+
+def tokenize(text):
+    """Lowercase word tokens of a string, folding possessive apostrophes"""
+    return TOKEN_RE.findall(str(text).lower().replace("'", '').replace('’', ''))
+
+
+def skill_bucket(token):
+    """Stable hash bucket for a skill token"""
+    return zlib.crc32(token.encode('utf-8')) % SKILL_BUCKETS
+
+
+def skill_tokens(skills):
+    """Flatten a required_skills/skills list into a set of skill tokens"""
+    tokens = set()
+    for skill in skills or []:
+        tokens.update(t for t in tokenize(skill) if t not in STOPWORDS)
+    return tokens
+
+
+def flatten_answers(answers):
+    """Collect every string fragment from an arbitrarily nested answer payload"""
+    stack = [answers]
+    fragments = []
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+        elif isinstance(item, str):
+            fragments.append(item)
+    fragments.reverse()
+    return fragments
+
+
+def parse_salary_range(text):
+    """Parse '$50,000 - $70,000' or '$120,000+' into a (low, high) tuple, or None"""
+    if '$' not in text and 'salary' not in text.lower():
+        return None
+    amounts = []
+    for number, thousands in SALARY_RE.findall(text.lower()):
+        value = int(number.replace(',', ''))
+        if thousands:
+            value *= 1000
+        if value >= 1000:
+            amounts.append(value)
+    if not amounts:
+        return None
+    if len(amounts) == 1:
+        return (amounts[0], float('inf')) if '+' in text else (amounts[0], amounts[0])
+    return (min(amounts), max(amounts))
+
+
+def salary_bands(low, high):
+    """Indexes of the salary bands overlapping the [low, high] range"""
+    return [i for i, (band_low, band_high) in enumerate(SALARY_BANDS)
+            if low < band_high and max(high, low + 1) > band_low]
+
+
+class MatcherSnapshot:
+    """Immutable matrix plus the career metadata needed to build responses"""
+
+    def __init__(self, ids, titles, categories, matrix, version=None):
+        self.ids = ids
+        self.titles = titles
+        self.categories = categories
+        self.matrix = matrix
+        self.version = version
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class CareerMatcher:
+    """Scores answer sets against a precomputed career feature matrix"""
+
+    def __init__(self):
+        self.columns = self._build_columns()
+        self.weights = self._build_weights()
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_columns():
+        """Map (group, value) feature keys to matrix column indexes"""
+        columns = {}
+        for field_name in CATEGORICAL_FIELDS:
+            for value, _label in CareerPath._meta.get_field(field_name).choices:
+                columns[(field_name, value)] = len(columns)
+        for band in range(len(SALARY_BANDS)):
+            columns[('salary', band)] = len(columns)
+        for bucket in range(SKILL_BUCKETS):
+            columns[('skill', bucket)] = len(columns)
+        return columns
+
+    def _build_weights(self):
+        weights = np.empty(len(self.columns), dtype=np.float32)
+        for (group, _value), column in self.columns.items():
+            weights[column] = FEATURE_WEIGHTS[group]
+        return weights
+
+    @property
+    def width(self):
+        return len(self.columns)
+
+    def invalidate(self):
+        """Drop the current matrix so the next request rebuilds it"""
+        self._snapshot = None
+
+    def rebuild(self, queryset=None):
+        """Rebuild the feature matrix from the active career paths"""
+        # Read before the rows, so a write during the read leaves the snapshot stale
+        version = get_generation(CareerPath)
+        if queryset is None:
+            queryset = CareerPath.objects.using(PRIMARY).filter(is_active=True)
+        rows = list(queryset.order_by('title', 'id').values_list(
+            'id', 'title', 'category', 'education_level', 'work_environment',
+            'growth_outlook', 'required_skills', 'salary_range_min', 'salary_range_max',
+        ))
+
+        matrix = np.zeros((len(rows), self.width), dtype=np.float32)
+        for row_index, row in enumerate(rows):
+            for column in self.career_columns(*row[2:]):
+                matrix[row_index, column] = 1.0
+        matrix *= self.weights
+
+        snapshot = MatcherSnapshot(
+            ids=np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            titles=[row[1] for row in rows],
+            categories=[row[2] for row in rows],
+            matrix=matrix,
+            version=version,
+        )
+        self._snapshot = snapshot
+        return snapshot
+
+    def career_columns(self, category, education_level, work_environment, growth_outlook,
+                       required_skills, salary_min, salary_max):
+        """Feature columns set for a single career"""
+        columns = set()
+        for field_name, value in zip(CATEGORICAL_FIELDS,
+                                     (category, education_level, work_environment, growth_outlook)):
+            column = self.columns.get((field_name, value))
+            if column is not None:
+                columns.add(column)
+        if salary_min is not None or salary_max is not None:
+            low = salary_min if salary_min is not None else salary_max
+            high = salary_max if salary_max is not None else salary_min
+            for band in salary_bands(low, high):
+                columns.add(self.columns[('salary', band)])
+        for token in skill_tokens(required_skills if isinstance(required_skills, list) else []):
+            columns.add(self.columns[('skill', skill_bucket(token))])
+        return columns
+
+    def vectorize(self, answers):
+        """Turn an answer payload into a feature vector"""
+        vector = np.zeros(self.width, dtype=np.float32)
+        for fragment in flatten_answers(answers):
+            salary = parse_salary_range(fragment)
+            if salary is not None:
+                for band in salary_bands(*salary):
+                    vector[self.columns[('salary', band)]] = 1.0
+                continue
+
+            tokens = tokenize(fragment)
+            for token in tokens:
+                if token not in STOPWORDS:
+                    vector[self.columns[('skill', skill_bucket(token))]] = 1.0
+
+            # Bigrams are matched first so "high school" maps to an education level
+            index = 0
+            while index < len(tokens):
+                bigram = '_'.join(tokens[index:index + 2])
+                if bigram in ANSWER_KEYWORDS:
+                    features, index = ANSWER_KEYWORDS[bigram], index + 2
+                else:
+                    features, index = ANSWER_KEYWORDS.get(tokens[index], ()), index + 1
+                for feature in features:
+                    vector[self.columns[feature]] = 1.0
+        return vector
+
+    def snapshot(self):
+        """Return the current matrix, rebuilding it if the CareerPath generation moved"""
+        version = get_generation(CareerPath)
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self.rebuild()
+        return snapshot
+
+    def score(self, answers):
+        """Score every active career against an answer payload"""
+        snapshot = self.snapshot()
+        return snapshot, snapshot.matrix @ self.vectorize(answers)
+
+    def recommend(self, answers, limit=5):
+        """Top ``limit`` careers for an answer payload, best match first"""
+        snapshot, scores = self.score(answers)
+        return self.top_k(snapshot, scores, limit)
+
+    def recommend_many(self, answer_sets, limit=5, batch_size=256):
+        """
+        Top ``limit`` careers for each of many answer payloads.
+
+        Answer vectors are stacked ``batch_size`` at a time so each batch is
+        scored with one matrix-matrix product.
+        """
+        snapshot = self.snapshot()
+        recommendations = []
+        for start in range(0, len(answer_sets), batch_size):
+            vectors = np.stack([self.vectorize(answers) for answers in answer_sets[start:start + batch_size]])
+            for scores in vectors @ snapshot.matrix.T:
+                recommendations.append(self.top_k(snapshot, scores, limit))
+        return recommendations
+
+    @staticmethod
+    def top_k(snapshot, scores, limit):
+        """Select the best ``limit`` rows without sorting the whole score vector"""
+        if not len(snapshot) or limit <= 0:
+            return []
+        if limit < len(scores):
+            candidates = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            candidates = np.arange(len(scores))
+        # Highest score first; ties keep catalog (title) order
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [
+            {
+                'id': int(snapshot.ids[i]),
+                'title': snapshot.titles[i],
+                'score': round(float(scores[i]), 4),
+                'category': snapshot.categories[i],
+            }
+            for i in order
+        ]
+
+
+matcher = CareerMatcher()
@@ -0,0 +1,332 @@
+"""
+Per-route request instrumentation.
+
+``MetricsMiddleware`` records, for every request resolved to a named route
+(``careerpath-list``, ``assessment-submit``...), its wall time, number and
+time of database queries (through ``connection.execute_wrapper``), time
+spent in serializers and response size. ``InstrumentedViewMixin`` adds the
+serializer timing to DRF viewsets; the fast list path times its row encoder
+with ``serializer_timer``.
+
+Samples go into fixed-bucket histograms. Each thread writes to its own
+shard of counters, so recording a request takes no lock; readers merge the
+shards. The shards of threads that have exited are folded into a retired
+total, so servers that start a thread per request keep one shard per live
+thread. Numbers are per process: with several workers, scrape each one.
+
+``GET /metrics`` serves them in the Prometheus text format and the
+``metrics_report`` command prints p50/p95/p99 per route from that output.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# (name, help, bucket upper bounds), in the order samples are recorded
+METRICS = (
+    ('api_request_duration_seconds', 'Wall time of API requests', TIME_BUCKETS),
+    ('api_db_queries', 'Database queries per API request', QUERY_BUCKETS),
+    ('api_db_duration_seconds', 'Time spent in database queries per API request', TIME_BUCKETS),
+    ('api_serializer_duration_seconds', 'Time spent serializing per API request', TIME_BUCKETS),
+    ('api_response_bytes', 'Size of API response bodies', SIZE_BUCKETS),
+)
+METRIC_NAMES = tuple(name for name, _, _ in METRICS)
+
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Shard:
+    """One thread's counters for a route: bucket counts and sums per metric"""
+    __slots__ = ('counts', 'sums')
+
+    def __init__(self):
+        self.counts = [[0] * (len(bounds) + 1) for _, _, bounds in METRICS]
+        self.sums = [0.0] * len(METRICS)
+
+    def add(self, other):
+        for index, counts in enumerate(other.counts):
+            for bucket, count in enumerate(counts):
+                self.counts[index][bucket] += count
+            self.sums[index] += other.sums[index]
+
+
+class RouteHistograms:
+    """Histograms of every metric for one route, sharded per thread"""
+
+    def __init__(self):
+        # (thread, shard) pairs of the threads that recorded since the last fold
+        self._shards = []
+        self._retired = _Shard()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._fold_dead()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _fold_dead(self):
+        # A thread that has exited can no longer write to its shard
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self._retired.add(shard)
+        self._shards = live
+
+    def observe(self, values):
+        """Record one request; ``values`` follow the order of ``METRICS``"""
+        shard = self._shard()
+        for index, (value, (_, _, bounds)) in enumerate(zip(values, METRICS)):
+            shard.counts[index][bisect.bisect_left(bounds, value)] += 1
+            shard.sums[index] += value
+
+    def snapshot(self):
+        """{metric name: (bucket counts, sum)} merged over every thread"""
+        merged = _Shard()
+        with self._lock:
+            self._fold_dead()
+            merged.add(self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            merged.add(shard)
+        return {
+            name: (merged.counts[index], merged.sums[index]) for index, (name, _, _) in enumerate(METRICS)
+        }
+
+
+class MetricsRegistry:
+    """Route name -> RouteHistograms"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, values):
+        histograms = self._routes.get(route)
+        if histograms is None:
+            with self._lock:
+                histograms = self._routes.setdefault(route, RouteHistograms())
+        histograms.observe(values)
+
+    def snapshot(self):
+        """{route: {metric name: (bucket counts, sum)}}"""
+        with self._lock:
+            routes = dict(self._routes)
+        return {route: histograms.snapshot() for route, histograms in sorted(routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+
+registry = MetricsRegistry()
+
+_current = threading.local()
+
+
+class RequestSample:
+    """Database and serializer time collected while a request is handled"""
+    __slots__ = ('queries', 'db_time', 'serializer_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def serializer_timer():
+    """Count the time spent in the block as serializer time of the current request"""
+    sample = getattr(_current, 'sample', None)
+    if sample is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.serializer_time += time.perf_counter() - started
+
+
+class _TimedData:
+    """Serializer mixin timing ``.data``, where representations are built"""
+
+    @property
+    def data(self):
+        with serializer_timer():
+            return super().data
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        serializer.__class__ = timed_serializer_class(type(serializer))
+        return serializer
+
+
+_timed_classes = {}
+
+
+def timed_serializer_class(serializer_class):
+    """Subclass of ``serializer_class`` whose ``.data`` counts as serializer time"""
+    if issubclass(serializer_class, _TimedData):
+        return serializer_class
+    timed = _timed_classes.get(serializer_class)
+    if timed is None:
+        timed = _timed_classes.setdefault(serializer_class, type(
+            serializer_class.__name__, (_TimedData, serializer_class), {'__module__': serializer_class.__module__}
+        ))
+    return timed
+
+
+class InstrumentedViewMixin:
+    """Viewset mixin recording serializer time for ``MetricsMiddleware``"""
+
+    def get_serializer_class(self):
+        return timed_serializer_class(super().get_serializer_class())
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return None
+    return f'{match.namespace}:{match.url_name}' if match.namespace else match.url_name
+
+
+class MetricsMiddleware:
+    """
+    Record per-route request metrics.
+
+    Goes first in ``MIDDLEWARE`` so the wall time covers the other
+    middleware. Requests that do not resolve to a named route (404s) are not
+    recorded, which keeps the number of series bounded.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'API_METRICS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample = RequestSample()
+        _current.sample = sample
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(sample))
+                response = self.get_response(request)
+        finally:
+            _current.sample = None
+        duration = time.perf_counter() - started
+
+        route = route_name(request)
+        if route is not None and route != 'metrics':
+            size = 0 if response.streaming else len(response.content)
+            registry.observe(route, (duration, sample.queries, sample.db_time, sample.serializer_time, size))
+        return response
+
+
+def format_bound(bound):
+    return '+Inf' if bound == math.inf else repr(float(bound)) if isinstance(bound, float) else str(bound)
+
+
+def render_prometheus(snapshot=None):
+    """Histograms in the Prometheus text exposition format"""
+    snapshot = registry.snapshot() if snapshot is None else snapshot
+    lines = []
+    for name, help_text, bounds in METRICS:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for route, metrics in snapshot.items():
+            counts, total = metrics[name]
+            label = route.replace('\\', '\\\\').replace('"', '\\"')
+            cumulative = 0
+            for bound, count in zip(bounds + (math.inf,), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{route="{label}",le="{format_bound(bound)}"}} {cumulative}')
+            lines.append(f'{name}_sum{{route="{label}"}} {total!r}')
+            lines.append(f'{name}_count{{route="{label}"}} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, open to staff users and to ``API_METRICS_IPS`` (none by default)"""
+    allowed = getattr(settings, 'API_METRICS_IPS', ())
+    user = getattr(request, 'user', None)
+    if request.META.get('REMOTE_ADDR') not in allowed and not (user is not None and user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(render_prometheus(), content_type=METRICS_CONTENT_TYPE)
+
+
+def parse_prometheus(text):
+    """
+    Histograms from ``render_prometheus`` output.
+
+    Returns {route: {metric name: [(upper bound, cumulative count), ...]}};
+    lines of other metrics are ignored.
+    """
+    histograms = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        series, _, value = line.rpartition(' ')
+        name, _, labels = series.partition('{')
+        if not name.endswith('_bucket') or name[:-len('_bucket')] not in METRIC_NAMES:
+            continue
+        parsed = dict(
+            part.split('=', 1) for part in labels.rstrip('}').split('",') if '=' in part
+        )
+        route = parsed['route'].strip('"')
+        bound = float(parsed['le'].strip('"'))
+        histograms.setdefault(route, {}).setdefault(name[:-len('_bucket')], []).append((bound, float(value)))
+    return histograms
+
+
+def quantile(buckets, q):
+    """
+    Estimate the ``q`` quantile from cumulative ``(upper bound, count)`` buckets.
+
+    Interpolates linearly inside the bucket, like Prometheus'
+    ``histogram_quantile``; values in the open-ended bucket are reported as
+    the largest finite bound. None when there are no observations.
+    """
+    buckets = sorted(buckets)
+    if not buckets or not buckets[-1][1]:
+        return None
+    rank = q * buckets[-1][1]
+    lower_bound, lower_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == math.inf:
+                return lower_bound
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return lower_bound
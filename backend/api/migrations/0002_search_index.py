@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+FTS_TABLE = 'api_search_index'
+
+
+def fts5_supported(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return False
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+    return 'ENABLE_FTS5' in options
+
+
+def create_search_index(apps, schema_editor):
+    """Create the FTS5 table and index existing catalog rows (SQLite only)"""
+    if not fts5_supported(schema_editor):
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, body, tags, tokenize = 'porter unicode61')"
+        )
+        # rowid = pk * 8 + document type, see api.search.DOCUMENT_TYPES
+        for code, model_name, body, tags in [
+            (1, 'CareerPath', 'description', 'required_skills'),
+            (2, 'CareerResource', 'content', 'tags'),
+        ]:
+            model = apps.get_model('api', model_name)
+            rows = model.objects.using(schema_editor.connection.alias).filter(is_active=True).values_list(
+                'pk', 'title', body, tags
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, body, tags) VALUES (%s, %s, %s, %s)',
+                [
+                    (pk * 8 + code, title, text, ' '.join(str(tag) for tag in tag_list or []))
+                    for pk, title, text, tag_list in rows
+                ],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_assessmentresult_recommendation_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaterializedRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('career_title', models.CharField(max_length=200)),
+                ('career_category', models.CharField(max_length=100)),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assessment_result', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.assessmentresult')),
+                ('career', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='materialized_recommendations', to='api.careerpath')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['user', 'rank'], name='api_matrec_user_rank_idx'), models.Index(fields=['session_id', 'rank'], name='api_matrec_session_rank_idx')],
+            },
+        ),
+    ]
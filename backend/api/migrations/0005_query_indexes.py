@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_materializedrecommendation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assessmentresult',
+            index=models.Index(fields=['user', '-completed_at'], name='api_result_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessmentresult',
+            index=models.Index(fields=['session_id', '-completed_at'], name='api_result_session_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessmentresult',
+            index=models.Index(fields=['recommendation_status'], name='api_result_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerassessment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['title'], name='api_assessment_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerpath',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['title'], name='api_career_active_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerpath',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'title'], name='api_career_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerpath',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['education_level', 'title'], name='api_career_education_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerpath',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['work_environment', 'title'], name='api_career_environment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerpath',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['growth_outlook', 'title'], name='api_career_growth_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerresource',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-is_featured', 'title'], name='api_resource_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerresource',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'title'], name='api_resource_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerresource',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['resource_type', 'title'], name='api_resource_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='careerresource',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['difficulty_level', 'title'], name='api_resource_difficulty_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+# Mirrors api.facets.FACET_FIELDS
+FACET_FIELDS = {
+    'CareerPath': ('category', 'education_level', 'growth_outlook', 'work_environment'),
+    'CareerResource': ('category', 'resource_type', 'difficulty_level'),
+}
+
+
+def count_facets(apps, schema_editor):
+    """Count the facets of existing active catalog rows"""
+    FacetCount = apps.get_model('api', 'FacetCount')
+    db_alias = schema_editor.connection.alias
+    rows = []
+    for model_name, fields in FACET_FIELDS.items():
+        model = apps.get_model('api', model_name)
+        label = f'api.{model_name.lower()}'
+        for field in fields:
+            counts = model.objects.using(db_alias).filter(is_active=True).order_by().values(field).annotate(
+                count=models.Count('pk')
+            )
+            rows.extend(
+                FacetCount(model=label, field=field, value=row[field], count=row['count']) for row in counts
+            )
+    FacetCount.objects.using(db_alias).bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('field', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['model', 'field', 'value'],
+                'constraints': [models.UniqueConstraint(fields=('model', 'field', 'value'), name='api_facetcount_unique')],
+            },
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_facetcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarCareer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('career', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='similar_careers', to='api.careerpath')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.careerpath')),
+            ],
+            options={
+                'ordering': ['career_id', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('career', 'rank'), name='api_similarcareer_rank_unique')],
+            },
+        ),
+    ]
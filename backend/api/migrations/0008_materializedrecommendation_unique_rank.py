@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_ranks(apps, schema_editor):
+    # Rows are derived data: owners with duplicate ranks are recomputed on their next read
+    MaterializedRecommendation = apps.get_model('api', 'MaterializedRecommendation')
+    rows = MaterializedRecommendation.objects.using(schema_editor.connection.alias)
+    for owner in ('user', 'session_id'):
+        duplicated = rows.exclude(**{f'{owner}__isnull': True}).order_by().values(owner, 'rank').annotate(
+            copies=Count('id')
+        ).filter(copies__gt=1).values_list(owner, flat=True)
+        rows.filter(**{f'{owner}__in': list(duplicated)}).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_similarcareer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_ranks, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='materializedrecommendation',
+            name='api_matrec_user_rank_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='materializedrecommendation',
+            name='api_matrec_session_rank_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='materializedrecommendation',
+            constraint=models.UniqueConstraint(fields=('user', 'rank'), name='api_matrec_user_rank_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='materializedrecommendation',
+            constraint=models.UniqueConstraint(fields=('session_id', 'rank'), name='api_matrec_session_rank_unique'),
+        ),
+    ]
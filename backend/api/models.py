@@ -50,6 +50,24 @@ class CareerPath(models.Model):
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            # Partial indexes: list queries only ever read active careers
+            models.Index(fields=['title'], name='api_career_active_title_idx', condition=models.Q(is_active=True)),
+            models.Index(
+                fields=['category', 'title'], name='api_career_category_idx', condition=models.Q(is_active=True)
+            ),
+            models.Index(
+                fields=['education_level', 'title'], name='api_career_education_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=['work_environment', 'title'], name='api_career_environment_idx',
+                condition=models.Q(is_active=True),
+            ),
+            models.Index(
+                fields=['growth_outlook', 'title'], name='api_career_growth_idx', condition=models.Q(is_active=True)
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -67,6 +85,9 @@ class CareerAssessment(models.Model):
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['title'], name='api_assessment_active_idx', condition=models.Q(is_active=True)),
+        ]
 
     def __str__(self):
         return self.title
@@ -79,13 +100,23 @@ class AssessmentResult(models.Model):
     answers = models.JSONField(default=list)  # User's answers
     recommended_careers = models.JSONField(default=list)  # Recommended career paths
     session_id = models.CharField(max_length=100, null=True, blank=True)  # For anonymous users
+    recommendation_status = models.CharField(max_length=20, choices=[
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ], default='ready')
     completed_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-completed_at']
+        indexes = [
+            models.Index(fields=['user', '-completed_at'], name='api_result_user_idx'),
+            models.Index(fields=['session_id', '-completed_at'], name='api_result_session_idx'),
+            models.Index(fields=['recommendation_status'], name='api_result_status_idx'),
+        ]
 
     def __str__(self):
-        user_identifier = self.user.username if self.user else f"Anonymous ({self.session_id})"
+        user_identifier = self.user.username if self.user_id else f"Anonymous ({self.session_id})"
         return f"{self.assessment.title} - {user_identifier}"
 
 
@@ -123,6 +154,21 @@ class CareerResource(models.Model):
 
     class Meta:
         ordering = ['-is_featured', 'title']
+        indexes = [
+            models.Index(
+                fields=['-is_featured', 'title'], name='api_resource_featured_idx', condition=models.Q(is_active=True)
+            ),
+            models.Index(
+                fields=['category', 'title'], name='api_resource_category_idx', condition=models.Q(is_active=True)
+            ),
+            models.Index(
+                fields=['resource_type', 'title'], name='api_resource_type_idx', condition=models.Q(is_active=True)
+            ),
+            models.Index(
+                fields=['difficulty_level', 'title'], name='api_resource_difficulty_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -152,4 +198,64 @@ class UserProfile(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.user.username}'s Profile"
\ No newline at end of file
+        return f"{self.user.username}'s Profile"
+
+
+class MaterializedRecommendation(models.Model):
+    """Ranked career recommendation kept ready to read for a user or anonymous session"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    session_id = models.CharField(max_length=100, null=True, blank=True)
+    career = models.ForeignKey(CareerPath, on_delete=models.CASCADE, related_name='materialized_recommendations')
+    career_title = models.CharField(max_length=200)  # Denormalized from career
+    career_category = models.CharField(max_length=100)  # Denormalized from career
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    assessment_result = models.ForeignKey(AssessmentResult, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['rank']
+        # Also the indexes behind owner lookups; NULL owners never collide
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'rank'], name='api_matrec_user_rank_unique'),
+            models.UniqueConstraint(fields=['session_id', 'rank'], name='api_matrec_session_rank_unique'),
+        ]
+
+    def __str__(self):
+        owner = f"user {self.user_id}" if self.user_id else f"session {self.session_id}"
+        return f"#{self.rank} {self.career_title} for {owner}"
+
+
+class FacetCount(models.Model):
+    """Number of active catalog rows per facet value, kept current by signal handlers"""
+    model = models.CharField(max_length=100)  # Model label, e.g. "api.careerpath"
+    field = models.CharField(max_length=100)
+    value = models.CharField(max_length=100)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['model', 'field', 'value']
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'field', 'value'], name='api_facetcount_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.model}.{self.field}={self.value}: {self.count}"
+
+
+class SimilarCareer(models.Model):
+    """Precomputed nearest neighbour of a career path (see api.similarity)"""
+    # The unique (career, rank) index serves lookups by career
+    career = models.ForeignKey(CareerPath, on_delete=models.CASCADE, related_name='similar_careers', db_index=False)
+    similar = models.ForeignKey(CareerPath, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['career_id', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['career', 'rank'], name='api_similarcareer_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} for career {self.career_id}: career {self.similar_id} ({self.score:.3f})"
@@ -0,0 +1,202 @@
+"""
+Keyset (seek) pagination.
+
+``PageNumberPagination`` runs ``COUNT(*)`` and ``OFFSET``, so each page costs
+more the deeper a client goes. Keyset pagination instead remembers the sort
+key of the last row in an opaque cursor and asks for the rows strictly after
+it (``WHERE (completed_at, id) < (...)``), which an index can answer directly
+no matter how deep the page is. No count query is issued.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite, tie-broken sort key.
+
+    The key comes from the view's ``keyset_ordering`` (e.g.
+    ``('-completed_at', 'id')``), or from the ``?ordering=`` the client asked
+    for; ``id`` is appended when missing so the key is always unique. NULLs
+    sort first in ascending and last in descending order on every database.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering_param = api_settings.ORDERING_PARAM
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        cursor = self.decode_cursor(request)
+
+        reverse = False
+        if cursor is not None:
+            values, reverse = cursor
+            queryset = queryset.filter(self.seek_filter(queryset.model, values, reverse))
+
+        queryset = queryset.order_by(*self.order_expressions(reverse))
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        order_by = queryset.query.order_by
+        if (request.query_params.get(self.ordering_param) and order_by
+                and all(isinstance(field, str) for field in order_by)):
+            fields = list(order_by)
+        else:
+            fields = list(getattr(view, 'keyset_ordering', None) or ['id'])
+        fields = [field.replace('pk', 'id') if field.lstrip('-') == 'pk' else field for field in fields]
+        if not any(field.lstrip('-') == 'id' for field in fields):
+            fields.append('id')
+        return tuple(fields)
+
+    def order_expressions(self, reverse=False):
+        expressions = []
+        for field in self.ordering:
+            descending = field.startswith('-') != reverse
+            column = F(field.lstrip('-'))
+            expressions.append(column.desc(nulls_last=True) if descending else column.asc(nulls_first=True))
+        return expressions
+
+    def seek_filter(self, model, values, reverse):
+        """Rows strictly after ``values`` in the (possibly reversed) key order"""
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q(pk__in=[])
+        equal_prefix = Q()
+        for field, raw_value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            try:
+                value = None if raw_value is None else model._meta.get_field(name).to_python(raw_value)
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+
+            if value is None:
+                after = Q(**{f'{name}__isnull': False}) if not descending else None
+                equal = Q(**{f'{name}__isnull': True})
+            else:
+                after = Q(**{f'{name}__lt': value}) | Q(**{f'{name}__isnull': True}) if descending \
+                    else Q(**{f'{name}__gt': value})
+                equal = Q(**{name: value})
+
+            if after is not None:
+                condition |= equal_prefix & after
+            equal_prefix &= equal
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if payload['o'] != list(self.ordering):
+                raise ValueError
+            return payload['v'], bool(payload.get('r'))
+        except (TypeError, KeyError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field in self.ordering:
+            name = field.lstrip('-')
+            # Rows are model instances or values() dicts
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            values.append(value)
+        payload = json.dumps({'o': list(self.ordering), 'v': values, 'r': reverse}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PageOrKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset pagination on request.
+
+    Clients opt in with ``?pagination=keyset`` (or by following a link that
+    carries a ``cursor``); every other request keeps the ``count``/``page``
+    response format.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (request.query_params.get(self.mode_query_param) == 'keyset'
+                or self.keyset_class.cursor_query_param in request.query_params):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
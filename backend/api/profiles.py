@@ -0,0 +1,94 @@
+"""
+The "me" read model: a user's profile, current career path, latest
+assessment result and top recommendations in one response.
+
+``load_profile`` reads the profile with its user and career path joined
+in, and prefetches the latest result and the top materialized
+recommendations (one query each). A missing profile is created with
+``get_or_create``, which stays correct when two first requests race on the
+unique ``user`` column.
+
+``me_payload`` caches the serialized response per user, stamped with the
+user's generation (bumped when the user, profile, results or
+recommendations change) and the CareerPath generation (career edits patch
+recommendations without signals). A load that itself wrote (creating the
+profile, materializing recommendations) bumped the user generation, so the
+entry is stamped with the generation read after it instead. Users whose
+answers match no career are remembered as such by the recommendations
+module, so their summary is cached like any other and reads write nothing.
+"""
+from django.db.models import Prefetch
+
+from .caching import get_generation, get_user_generation, response_cache
+from .models import AssessmentResult, CareerPath, MaterializedRecommendation, UserProfile
+from .recommendations import known_empty, refresh_owner
+from .serializers import AssessmentResultSerializer, MaterializedRecommendationSerializer, UserProfileSerializer
+
+
+ME_KEY = 'api:me:{}'
+
+ME_RECOMMENDATION_LIMIT = 5
+
+
+def profile_queryset(user):
+    return UserProfile.objects.filter(user=user).select_related('user', 'current_career_path').prefetch_related(
+        Prefetch(
+            'user__assessmentresult_set',
+            queryset=AssessmentResult.objects.select_related('assessment').order_by('-completed_at', '-id')[:1],
+            to_attr='latest_results',
+        ),
+        Prefetch(
+            'user__materializedrecommendation_set',
+            queryset=MaterializedRecommendation.objects.order_by('rank')[:ME_RECOMMENDATION_LIMIT],
+            to_attr='top_recommendations',
+        ),
+    )
+
+
+def load_profile(user):
+    """
+    The user's profile, created if missing, and whether it was created.
+
+    ``latest_results`` and ``top_recommendations`` are prefetched on its user.
+    """
+    profile = profile_queryset(user).first()
+    if profile is not None:
+        return profile, False
+    UserProfile.objects.get_or_create(user=user)
+    return profile_queryset(user).get(), True
+
+
+def me_data(profile):
+    """The "me" response of a loaded profile, and whether recommendations had to be materialized"""
+    user = profile.user
+    latest_result = user.latest_results[0] if user.latest_results else None
+    recommendations = user.top_recommendations
+    refreshed = (
+        not recommendations and latest_result is not None and not known_empty(user.pk, result_id=latest_result.pk)
+    )
+    if refreshed:
+        # Not materialized yet, or dropped after a bulk write
+        recommendations = refresh_owner(user.pk)[:ME_RECOMMENDATION_LIMIT]
+    return {
+        'profile': UserProfileSerializer(profile).data,
+        'latest_result': AssessmentResultSerializer(latest_result).data if latest_result is not None else None,
+        'recommendations': MaterializedRecommendationSerializer(recommendations, many=True).data,
+    }, refreshed
+
+
+def me_payload(user):
+    """The "me" response of a user, from the cache while none of its rows changed"""
+    cache = response_cache()
+    key = ME_KEY.format(user.pk)
+    # Read the stamp before loading, so a write during the load leaves the entry stale
+    stamp = (get_user_generation(user.pk), get_generation(CareerPath))
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    profile, created = load_profile(user)
+    data, refreshed = me_data(profile)
+    if created or refreshed:
+        # Our own writes moved the user generation; the data already reflects them
+        stamp = (get_user_generation(user.pk), stamp[1])
+    cache.set(key, (stamp, data))
+    return data
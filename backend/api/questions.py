@@ -0,0 +1,139 @@
+"""
+Compiled assessment question schemas.
+
+``CareerAssessment.questions`` is free-form JSON. Before answers reach the
+recommendation scorer they are checked against a compiled form of it: a map
+from question ID to answer type and option set, built once per assessment
+version (its ``updated_at``) and kept in a small in-process LRU cache, so
+validating a submission needs no database queries and a single pass over
+the answers. Payloads with too many answers, unknown options or oversized
+strings are rejected up front, which bounds the work the scorer can be made
+to do.
+"""
+import threading
+from collections import OrderedDict
+
+
+# Upper bounds applied to every submission
+MAX_SUBMISSION_BYTES = 64 * 1024
+MAX_TEXT_ANSWER_LENGTH = 500
+# Used when an assessment defines no questions
+MAX_FREEFORM_ANSWERS = 50
+
+MULTI_CHOICE_TYPES = ('multiple_select', 'checkbox')
+
+SCHEMA_CACHE_SIZE = 128
+
+
+class QuestionSpec:
+    """Answer type and allowed options of a single question"""
+
+    def __init__(self, question_id, answer_type, options):
+        self.question_id = question_id
+        self.answer_type = answer_type
+        self.options = frozenset(str(option) for option in options) if options else None
+
+    def errors(self, answer):
+        label = f'Question {self.question_id}'
+        if answer is None:
+            return []
+        if self.answer_type in MULTI_CHOICE_TYPES:
+            if not isinstance(answer, list):
+                return [f'{label}: expected a list of options.']
+            limit = len(self.options) if self.options is not None else MAX_FREEFORM_ANSWERS
+            if len(answer) > limit:
+                return [f'{label}: too many selections.']
+            if len(set(map(str, answer))) != len(answer):
+                return [f'{label}: duplicate selections.']
+            return [error for choice in answer for error in self.choice_errors(label, choice)]
+        return self.choice_errors(label, answer)
+
+    def choice_errors(self, label, choice):
+        if not isinstance(choice, (str, int, float)) or isinstance(choice, bool):
+            return [f'{label}: expected a string answer.']
+        if self.options is not None:
+            if str(choice) not in self.options:
+                return [f'{label}: "{str(choice)[:50]}" is not a valid option.']
+        elif len(str(choice)) > MAX_TEXT_ANSWER_LENGTH:
+            return [f'{label}: answer is longer than {MAX_TEXT_ANSWER_LENGTH} characters.']
+        return []
+
+
+class CompiledQuestionSchema:
+    """Validates answer payloads for one version of an assessment"""
+
+    def __init__(self, questions):
+        self.questions = OrderedDict()
+        for position, question in enumerate(questions if isinstance(questions, list) else []):
+            if not isinstance(question, dict):
+                continue
+            question_id = str(question.get('id', position + 1))
+            options = question.get('options')
+            answer_type = question.get('type') or ('multiple_choice' if options else 'text')
+            self.questions[question_id] = QuestionSpec(
+                question_id, answer_type, options if isinstance(options, list) else None
+            )
+        self.ordered = list(self.questions.values())
+
+    def errors(self, answers):
+        """
+        Validation errors for an answer payload (an empty list when valid).
+
+        Answers are either a list in question order or an object keyed by
+        question ID; unanswered questions may be omitted or null.
+        """
+        if not isinstance(answers, (list, dict)):
+            return ['Must be a list of answers or an object keyed by question id.']
+        if not answers:
+            return ['At least one answer is required.']
+
+        if not self.ordered:
+            return self.freeform_errors(answers)
+
+        if len(answers) > len(self.ordered):
+            return [f'Expected at most {len(self.ordered)} answers.']
+        if isinstance(answers, dict):
+            pairs = []
+            for question_id, answer in answers.items():
+                spec = self.questions.get(str(question_id))
+                if spec is None:
+                    return [f'Unknown question id "{str(question_id)[:50]}".']
+                pairs.append((spec, answer))
+        else:
+            pairs = zip(self.ordered, answers)
+        return [error for spec, answer in pairs for error in spec.errors(answer)]
+
+    @staticmethod
+    def freeform_errors(answers):
+        """Size limits for assessments that do not describe their questions"""
+        values = answers.values() if isinstance(answers, dict) else answers
+        if len(answers) > MAX_FREEFORM_ANSWERS:
+            return [f'Expected at most {MAX_FREEFORM_ANSWERS} answers.']
+        spec = QuestionSpec('answer', 'multiple_select', None)
+        for value in values:
+            if value is None:
+                continue
+            errors = spec.errors(value) if isinstance(value, list) else spec.choice_errors('Answer', value)
+            if errors:
+                return errors
+        return []
+
+
+_schemas = OrderedDict()
+_schemas_lock = threading.Lock()
+
+
+def compile_questions(assessment):
+    """Compiled schema for an assessment, cached per (id, updated_at)"""
+    key = (assessment.pk, assessment.updated_at)
+    with _schemas_lock:
+        schema = _schemas.get(key)
+        if schema is not None:
+            _schemas.move_to_end(key)
+            return schema
+    schema = CompiledQuestionSchema(assessment.questions)
+    with _schemas_lock:
+        _schemas[key] = schema
+        while len(_schemas) > SCHEMA_CACHE_SIZE:
+            _schemas.popitem(last=False)
+    return schema
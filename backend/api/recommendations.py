@@ -0,0 +1,194 @@
+"""
+Materialized per-user recommendations.
+
+Each user (or anonymous session) has up to ``MATERIALIZED_LIMIT`` ranked
+MaterializedRecommendation rows holding the career ID, score and a
+denormalized title/category. Reading "my recommendations" is then a
+single indexed lookup on (user, rank) or (session_id, rank) with no
+re-scoring and no CareerPath joins.
+
+Rows are recomputed only for the owner affected by a change: a new
+AssessmentResult, a change to the UserProfile skills or interests, or a
+change to a CareerPath they reference. Title and category edits are
+patched in place with one UPDATE; owners listing a career whose scored
+fields changed (``SCORED_FIELDS``) are recomputed, so stored scores and
+ranks never lag behind the catalog. Owners without rows are materialized
+lazily on first read, which also covers results created by bulk_create.
+Owners whose inputs match nothing get no rows; that outcome is remembered
+in the cache for the catalog generation and latest result it was computed
+from, so reading it again does not recompute or write. A recompute that
+yields the rows already stored writes nothing and leaves the owner's
+generation alone, so cached "me" responses stay valid.
+
+The unique (user, rank) and (session_id, rank) constraints keep concurrent
+refreshes of one owner from interleaving into duplicate ranks; the refresh
+that loses the race keeps the rows of the one that won.
+"""
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Q, Subquery
+
+from .caching import bump_user_generation, get_generation
+from .matching import matcher
+from .models import AssessmentResult, CareerPath, MaterializedRecommendation, UserProfile
+
+
+MATERIALIZED_LIMIT = 10
+
+EMPTY_KEY = 'api:recommendations:empty:{}:{}'
+
+
+def owner_filter(user_id=None, session_id=None):
+    if user_id is not None:
+        return {'user_id': user_id}
+    if session_id:
+        return {'user__isnull': True, 'session_id': session_id}
+    return None
+
+
+def empty_key(user_id=None, session_id=None):
+    return EMPTY_KEY.format('user', user_id) if user_id is not None else EMPTY_KEY.format('session', session_id)
+
+
+def latest_results(user_id=None, session_id=None):
+    return AssessmentResult.objects.filter(**owner_filter(user_id, session_id)).order_by('-completed_at', '-id')
+
+
+def known_empty(user_id=None, session_id=None, result_id=None):
+    """Whether the owner has no recommendations for the current catalog and its latest result ``result_id``"""
+    return cache.get(empty_key(user_id, session_id)) == (get_generation(CareerPath), result_id)
+
+
+def row_values(row):
+    return (row.career_id, row.career_title, row.career_category, row.score, row.rank, row.assessment_result_id)
+
+
+def recommendation_inputs(user_id=None, session_id=None):
+    """Latest assessment result plus profile skills/interests of an owner"""
+    latest = latest_results(user_id, session_id).values_list('id', 'answers').first()
+    result_id, answers = latest if latest else (None, [])
+    payload = [answers]
+    if user_id is not None:
+        profile = UserProfile.objects.filter(user_id=user_id).values_list('skills', 'interests').first()
+        if profile:
+            payload.extend(profile)
+    return result_id, payload
+
+
+def refresh_owner(user_id=None, session_id=None):
+    """Recompute and store the recommendations of one user or session"""
+    owner = owner_filter(user_id, session_id)
+    if owner is None:
+        return []
+    # Read before the catalog, so a career change during the refresh leaves the empty marker stale
+    generation = get_generation(CareerPath)
+    result_id, payload = recommendation_inputs(user_id, session_id)
+    recommendations = [
+        recommendation for recommendation in matcher.recommend(payload, limit=MATERIALIZED_LIMIT)
+        if recommendation['score'] > 0
+    ]
+    rows = [
+        MaterializedRecommendation(
+            user_id=user_id,
+            session_id=None if user_id is not None else session_id,
+            career_id=recommendation['id'],
+            career_title=recommendation['title'],
+            career_category=recommendation['category'],
+            score=recommendation['score'],
+            rank=rank,
+            assessment_result_id=result_id,
+        )
+        for rank, recommendation in enumerate(recommendations, start=1)
+    ]
+    current = list(MaterializedRecommendation.objects.filter(**owner).order_by('rank'))
+    if list(map(row_values, current)) == list(map(row_values, rows)):
+        if not rows:
+            cache.set(empty_key(user_id, session_id), (generation, result_id))
+        return current
+    try:
+        with transaction.atomic():
+            MaterializedRecommendation.objects.filter(**owner).delete()
+            MaterializedRecommendation.objects.bulk_create(rows)
+    except IntegrityError:
+        # A concurrent refresh of the same owner stored its rows first
+        return list(MaterializedRecommendation.objects.filter(**owner).order_by('rank'))
+    if rows:
+        cache.delete(empty_key(user_id, session_id))
+    else:
+        cache.set(empty_key(user_id, session_id), (generation, result_id))
+    bump_user_generation(user_id)
+    return rows
+
+
+def get_recommendations(user_id=None, session_id=None):
+    """Materialized recommendations of an owner, best first"""
+    owner = owner_filter(user_id, session_id)
+    if owner is None:
+        return []
+    rows = list(MaterializedRecommendation.objects.filter(**owner).order_by('rank'))
+    if not rows:
+        result_id = latest_results(user_id, session_id).values_list('id', flat=True).first()
+        if known_empty(user_id, session_id, result_id):
+            return rows
+        rows = refresh_owner(user_id, session_id)
+    return rows
+
+
+def owners_of_career(career_id):
+    """Distinct (user_id, session_id) owners whose recommendations include a career"""
+    return set(
+        MaterializedRecommendation.objects.filter(career_id=career_id).values_list('user_id', 'session_id')
+    )
+
+
+def refresh_owners(owners):
+    for user_id, session_id in owners:
+        refresh_owner(user_id, session_id)
+
+
+def update_career(career, rescore=False):
+    """
+    Patch denormalized fields after a career changed; returns owners needing a recompute.
+
+    ``rescore`` tells that a scored field changed, which makes the owners
+    listing the career stale as well as a deactivation does.
+    """
+    if not career.is_active:
+        return owners_of_career(career.pk)
+    MaterializedRecommendation.objects.filter(career_id=career.pk).exclude(
+        career_title=career.title, career_category=career.category
+    ).update(career_title=career.title, career_category=career.category)
+    return owners_of_career(career.pk) if rescore else set()
+
+
+def sync_careers(career_ids, rescored_ids=(), chunk_size=500):
+    """
+    Bulk version of ``update_career`` for careers changed without signals.
+
+    ``rescored_ids`` are the careers among them whose scored fields changed.
+    """
+    career_ids = list(career_ids)
+    rescored_ids = set(rescored_ids)
+    careers = CareerPath.objects.filter(pk=OuterRef('career_id'))
+    owners = set()
+    for start in range(0, len(career_ids), chunk_size):
+        chunk = career_ids[start:start + chunk_size]
+        MaterializedRecommendation.objects.filter(career_id__in=chunk).update(
+            career_title=Subquery(careers.values('title')[:1]),
+            career_category=Subquery(careers.values('category')[:1]),
+        )
+        inactive = CareerPath.objects.filter(pk__in=chunk, is_active=False).values('pk')
+        rescored = [career_id for career_id in chunk if career_id in rescored_ids]
+        owners.update(
+            MaterializedRecommendation.objects.filter(Q(career_id__in=inactive) | Q(career_id__in=rescored))
+            .values_list('user_id', 'session_id')
+        )
+    refresh_owners(owners)
+
+
+def invalidate_sessions(session_ids):
+    """Drop materialized rows of anonymous sessions so they are rebuilt on next read"""
+    session_ids = [session_id for session_id in set(session_ids) if session_id]
+    if session_ids:
+        MaterializedRecommendation.objects.filter(user__isnull=True, session_id__in=session_ids).delete()
+
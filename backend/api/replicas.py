@@ -0,0 +1,134 @@
+"""
+Read replicas for the catalog.
+
+``ReplicaRouter`` sends reads of the catalog models (careers, resources,
+assessments and their facet counts) to one of the aliases in
+``API_DB_REPLICAS``, picked at random. Everything else, and every write,
+goes to the primary (``default``).
+
+Replicas lag behind the primary, so a client that just wrote must not read
+from them: ``PrimaryPinMiddleware`` pins unsafe requests (POST, PATCH, ...)
+to the primary, and any request that wrote sets a short-lived cookie that
+pins the same client's next requests for ``API_DB_PIN_SECONDS``. Within a
+thread, the first write pins the rest of the request (or command) too;
+``mark_writes`` watches the statements run on the primary, so a request
+that only looked a row up through ``get_or_create`` stays unpinned.
+``use_primary()`` pins code that must see current data, such as the
+in-process indexes built from the catalog.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+
+PRIMARY = DEFAULT_DB_ALIAS
+
+# Models read from the replicas; app_label.model_name
+REPLICA_MODELS = frozenset({
+    'api.careerpath', 'api.careerresource', 'api.careerassessment', 'api.facetcount',
+})
+
+PIN_COOKIE = 'primary_pin'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_state = threading.local()
+
+
+def replica_aliases():
+    return getattr(settings, 'API_DB_REPLICAS', ())
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', 0) > 0 or getattr(_state, 'wrote', False)
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+def reset_pin():
+    _state.pinned = 0
+    _state.wrote = False
+
+
+@contextmanager
+def use_primary(pinned=True):
+    """Read everything from the primary inside the block"""
+    if not pinned:
+        yield
+        return
+    _state.pinned = getattr(_state, 'pinned', 0) + 1
+    try:
+        yield
+    finally:
+        _state.pinned -= 1
+
+
+def mark_writes(execute, sql, params, many, context):
+    """Execute wrapper of the primary connection: read-your-writes once a statement writes"""
+    if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        _state.wrote = True
+    return execute(sql, params, many, context)
+
+
+class ReplicaRouter:
+    """Catalog reads to a random replica unless pinned; writes and other reads to the primary"""
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or model._meta.label_lower not in REPLICA_MODELS or is_pinned():
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Also asked by reads that might write (get_or_create), so writes are marked by mark_writes
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary and are never migrated themselves
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class PrimaryPinMiddleware:
+    """
+    Pins requests to the primary after a write.
+
+    Unsafe methods and requests carrying the pin cookie read from the
+    primary; a request that wrote sets the cookie. Not used when there are
+    no replicas.
+    """
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reset_pin()
+        pinned = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        try:
+            with use_primary(pinned):
+                response = self.get_response(request)
+            if has_written() or (request.method not in SAFE_METHODS and response.status_code < 400):
+                response.set_cookie(
+                    PIN_COOKIE, '1', max_age=getattr(settings, 'API_DB_PIN_SECONDS', 10),
+                    httponly=True, samesite='Lax',
+                )
+        finally:
+            reset_pin()
+        return response
@@ -0,0 +1,258 @@
+"""
+Salary band index over CareerPath.salary_range_min/max.
+
+Active careers are kept in two sorted arrays: bands ordered by their lower
+bound and bands ordered by their upper bound. Range queries are two
+``bisect`` calls plus a walk over the smaller candidate slice, and histogram
+buckets are counted with bisects alone, so neither touches the career table.
+
+A band with only one bound set is treated as a single salary; careers with
+neither bound are not indexed. Like the skill index, it is built lazily,
+rebuilt on the next use after the CareerPath generation moves (including
+writes made by other processes when the cache is shared), and patched in
+place by the CareerPath save/delete signals of the process that wrote.
+"""
+import bisect
+import threading
+
+from django.db.models import Q
+from django.db.models.functions import Coalesce, Greatest, Least
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .caching import get_generation
+from .models import CareerPath
+from .replicas import PRIMARY
+
+
+SALARY_MATCHES = ('overlap', 'within')
+
+DEFAULT_BUCKET_SIZE = 10000
+MAX_BUCKETS = 100
+
+# Above this many matching IDs the range is applied as a SQL predicate
+# instead of a pk__in list (SQLite caps the number of query parameters)
+MAX_ID_FILTER = 5000
+
+
+def salary_band(salary_min, salary_max):
+    """(low, high) of a career's band, or None when neither bound is set"""
+    if salary_min is None and salary_max is None:
+        return None
+    low = salary_min if salary_min is not None else salary_max
+    high = salary_max if salary_max is not None else salary_min
+    return (low, high) if low <= high else (high, low)
+
+
+class SalaryIndex:
+    """Sorted lower and upper salary bounds of the active careers"""
+
+    def __init__(self):
+        self._bands = None
+        self._lows = []
+        self._highs = []
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _ensure_built(self):
+        if self._bands is None or self._version != get_generation(CareerPath):
+            self._build()
+
+    def _build(self):
+        # Read before the rows, so a write during the read leaves the index stale
+        version = get_generation(CareerPath)
+        bands = {}
+        rows = CareerPath.objects.using(PRIMARY).filter(is_active=True).values_list(
+            'id', 'salary_range_min', 'salary_range_max'
+        )
+        for career_id, salary_min, salary_max in rows.iterator(chunk_size=2000):
+            band = salary_band(salary_min, salary_max)
+            if band is not None:
+                bands[career_id] = band
+        self._bands = bands
+        self._lows = sorted((low, career_id) for career_id, (low, _) in bands.items())
+        self._highs = sorted((high, career_id) for career_id, (_, high) in bands.items())
+        self._version = version
+
+    def rebuild(self):
+        """Rebuild the arrays from the active career paths"""
+        with self._lock:
+            self._build()
+
+    def invalidate(self):
+        """Drop the index so it is rebuilt on next use"""
+        with self._lock:
+            self._bands = None
+            self._lows = []
+            self._highs = []
+
+    def _remove(self, career_id):
+        band = self._bands.pop(career_id, None)
+        if band is None:
+            return
+        for array, value in ((self._lows, band[0]), (self._highs, band[1])):
+            position = bisect.bisect_left(array, (value, career_id))
+            if position < len(array) and array[position] == (value, career_id):
+                del array[position]
+
+    def update_career(self, career):
+        """Re-index a single career after it was saved"""
+        fields = ('is_active', 'salary_range_min', 'salary_range_max')
+        with self._lock:
+            if self._bands is None:
+                return
+            if any(field not in career.__dict__ for field in fields):
+                # Saved with deferred fields; their values are unknown here
+                self._bands = None
+                return
+            self._remove(career.pk)
+            band = salary_band(career.salary_range_min, career.salary_range_max) if career.is_active else None
+            if band is None:
+                return
+            self._bands[career.pk] = band
+            bisect.insort(self._lows, (band[0], career.pk))
+            bisect.insort(self._highs, (band[1], career.pk))
+
+    def remove_career(self, career_id):
+        """Drop a deleted career from the arrays"""
+        with self._lock:
+            if self._bands is not None:
+                self._remove(career_id)
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_built()
+            return len(self._bands)
+
+    def search(self, low=None, high=None, match='overlap'):
+        """
+        IDs of careers whose band overlaps ``[low, high]`` or lies within it.
+
+        Either bound may be None for an open-ended range.
+        """
+        if match not in SALARY_MATCHES:
+            raise ValueError(f"Unknown salary match '{match}'")
+        if match == 'overlap':
+            # band low <= high and band high >= low
+            low_ok = lambda band: low is None or band[1] >= low
+            high_ok = lambda band: high is None or band[0] <= high
+        else:
+            # band low >= low and band high <= high
+            low_ok = lambda band: low is None or band[0] >= low
+            high_ok = lambda band: high is None or band[1] <= high
+
+        with self._lock:
+            self._ensure_built()
+            if match == 'overlap':
+                by_low = self._lows[:bisect.bisect_right(self._lows, (high, float('inf')))] if high is not None else None
+                by_high = self._highs[bisect.bisect_left(self._highs, (low, -1)):] if low is not None else None
+            else:
+                by_low = self._lows[bisect.bisect_left(self._lows, (low, -1)):] if low is not None else None
+                by_high = self._highs[:bisect.bisect_right(self._highs, (high, float('inf')))] if high is not None else None
+
+            # Walk the smaller slice and check the other bound per career
+            if by_low is None and by_high is None:
+                return set(self._bands)
+            if by_high is None or (by_low is not None and len(by_low) <= len(by_high)):
+                return {career_id for _, career_id in by_low if low_ok(self._bands[career_id])}
+            return {career_id for _, career_id in by_high if high_ok(self._bands[career_id])}
+
+    def histogram(self, career_ids=None, bucket_size=DEFAULT_BUCKET_SIZE):
+        """
+        Buckets of ``bucket_size`` covering every indexed band.
+
+        Each bucket counts the careers whose band overlaps it, so a career
+        spanning several buckets is counted in each. ``career_ids`` limits the
+        counts to a subset of the index.
+        """
+        with self._lock:
+            self._ensure_built()
+            if career_ids is None:
+                lows = [low for low, _ in self._lows]
+                highs = [high for high, _ in self._highs]
+            else:
+                bands = [self._bands[career_id] for career_id in career_ids if career_id in self._bands]
+                lows = sorted(low for low, _ in bands)
+                highs = sorted(high for _, high in bands)
+
+        if not lows:
+            return []
+        start = lows[0] - lows[0] % bucket_size
+        end = highs[-1] - highs[-1] % bucket_size + bucket_size
+        if (end - start) // bucket_size > MAX_BUCKETS:
+            raise ValueError(f'More than {MAX_BUCKETS} buckets; use a larger bucket size.')
+        buckets = []
+        for bucket_low in range(start, end, bucket_size):
+            bucket_high = bucket_low + bucket_size
+            # Bands starting before the bucket ends, minus those that ended before it starts
+            count = bisect.bisect_left(lows, bucket_high) - bisect.bisect_left(highs, bucket_low)
+            buckets.append({'from': bucket_low, 'to': bucket_high, 'count': count})
+        return buckets
+
+
+salary_index = SalaryIndex()
+
+
+def salary_params(query_params):
+    """(low, high, match) from ``salary_min``/``salary_max``/``salary_match``; raises ValidationError"""
+    errors = {}
+    bounds = {}
+    for name in ('salary_min', 'salary_max'):
+        value = query_params.get(name, '').strip()
+        if not value:
+            bounds[name] = None
+            continue
+        try:
+            bounds[name] = int(value)
+            if bounds[name] < 0:
+                raise ValueError
+        except ValueError:
+            errors[name] = ['Must be a non-negative whole number.']
+    match = query_params.get('salary_match', 'overlap')
+    if match not in SALARY_MATCHES:
+        errors['salary_match'] = [f"Must be one of: {', '.join(SALARY_MATCHES)}"]
+    if not errors and None not in bounds.values() and bounds['salary_min'] > bounds['salary_max']:
+        errors['salary_max'] = ['Must not be less than salary_min.']
+    if errors:
+        raise ValidationError(errors)
+    return bounds['salary_min'], bounds['salary_max'], match
+
+
+def salary_predicate(low, high, match):
+    """The same range test as ``SalaryIndex.search``, as a database filter"""
+    # Mirrors salary_band: a missing bound copies the other, inverted bounds are swapped
+    lower = Coalesce('salary_range_min', 'salary_range_max')
+    upper = Coalesce('salary_range_max', 'salary_range_min')
+    band_low = Least(lower, upper)
+    band_high = Greatest(lower, upper)
+    condition = Q(salary_range_min__isnull=False) | Q(salary_range_max__isnull=False)
+    if match == 'overlap':
+        if low is not None:
+            condition &= Q(band_high__gte=low)
+        if high is not None:
+            condition &= Q(band_low__lte=high)
+    else:
+        if low is not None:
+            condition &= Q(band_low__gte=low)
+        if high is not None:
+            condition &= Q(band_high__lte=high)
+    return condition, {'band_low': band_low, 'band_high': band_high}
+
+
+class SalaryRangeFilter(BaseFilterBackend):
+    """
+    ``?salary_min=&salary_max=`` range filter backed by the salary index.
+
+    ``salary_match=overlap`` (default) keeps careers whose band overlaps the
+    range, ``salary_match=within`` those whose band lies inside it.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        low, high, match = salary_params(request.query_params)
+        if low is None and high is None:
+            return queryset
+        career_ids = salary_index.search(low, high, match)
+        if len(career_ids) <= MAX_ID_FILTER:
+            return queryset.filter(pk__in=career_ids)
+        condition, annotations = salary_predicate(low, high, match)
+        return queryset.alias(**annotations).filter(condition)
@@ -0,0 +1,303 @@
+"""
+Sample catalog data.
+
+``populate_sample_data`` loads these records as they are; ``generate_catalog``
+derives any number of synthetic variants from them for load tests and
+benchmarks (see ``benchmark_api``).
+"""
+import random
+
+from .catalog_import import refresh_derived_data
+from .models import AssessmentResult, CareerAssessment, CareerPath, CareerResource
+
+
+SAMPLE_CAREER_PATHS = [
+    {
+        'title': 'Software Developer',
+        'description': 'Design, develop, and maintain software applications and systems.',
+        'category': 'technology',
+        'salary_range_min': 60000,
+        'salary_range_max': 120000,
+        'education_level': 'bachelors',
+        'required_skills': ['Programming', 'Problem Solving', 'Teamwork', 'Communication'],
+        'growth_outlook': 'high',
+        'work_environment': 'office'
+    },
+    {
+        'title': 'Data Scientist',
+        'description': 'Analyze complex data to help organizations make informed decisions.',
+        'category': 'technology',
+        'salary_range_min': 70000,
+        'salary_range_max': 130000,
+        'education_level': 'masters',
+        'required_skills': ['Statistics', 'Python', 'Machine Learning', 'Data Visualization'],
+        'growth_outlook': 'high',
+        'work_environment': 'office'
+    },
+    {
+        'title': 'UX Designer',
+        'description': 'Create user-friendly and intuitive digital experiences.',
+        'category': 'technology',
+        'salary_range_min': 50000,
+        'salary_range_max': 100000,
+        'education_level': 'bachelors',
+        'required_skills': ['Design Thinking', 'Prototyping', 'User Research', 'Collaboration'],
+        'growth_outlook': 'high',
+        'work_environment': 'hybrid'
+    },
+    {
+        'title': 'Registered Nurse',
+        'description': 'Provide patient care and support in healthcare settings.',
+        'category': 'healthcare',
+        'salary_range_min': 50000,
+        'salary_range_max': 80000,
+        'education_level': 'bachelors',
+        'required_skills': ['Patient Care', 'Medical Knowledge', 'Empathy', 'Critical Thinking'],
+        'growth_outlook': 'high',
+        'work_environment': 'hospital'
+    },
+    {
+        'title': 'Marketing Manager',
+        'description': 'Develop and execute marketing strategies to promote products and services.',
+        'category': 'marketing',
+        'salary_range_min': 55000,
+        'salary_range_max': 110000,
+        'education_level': 'bachelors',
+        'required_skills': ['Strategic Thinking', 'Communication', 'Analytics', 'Creativity'],
+        'growth_outlook': 'medium',
+        'work_environment': 'office'
+    },
+    {
+        'title': 'Financial Analyst',
+        'description': 'Analyze financial data to help organizations make investment decisions.',
+        'category': 'finance',
+        'salary_range_min': 55000,
+        'salary_range_max': 95000,
+        'education_level': 'bachelors',
+        'required_skills': ['Financial Modeling', 'Excel', 'Analytical Thinking', 'Attention to Detail'],
+        'growth_outlook': 'medium',
+        'work_environment': 'office'
+    }
+]
+
+SAMPLE_ASSESSMENT = {
+    'title': 'Career Interest Assessment',
+    'description': 'Discover your career interests and find matching career paths.',
+    'instructions': 'Answer each question honestly based on your preferences and interests.',
+    'questions': [
+        {
+            'id': 1,
+            'question': 'What type of work environment do you prefer?',
+            'type': 'multiple_choice',
+            'options': [
+                'Office setting with regular hours',
+                'Remote work with flexible schedule',
+                'Field work with travel',
+                'Hospital or clinical setting',
+                'Laboratory or research facility'
+            ]
+        },
+        {
+            'id': 2,
+            'question': 'What activities do you enjoy most?',
+            'type': 'multiple_choice',
+            'options': [
+                'Solving complex problems',
+                'Creating and designing',
+                'Helping and caring for others',
+                'Analyzing data and numbers',
+                'Leading and managing teams'
+            ]
+        },
+        {
+            'id': 3,
+            'question': 'What is your preferred level of education?',
+            'type': 'multiple_choice',
+            'options': [
+                'High school diploma',
+                'Associate degree',
+                'Bachelor\'s degree',
+                'Master\'s degree',
+                'PhD or professional degree'
+            ]
+        },
+        {
+            'id': 4,
+            'question': 'Which skills do you feel most confident in?',
+            'type': 'multiple_select',
+            'options': [
+                'Programming and coding',
+                'Communication and writing',
+                'Mathematical analysis',
+                'Creative design',
+                'Medical knowledge',
+                'Leadership and management'
+            ]
+        },
+        {
+            'id': 5,
+            'question': 'What salary range are you targeting?',
+            'type': 'multiple_choice',
+            'options': [
+                '$30,000 - $50,000',
+                '$50,000 - $70,000',
+                '$70,000 - $90,000',
+                '$90,000 - $120,000',
+                '$120,000+'
+            ]
+        }
+    ]
+}
+
+SAMPLE_RESOURCES = [
+    {
+        'title': 'How to Write a Winning Resume',
+        'content': 'A comprehensive guide to crafting a professional resume that stands out to employers.',
+        'resource_type': 'guide',
+        'category': 'resume',
+        'difficulty_level': 'beginner',
+        'estimated_time': 60,
+        'tags': ['resume', 'job search', 'career'],
+        'is_featured': True
+    },
+    {
+        'title': 'Interview Preparation Checklist',
+        'content': 'Essential steps to prepare for any job interview and increase your chances of success.',
+        'resource_type': 'tool',
+        'category': 'interview',
+        'difficulty_level': 'beginner',
+        'estimated_time': 30,
+        'tags': ['interview', 'preparation', 'tips'],
+        'is_featured': True
+    },
+    {
+        'title': 'Building Your Professional Network',
+        'content': 'Strategies for networking effectively and building meaningful professional relationships.',
+        'resource_type': 'article',
+        'category': 'networking',
+        'difficulty_level': 'intermediate',
+        'estimated_time': 45,
+        'tags': ['networking', 'career development', 'relationships'],
+        'is_featured': False
+    },
+    {
+        'title': 'Career Planning Worksheet',
+        'content': 'A step-by-step worksheet to help you plan your career goals and track your progress.',
+        'resource_type': 'tool',
+        'category': 'career_planning',
+        'difficulty_level': 'beginner',
+        'estimated_time': 90,
+        'tags': ['career planning', 'goals', 'worksheet'],
+        'is_featured': True
+    },
+    {
+        'title': 'Technical Skills Assessment',
+        'content': 'Evaluate your technical skills and identify areas for improvement.',
+        'resource_type': 'tool',
+        'category': 'skills',
+        'difficulty_level': 'intermediate',
+        'estimated_time': 60,
+        'tags': ['skills', 'assessment', 'technical'],
+        'is_featured': False
+    }
+]
+
+
+def random_answers(rng, questions):
+    """One answer per question: an option, or a list of options for multiple_select"""
+    answers = []
+    for question in questions:
+        options = question['options']
+        if question['type'] == 'multiple_select':
+            answers.append(rng.sample(options, rng.randint(1, min(3, len(options)))))
+        else:
+            answers.append(rng.choice(options))
+    return answers
+
+
+def choice_values(model, field):
+    return [value for value, _ in model._meta.get_field(field).choices]
+
+
+def synthetic_careers(count, rng):
+    """Variants of the sample careers with spread-out facets, salaries and skills"""
+    skills = sorted({skill for career in SAMPLE_CAREER_PATHS for skill in career['required_skills']})
+    facets = {
+        field: choice_values(CareerPath, field)
+        for field in ('category', 'education_level', 'growth_outlook', 'work_environment')
+    }
+    for number in range(count):
+        base = SAMPLE_CAREER_PATHS[number % len(SAMPLE_CAREER_PATHS)]
+        salary_min = rng.randrange(25000, 150000, 1000)
+        yield CareerPath(
+            title=f"{base['title']} {number:06d}",
+            description=f"{base['description']} Variant {number} of the role. " * 3,
+            salary_range_min=salary_min,
+            salary_range_max=salary_min + rng.randrange(10000, 80000, 1000),
+            required_skills=rng.sample(skills, 3) + [f'Specialty {number % 500}'],
+            **{field: rng.choice(values) for field, values in facets.items()},
+        )
+
+
+def synthetic_resources(count, rng):
+    """Variants of the sample resources"""
+    facets = {
+        field: choice_values(CareerResource, field)
+        for field in ('resource_type', 'category', 'difficulty_level')
+    }
+    for number in range(count):
+        base = SAMPLE_RESOURCES[number % len(SAMPLE_RESOURCES)]
+        yield CareerResource(
+            title=f"{base['title']} {number:06d}",
+            content=f"{base['content']} " * 20,
+            estimated_time=rng.randrange(10, 180, 5),
+            tags=base['tags'] + [f'topic {number % 200}'],
+            is_featured=rng.random() < 0.05,
+            **{field: rng.choice(values) for field, values in facets.items()},
+        )
+
+
+def synthetic_results(count, assessment, career_ids, rng):
+    """Anonymous results of ``assessment``, about three per session"""
+    sessions = max(count // 3, 1)
+    for number in range(count):
+        yield AssessmentResult(
+            assessment=assessment,
+            answers=random_answers(rng, assessment.questions),
+            recommended_careers=rng.sample(career_ids, min(5, len(career_ids))),
+            session_id=f'synthetic-{number % sessions:06d}',
+        )
+
+
+def bulk_create_in_batches(model, objects, batch_size):
+    batch = []
+    for instance in objects:
+        batch.append(instance)
+        if len(batch) == batch_size:
+            model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+
+
+def generate_catalog(careers=1000, resources=1000, results=1000, seed=0, batch_size=2000):
+    """
+    Bulk-create synthetic careers, resources and assessment results.
+
+    The sample assessment is created when missing; results are answers to
+    it. Records are generated lazily and written ``batch_size`` at a time,
+    then derived data (indexes, facet counts, caches) is rebuilt once.
+    Returns the assessment.
+    """
+    rng = random.Random(seed)
+    assessment, _ = CareerAssessment.objects.get_or_create(
+        title=SAMPLE_ASSESSMENT['title'], defaults=SAMPLE_ASSESSMENT
+    )
+    bulk_create_in_batches(CareerPath, synthetic_careers(careers, rng), batch_size)
+    bulk_create_in_batches(CareerResource, synthetic_resources(resources, rng), batch_size)
+    career_ids = list(CareerPath.objects.filter(is_active=True).values_list('id', flat=True)[:1000])
+    bulk_create_in_batches(AssessmentResult, synthetic_results(results, assessment, career_ids, rng), batch_size)
+
+    refresh_derived_data(CareerPath)
+    refresh_derived_data(CareerResource)
+    return assessment
@@ -0,0 +1,63 @@
+"""
+Constant-time random sampling of featured career paths.
+
+``ORDER BY RANDOM()`` makes the database shuffle the whole active table on
+every homepage hit. Instead, each process keeps the sorted array of active
+CareerPath IDs tagged with the CareerPath generation it was read at, draws
+IDs from it with ``random.sample`` and fetches the winners with a single
+``pk__in`` query. CareerPath writes bump the generation, so the array is
+re-read from the primary once after a change (a lagging replica would be
+cached under the new generation) and reused until the next one.
+"""
+import random
+import threading
+import time
+
+from .caching import get_generation
+from .models import CareerPath
+from .replicas import PRIMARY
+
+
+class FeaturedSampler:
+    """Draws random active career IDs from a cached, versioned ID array"""
+
+    def __init__(self):
+        self._version = None
+        self._ids = ()
+        self._lock = threading.Lock()
+
+    def active_ids(self):
+        """Sorted active career IDs for the current CareerPath generation"""
+        version = get_generation(CareerPath)
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._ids = tuple(
+                        CareerPath.objects.using(PRIMARY).filter(is_active=True).order_by('id').values_list('id', flat=True)
+                    )
+                    self._version = version
+        return self._version, self._ids
+
+    def sample(self, k, seed=None):
+        """
+        Draw up to ``k`` distinct active career IDs.
+
+        With a ``seed`` the draw is deterministic for the current ID array,
+        so responses for the same seed can be cached until the next write.
+        """
+        version, ids = self.active_ids()
+        rng = random.Random(f'{version}:{seed}') if seed is not None else random
+        return rng.sample(ids, min(k, len(ids)))
+
+    def sample_window(self, k, window, now=None):
+        """
+        Draw IDs that stay fixed for a rotation window of ``window`` seconds.
+
+        Returns the IDs and the number of seconds until the window rotates.
+        """
+        now = time.time() if now is None else now
+        window_slot, elapsed = divmod(now, window)
+        return self.sample(k, seed=f'window:{window}:{int(window_slot)}'), max(int(window - elapsed), 1)
+
+
+featured_sampler = FeaturedSampler()
@@ -0,0 +1,507 @@
+"""
+Full-text search over career paths and career resources.
+
+Titles, descriptions/content and skills/tags are kept in a tokenized index
+that is updated incrementally by save/delete signals, and queries return
+ranked hits with highlighted snippets instead of running ``icontains`` over
+every TextField. Two interchangeable backends are provided:
+
+* ``FTS5SearchBackend`` - an SQLite FTS5 virtual table (created by migration
+  0002) ranked with the built-in ``bm25()`` function.
+* ``MemorySearchBackend`` - an in-process inverted index with BM25 scoring,
+  used for other databases or SQLite builds without FTS5. Each model's index
+  records the generation it was read at and is rebuilt after it moves, so
+  writes made by other processes are picked up with a shared cache.
+
+``FullTextSearchFilter`` plugs either backend into a DRF viewset. The match
+is applied to the already filtered queryset (a subquery on the FTS5 table,
+or the matching IDs of the in-process index), so combined filters and
+counts see every match; scores and snippets are then loaded only for the
+rows that are rendered.
+"""
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Case, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+from .caching import get_generation
+from .models import CareerPath, CareerResource
+from .replicas import PRIMARY
+
+
+FTS_TABLE = 'api_search_index'
+
+# Documents from several models share one index; the model is encoded in the
+# low bits of the FTS rowid so a document can be replaced with a rowid lookup.
+DOC_TYPE_BITS = 8
+
+# Per-field weights for title, body and tags
+FIELD_WEIGHTS = (10.0, 1.0, 5.0)
+
+# Hits returned by a direct backend ``search()`` call
+MAX_SEARCH_RESULTS = 500
+
+# The in-process backend filters on the matching IDs. Above this many they
+# are inlined as integer literals rather than bound, staying under the
+# database's query parameter limit.
+MAX_ID_PARAMS = 5000
+
+# Best in-process matches ordered by score; further matches follow in pk order
+MAX_RANKED_IDS = 1000
+
+SNIPPET_WORDS = 12
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+
+QUERY_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchDocumentType:
+    """How a model is turned into (title, body, tags) search documents"""
+
+    def __init__(self, code, model, title, body, tags):
+        self.code = code
+        self.model = model
+        self.title = title
+        self.body = body
+        self.tags = tags
+
+    def document(self, instance):
+        tags = getattr(instance, self.tags) or []
+        if not isinstance(tags, list):
+            tags = [tags]
+        return (
+            getattr(instance, self.title) or '',
+            getattr(instance, self.body) or '',
+            ' '.join(str(tag) for tag in tags),
+        )
+
+    def rowid(self, pk):
+        return pk * DOC_TYPE_BITS + self.code
+
+    def indexable(self, instance):
+        return getattr(instance, 'is_active', True)
+
+    def rows(self):
+        """Documents for every indexable row, streamed in chunks"""
+        queryset = self.model.objects.using(PRIMARY).filter(is_active=True).only(
+            'pk', self.title, self.body, self.tags
+        )
+        for instance in queryset.iterator(chunk_size=2000):
+            yield instance.pk, self.document(instance)
+
+
+DOCUMENT_TYPES = {
+    CareerPath: SearchDocumentType(1, CareerPath, 'title', 'description', 'required_skills'),
+    CareerResource: SearchDocumentType(2, CareerResource, 'title', 'content', 'tags'),
+}
+
+
+def query_terms(query):
+    """Lowercase search terms of a user query"""
+    return [term.lower() for term in QUERY_TOKEN_RE.findall(query or '')]
+
+
+class SearchHit:
+    """A ranked search result"""
+
+    def __init__(self, pk, score, snippet):
+        self.pk = pk
+        self.score = score
+        self.snippet = snippet
+
+
+class FTS5SearchBackend:
+    """SQLite FTS5 index ranked with bm25()"""
+
+    @staticmethod
+    def available():
+        if connection.vendor != 'sqlite':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def match_expression(terms):
+        # Quote every term so user input cannot inject FTS5 syntax; the last
+        # term is a prefix query to support search-as-you-type.
+        quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def index(self, instance):
+        doc_type = DOCUMENT_TYPES[type(instance)]
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [doc_type.rowid(instance.pk)])
+            if doc_type.indexable(instance):
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, title, body, tags) VALUES (%s, %s, %s, %s)',
+                    [doc_type.rowid(instance.pk), *doc_type.document(instance)],
+                )
+
+    def remove(self, model, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [DOCUMENT_TYPES[model].rowid(pk)])
+
+    def rebuild(self, model, batch_size=1000):
+        doc_type = DOCUMENT_TYPES[model]
+        count = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid %% {DOC_TYPE_BITS} = %s', [doc_type.code])
+            batch = []
+            for pk, document in doc_type.rows():
+                batch.append((doc_type.rowid(pk), *document))
+                if len(batch) >= batch_size:
+                    cursor.executemany(
+                        f'INSERT INTO {FTS_TABLE} (rowid, title, body, tags) VALUES (%s, %s, %s, %s)', batch
+                    )
+                    count += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, title, body, tags) VALUES (%s, %s, %s, %s)', batch
+                )
+                count += len(batch)
+        return count
+
+    def search(self, model, query, limit=MAX_SEARCH_RESULTS):
+        terms = query_terms(query)
+        if not terms:
+            return []
+        doc_type = DOCUMENT_TYPES[model]
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, {weights}), "
+                f"snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_WORDS}) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid %% {DOC_TYPE_BITS} = %s "
+                f"ORDER BY 2 LIMIT %s",
+                [HIGHLIGHT_START, HIGHLIGHT_END, self.match_expression(terms), doc_type.code, limit],
+            )
+            return [
+                SearchHit(rowid // DOC_TYPE_BITS, round(-score, 4), snippet)
+                for rowid, score, snippet in cursor.fetchall()
+            ]
+
+    def filter(self, queryset, query, ranked=True):
+        """
+        Restrict ``queryset`` to the rows matching ``query``.
+
+        With ``ranked`` a ``search_rank`` alias (lower is better) is added
+        for ordering by relevance.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return queryset.none()
+        model = queryset.model
+        code = DOCUMENT_TYPES[model].code
+        match = self.match_expression(terms)
+        queryset = queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid / {DOC_TYPE_BITS} FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid %% {DOC_TYPE_BITS} = %s',
+            [match, code],
+        ))
+        if not ranked:
+            return queryset
+        quote = connection.ops.quote_name
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+        return queryset.alias(search_rank=RawSQL(
+            f'SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = {quote(model._meta.db_table)}.{quote(model._meta.pk.column)} * {DOC_TYPE_BITS} + %s',
+            [match, code],
+        ))
+
+    def hits(self, model, query, pks):
+        """Scores and snippets of the rows ``pks`` among the matches of ``query``"""
+        terms = query_terms(query)
+        doc_type = DOCUMENT_TYPES[model]
+        rowids = [doc_type.rowid(pk) for pk in pks]
+        if not terms or not rowids:
+            return []
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, {weights}), "
+                f"snippet({FTS_TABLE}, 1, %s, %s, '…', {SNIPPET_WORDS}) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"AND rowid IN ({', '.join(['%s'] * len(rowids))})",
+                [HIGHLIGHT_START, HIGHLIGHT_END, self.match_expression(terms), *rowids],
+            )
+            return [
+                SearchHit(rowid // DOC_TYPE_BITS, round(-score, 4), snippet)
+                for rowid, score, snippet in cursor.fetchall()
+            ]
+
+
+class MemorySearchBackend:
+    """In-process inverted index with BM25 ranking"""
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        return True
+
+    def _new_index(self):
+        return {'postings': {}, 'terms': {}, 'lengths': {}, 'bodies': {}, 'total_length': 0,
+                'vocabulary': None, 'version': None}
+
+    def _add(self, index, pk, document):
+        term_frequencies = Counter()
+        length = 0
+        for weight, text in zip(FIELD_WEIGHTS, document):
+            tokens = query_terms(text)
+            length += len(tokens)
+            for token in tokens:
+                term_frequencies[token] += weight
+        for term, frequency in term_frequencies.items():
+            index['postings'].setdefault(term, {})[pk] = frequency
+        index['terms'][pk] = list(term_frequencies)
+        index['lengths'][pk] = length
+        index['bodies'][pk] = document[1]
+        index['total_length'] += length
+        index['vocabulary'] = None
+
+    def _remove(self, index, pk):
+        terms = index['terms'].pop(pk, None)
+        if terms is None:
+            return
+        del index['bodies'][pk]
+        index['total_length'] -= index['lengths'].pop(pk)
+        for term in terms:
+            posting = index['postings'][term]
+            del posting[pk]
+            if not posting:
+                del index['postings'][term]
+        index['vocabulary'] = None
+
+    def _get_index(self, model):
+        index = self._indexes.get(model)
+        version = get_generation(model)
+        if index is None or index['version'] != version:
+            # Read before the rows, so a write during the read leaves the index stale
+            index = self._new_index()
+            index['version'] = version
+            for pk, document in DOCUMENT_TYPES[model].rows():
+                self._add(index, pk, document)
+            self._indexes[model] = index
+        return index
+
+    def index(self, instance):
+        model = type(instance)
+        with self._lock:
+            index = self._indexes.get(model)
+            if index is None:
+                return
+            self._remove(index, instance.pk)
+            doc_type = DOCUMENT_TYPES[model]
+            if doc_type.indexable(instance):
+                self._add(index, instance.pk, doc_type.document(instance))
+
+    def remove(self, model, pk):
+        with self._lock:
+            index = self._indexes.get(model)
+            if index is not None:
+                self._remove(index, pk)
+
+    def rebuild(self, model, batch_size=None):
+        with self._lock:
+            self._indexes.pop(model, None)
+            return len(self._get_index(model)['lengths'])
+
+    def invalidate(self):
+        with self._lock:
+            self._indexes.clear()
+
+    @staticmethod
+    def _expand_prefix(index, prefix):
+        """Indexed terms starting with ``prefix`` (the last, still-typed query term)"""
+        if index.get('vocabulary') is None:
+            index['vocabulary'] = sorted(index['postings'])
+        vocabulary = index['vocabulary']
+        position = bisect_left(vocabulary, prefix)
+        terms = []
+        while position < len(vocabulary) and vocabulary[position].startswith(prefix):
+            terms.append(vocabulary[position])
+            position += 1
+        return terms
+
+    def search(self, model, query, limit=MAX_SEARCH_RESULTS):
+        terms = query_terms(query)
+        with self._lock:
+            index = self._get_index(model)
+            ranked = self._rank(index, terms)[:limit]
+            return [
+                SearchHit(pk, round(score, 4), self.snippet(index['bodies'][pk], terms))
+                for pk, score in ranked
+            ]
+
+    def filter(self, queryset, query, ranked=True):
+        """Restrict ``queryset`` to the matching rows; ``ranked`` adds a ``search_rank`` alias"""
+        with self._lock:
+            ids = [pk for pk, _ in self._rank(self._get_index(queryset.model), query_terms(query))]
+        if len(ids) <= MAX_ID_PARAMS:
+            queryset = queryset.filter(pk__in=ids)
+        else:
+            model = queryset.model
+            column = '{}.{}'.format(*map(connection.ops.quote_name, (model._meta.db_table, model._meta.pk.column)))
+            queryset = queryset.alias(search_match=RawSQL(
+                f"{column} IN ({', '.join(str(int(pk)) for pk in ids)})", [], output_field=BooleanField(),
+            )).filter(search_match=True)
+        if not ranked or not ids:
+            return queryset
+        return queryset.alias(search_rank=Case(
+            *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids[:MAX_RANKED_IDS])],
+            default=Value(MAX_RANKED_IDS),
+            output_field=IntegerField(),
+        ))
+
+    def hits(self, model, query, pks):
+        """Scores and snippets of the rows ``pks`` among the matches of ``query``"""
+        terms = query_terms(query)
+        pks = set(pks)
+        with self._lock:
+            index = self._get_index(model)
+            return [
+                SearchHit(pk, round(score, 4), self.snippet(index['bodies'][pk], terms))
+                for pk, score in self._rank(index, terms) if pk in pks
+            ]
+
+    def _rank(self, index, terms):
+        """(pk, BM25 score) of every document matching ``terms``, best first"""
+        if not terms:
+            return []
+        document_count = len(index['lengths'])
+        if not document_count:
+            return []
+        average_length = index['total_length'] / document_count or 1
+
+        # Every term must match (like FTS5's implicit AND); the last one as a prefix
+        alternatives = [[term] for term in terms[:-1]]
+        alternatives.append(self._expand_prefix(index, terms[-1]))
+        scores = None
+        for variants in alternatives:
+            term_scores = Counter()
+            for term in variants:
+                posting = index['postings'].get(term, {})
+                idf = math.log(1 + (document_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for pk, frequency in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * index['lengths'][pk] / average_length)
+                    term_scores[pk] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = Counter({pk: score + term_scores[pk] for pk, score in scores.items()
+                                  if pk in term_scores})
+            if not scores:
+                return []
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    @staticmethod
+    def snippet(text, terms):
+        """Window of words around the first query term, with matches highlighted"""
+        words = text.split()
+        if not words:
+            return ''
+
+        exact, prefix = set(terms[:-1]), terms[-1]
+
+        def matches(word):
+            return any(token in exact or token.startswith(prefix) for token in query_terms(word))
+
+        first = next((i for i, word in enumerate(words) if matches(word)), 0)
+        start = max(first - SNIPPET_WORDS // 2, 0)
+        window = words[start:start + SNIPPET_WORDS]
+        parts = [f'{HIGHLIGHT_START}{w}{HIGHLIGHT_END}' if matches(w) else w for w in window]
+        prefix = '…' if start > 0 else ''
+        suffix = '…' if start + SNIPPET_WORDS < len(words) else ''
+        return prefix + ' '.join(parts) + suffix
+
+
+SEARCH_BACKENDS = {
+    'fts5': FTS5SearchBackend,
+    'memory': MemorySearchBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_search_backend():
+    """Configured search backend (settings.API_SEARCH_BACKEND, 'auto' by default)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = getattr(settings, 'API_SEARCH_BACKEND', 'auto')
+                if name == 'auto':
+                    name = 'fts5' if FTS5SearchBackend.available() else 'memory'
+                _backend = SEARCH_BACKENDS[name]()
+    return _backend
+
+
+class SearchHits:
+    """
+    Scores and snippets of one request's search results.
+
+    Loaded from the backend for the rows that are actually rendered, a page
+    at a time, rather than for every match.
+    """
+
+    def __init__(self, backend, model, query):
+        self.backend = backend
+        self.model = model
+        self.query = query
+        self._hits = {}
+
+    def load(self, pks):
+        missing = [pk for pk in pks if pk not in self._hits]
+        if missing:
+            found = {hit.pk: hit for hit in self.backend.hits(self.model, self.query, missing)}
+            for pk in missing:
+                self._hits[pk] = found.get(pk)
+
+    def get(self, pk):
+        if pk not in self._hits:
+            self.load([pk])
+        return self._hits[pk]
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search for ``?search=`` backed by the search index.
+
+    Must come after the other filter backends and ``OrderingFilter`` in
+    ``filter_backends``: the match is applied to the filtered queryset, and
+    results are ordered by relevance unless the client asked for an
+    explicit ``ordering``. Hits are stored on the request so serializers can
+    add scores and snippets.
+    """
+    search_param = 'search'
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        backend = get_search_backend()
+        request.search_hits = SearchHits(backend, queryset.model, query)
+        ranked = not request.query_params.get(self.ordering_param)
+        queryset = backend.filter(queryset, query, ranked=ranked)
+        if ranked and 'search_rank' in queryset.query.annotations:
+            return queryset.order_by('search_rank', 'pk')
+        return queryset
@@ -1,9 +1,34 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import CareerPath, CareerAssessment, AssessmentResult, CareerResource, UserProfile
+from .exports import EXPORT_FORMATS, parse_bound
+from .fieldsets import SparseFieldsMixin
+from .models import (
+    CareerPath, CareerAssessment, AssessmentResult, CareerResource, UserProfile, MaterializedRecommendation,
+    SimilarCareer
+)
+from .questions import CompiledQuestionSchema, compile_questions
 
 
-class CareerPathSerializer(serializers.ModelSerializer):
+class SearchSnippetMixin:
+    """Adds relevance score and highlighted snippet to full-text search results"""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        hits = getattr(self.context.get('request'), 'search_hits', None)
+        if hits is None:
+            return data
+        page = getattr(self.parent, 'instance', None)
+        if isinstance(page, list):
+            # Load the whole page with one backend call
+            hits.load(item.pk for item in page)
+        hit = hits.get(instance.pk)
+        if hit is not None:
+            data['search_score'] = hit.score
+            data['search_snippet'] = hit.snippet
+        return data
+
+
+class CareerPathSerializer(SearchSnippetMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Career Path model"""
     
     class Meta:
@@ -17,7 +42,54 @@ class CareerPathSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CareerAssessmentSerializer(serializers.ModelSerializer):
+class CareerMatchSerializer(CareerPathSerializer):
+    """Career path ranked by skill overlap"""
+    match_score = serializers.FloatField(read_only=True)
+    matched_skills = serializers.ListField(child=serializers.CharField(), read_only=True)
+
+    class Meta(CareerPathSerializer.Meta):
+        fields = CareerPathSerializer.Meta.fields + ['match_score', 'matched_skills']
+
+
+class CareerSummarySerializer(serializers.ModelSerializer):
+    """Compact career path representation for embedding in other resources"""
+
+    class Meta:
+        model = CareerPath
+        fields = ['id', 'title', 'category', 'salary_range_min', 'salary_range_max', 'growth_outlook']
+        read_only_fields = fields
+
+
+class SimilarCareerSerializer(serializers.ModelSerializer):
+    """A precomputed similar career: the career's summary with its similarity score"""
+
+    class Meta:
+        model = SimilarCareer
+        fields = ['score']
+        read_only_fields = fields
+
+    def to_representation(self, instance):
+        return {**CareerSummarySerializer(instance.similar).data, **super().to_representation(instance)}
+
+
+def career_summaries(career_ids):
+    """Career summaries keyed by ID, fetched with a single query"""
+    career_ids = {career_id for career_id in career_ids if isinstance(career_id, int)}
+    if not career_ids:
+        return {}
+    careers = CareerPath.objects.only(*CareerSummarySerializer.Meta.fields).in_bulk(career_ids)
+    return {career_id: CareerSummarySerializer(career).data for career_id, career in careers.items()}
+
+
+def expand_requested(context, name):
+    """Whether ``?expand=`` of the current request lists ``name``"""
+    request = context.get('request')
+    if request is None:
+        return False
+    return name in request.query_params.get('expand', '').split(',')
+
+
+class CareerAssessmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Career Assessment model"""
     
     class Meta:
@@ -29,21 +101,73 @@ class CareerAssessmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class CareerAssessmentListSerializer(CareerAssessmentSerializer):
+    """Compact assessment for list views, without instructions and questions"""
+
+    class Meta(CareerAssessmentSerializer.Meta):
+        fields = ['id', 'title', 'description', 'is_active', 'created_at', 'updated_at']
+
+
+class AssessmentResultListSerializer(serializers.ListSerializer):
+    """Resolves the recommended careers of a whole page with one query"""
+
+    def to_representation(self, data):
+        results = list(data.all() if hasattr(data, 'all') else data)
+        if expand_requested(self.context, 'careers'):
+            self.child.career_summaries = career_summaries(
+                career_id for result in results for career_id in result.recommended_careers
+            )
+        try:
+            return super().to_representation(results)
+        finally:
+            self.child.career_summaries = None
+
+
 class AssessmentResultSerializer(serializers.ModelSerializer):
-    """Serializer for Assessment Result model"""
+    """
+    Serializer for Assessment Result model.
+
+    With ``?expand=careers`` a ``careers`` list of career summaries is added
+    alongside the ``recommended_careers`` IDs.
+    """
     assessment_title = serializers.CharField(source='assessment.title', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
+    career_summaries = None
     
     class Meta:
         model = AssessmentResult
         fields = [
             'id', 'user', 'assessment', 'answers', 'recommended_careers',
-            'session_id', 'completed_at', 'assessment_title', 'user_username'
+            'recommendation_status', 'session_id', 'completed_at', 'assessment_title', 'user_username'
         ]
-        read_only_fields = ['id', 'completed_at', 'assessment_title', 'user_username']
+        read_only_fields = ['id', 'recommendation_status', 'completed_at', 'assessment_title', 'user_username']
+        list_serializer_class = AssessmentResultListSerializer
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if expand_requested(self.context, 'careers'):
+            summaries = self.career_summaries
+            if summaries is None:
+                summaries = career_summaries(instance.recommended_careers)
+            data['careers'] = [
+                summaries[career_id] for career_id in instance.recommended_careers if career_id in summaries
+            ]
+        return data
 
 
-class CareerResourceSerializer(serializers.ModelSerializer):
+class MaterializedRecommendationSerializer(serializers.ModelSerializer):
+    """Serializer for a materialized career recommendation"""
+    career_id = serializers.IntegerField(read_only=True)
+    title = serializers.CharField(source='career_title', read_only=True)
+    category = serializers.CharField(source='career_category', read_only=True)
+
+    class Meta:
+        model = MaterializedRecommendation
+        fields = ['rank', 'career_id', 'title', 'category', 'score', 'assessment_result', 'updated_at']
+        read_only_fields = fields
+
+
+class CareerResourceSerializer(SearchSnippetMixin, SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Career Resource model"""
     
     class Meta:
@@ -56,6 +180,13 @@ class CareerResourceSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class CareerResourceListSerializer(CareerResourceSerializer):
+    """Compact resource for list views, without the content body"""
+
+    class Meta(CareerResourceSerializer.Meta):
+        fields = [field for field in CareerResourceSerializer.Meta.fields if field != 'content']
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Basic user serializer"""
     
@@ -97,18 +228,62 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
 
 class AssessmentSubmissionSerializer(serializers.Serializer):
-    """Serializer for submitting assessment answers"""
-    assessment_id = serializers.IntegerField()
+    """
+    Serializer for submitting assessment answers.
+
+    Pass the already-fetched assessment as ``context['assessment']`` to
+    validate answers against its compiled question schema without any
+    further queries.
+    """
+    assessment_id = serializers.IntegerField(required=False)
     answers = serializers.JSONField()
-    session_id = serializers.CharField(required=False, allow_blank=True)
+    session_id = serializers.CharField(required=False, allow_blank=True, max_length=100)
     
     def validate_assessment_id(self, value):
+        assessment = self.context.get('assessment')
+        if assessment is not None:
+            if value != assessment.pk:
+                raise serializers.ValidationError("Does not match the assessment being submitted")
+            return value
         try:
             CareerAssessment.objects.get(id=value, is_active=True)
         except CareerAssessment.DoesNotExist:
             raise serializers.ValidationError("Assessment not found or inactive")
         return value
 
+    def validate_answers(self, value):
+        assessment = self.context.get('assessment')
+        schema = compile_questions(assessment) if assessment is not None else CompiledQuestionSchema([])
+        errors = schema.errors(value)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return value
+
+
+class ResultExportSerializer(serializers.Serializer):
+    """Validates the query parameters of an assessment result export"""
+    output = serializers.ChoiceField(choices=EXPORT_FORMATS, default='ndjson')
+    assessment = serializers.IntegerField(required=False, min_value=1)
+    since = serializers.CharField(required=False)
+    until = serializers.CharField(required=False)
+
+    def validate_since(self, value):
+        try:
+            return parse_bound(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def validate_until(self, value):
+        try:
+            return parse_bound(value, end=True)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def validate(self, attrs):
+        if 'since' in attrs and 'until' in attrs and attrs['since'] >= attrs['until']:
+            raise serializers.ValidationError({'until': ['Must be later than since.']})
+        return attrs
+
 
 class CareerRecommendationSerializer(serializers.Serializer):
     """Serializer for career recommendations based on assessment"""
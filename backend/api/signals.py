@@ -0,0 +1,249 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import forget_token, forget_user
+from .caching import bump_generation, bump_user_generation
+from .facets import FACET_FIELDS, apply_change, facet_state, stored_state
+from .matching import SCORED_FIELDS, matcher
+from .models import CareerPath, CareerAssessment, CareerResource, AssessmentResult, SimilarCareer, UserProfile
+from .recommendations import owners_of_career, refresh_owner, refresh_owners, update_career
+from .replicas import PRIMARY, mark_writes
+from .salaries import salary_index
+from .search import get_search_backend
+from .similarity import CATEGORICAL_FIELDS, schedule_update
+from .skills import skill_index
+from .tasks import run_after_commit
+
+
+@receiver([post_save, post_delete], sender=CareerPath)
+@receiver([post_save, post_delete], sender=CareerResource)
+@receiver([post_save, post_delete], sender=CareerAssessment)
+def bump_catalog_generation(sender, **kwargs):
+    """Mark cached catalog data (responses, in-process indexes) as stale"""
+    bump_generation(sender)
+    # Again once committed: another process may have read the old rows in between
+    transaction.on_commit(lambda: bump_generation(sender))
+
+
+@receiver([post_save, post_delete], sender=CareerPath)
+def invalidate_career_matcher(sender, **kwargs):
+    """Rebuild the matching matrix on the next recommendation request"""
+    matcher.invalidate()
+
+
+@receiver(post_save, sender=CareerPath)
+def index_career_skills(sender, instance, **kwargs):
+    """Keep the skill posting lists in sync with the saved career"""
+    skill_index.update_career(instance)
+
+
+@receiver(post_delete, sender=CareerPath)
+def unindex_career_skills(sender, instance, **kwargs):
+    """Remove a deleted career from the skill posting lists"""
+    skill_index.remove_career(instance.pk)
+
+
+@receiver(post_save, sender=CareerPath)
+def index_career_salary(sender, instance, **kwargs):
+    """Keep the salary band arrays in sync with the saved career"""
+    salary_index.update_career(instance)
+
+
+@receiver(post_delete, sender=CareerPath)
+def unindex_career_salary(sender, instance, **kwargs):
+    """Remove a deleted career from the salary band arrays"""
+    salary_index.remove_career(instance.pk)
+
+
+@receiver(post_save, sender=CareerPath)
+@receiver(post_save, sender=CareerResource)
+def update_search_index(sender, instance, **kwargs):
+    """Re-index the saved row in the full-text search index"""
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=CareerPath)
+@receiver(post_delete, sender=CareerResource)
+def remove_from_search_index(sender, instance, **kwargs):
+    """Remove the deleted row from the full-text search index"""
+    get_search_backend().remove(sender, instance.pk)
+
+
+@receiver(post_save, sender=AssessmentResult)
+def refresh_recommendations_for_result(sender, instance, created, **kwargs):
+    """A new result replaces the owner's materialized recommendations"""
+    if created:
+        run_after_commit(refresh_owner, instance.user_id, instance.session_id)
+
+
+def profile_inputs(instance):
+    """Skills and interests of a profile, None for fields that were not loaded"""
+    return tuple(
+        list(instance.__dict__[field] or []) if field in instance.__dict__ else None
+        for field in ('skills', 'interests')
+    )
+
+
+@receiver(post_init, sender=UserProfile)
+def remember_profile_inputs(sender, instance, **kwargs):
+    """Snapshot the profile fields that feed recommendations"""
+    instance._recommendation_inputs = profile_inputs(instance)
+
+
+@receiver(post_save, sender=UserProfile)
+def refresh_recommendations_for_profile(sender, instance, created, **kwargs):
+    """Recompute recommendations when profile skills or interests changed"""
+    inputs = profile_inputs(instance)
+    if inputs != instance._recommendation_inputs and (not created or any(inputs)):
+        run_after_commit(refresh_owner, instance.user_id, None)
+    instance._recommendation_inputs = inputs
+
+
+def scored_inputs(instance):
+    """Fields of a career the matcher scores on, None for fields that were not loaded"""
+    return tuple(instance.__dict__.get(field) for field in SCORED_FIELDS)
+
+
+@receiver(post_init, sender=CareerPath)
+def remember_scored_inputs(sender, instance, **kwargs):
+    instance._scored_inputs = scored_inputs(instance)
+
+
+@receiver(post_save, sender=CareerPath)
+def update_materialized_recommendations(sender, instance, created, **kwargs):
+    """Patch denormalized career fields, recompute owners of deactivated or re-scored careers"""
+    inputs = scored_inputs(instance)
+    owners = update_career(instance, rescore=not created and inputs != instance._scored_inputs)
+    instance._scored_inputs = inputs
+    if owners:
+        run_after_commit(refresh_owners, owners)
+
+
+@receiver(pre_delete, sender=CareerPath)
+def collect_recommendation_owners(sender, instance, **kwargs):
+    instance._recommendation_owners = owners_of_career(instance.pk)
+
+
+@receiver(post_delete, sender=CareerPath)
+def refresh_recommendations_for_deleted_career(sender, instance, **kwargs):
+    """Owners that lost a recommended career get a fresh list"""
+    owners = getattr(instance, '_recommendation_owners', None)
+    if owners:
+        run_after_commit(refresh_owners, owners)
+
+
+def similarity_inputs(instance):
+    """Fields of a career that feed its similarity vector, None for fields that were not loaded"""
+    return tuple(
+        instance.__dict__.get(field) for field in ('description', 'required_skills', 'is_active', *CATEGORICAL_FIELDS)
+    )
+
+
+@receiver(post_init, sender=CareerPath)
+def remember_similarity_inputs(sender, instance, **kwargs):
+    instance._similarity_inputs = similarity_inputs(instance)
+
+
+@receiver(post_save, sender=CareerPath)
+def update_similar_careers(sender, instance, created, **kwargs):
+    """Recompute the neighbour lists the saved career can change"""
+    inputs = similarity_inputs(instance)
+    if created or inputs != instance._similarity_inputs:
+        schedule_update([instance.pk])
+    instance._similarity_inputs = inputs
+
+
+@receiver(pre_delete, sender=CareerPath)
+def collect_similar_listings(sender, instance, **kwargs):
+    # The cascade drops the rows that tell which careers listed this one
+    instance._similar_listed_by = list(
+        SimilarCareer.objects.filter(similar=instance).order_by().values_list('career_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=CareerPath)
+def remove_from_similar_careers(sender, instance, **kwargs):
+    """Careers that listed the deleted career get a fresh list"""
+    schedule_update([instance.pk], getattr(instance, '_similar_listed_by', ()))
+
+
+@receiver(post_init, sender=CareerPath)
+@receiver(post_init, sender=CareerResource)
+def remember_facet_state(sender, instance, **kwargs):
+    """Snapshot the facet values the row currently contributes to the counts"""
+    instance._facet_state = facet_state(instance)
+
+
+def saves_facets(sender, update_fields):
+    return update_fields is None or bool(set(update_fields) & {'is_active', *FACET_FIELDS[sender]})
+
+
+@receiver(pre_save, sender=CareerPath)
+@receiver(pre_save, sender=CareerResource)
+def load_deferred_facet_state(sender, instance, update_fields=None, **kwargs):
+    """Read the old facet values of a deferred row before they are overwritten"""
+    if instance._facet_state is False and not instance._state.adding and saves_facets(sender, update_fields):
+        instance._facet_state = stored_state(instance)
+
+
+@receiver(post_save, sender=CareerPath)
+@receiver(post_save, sender=CareerResource)
+def update_facet_counts(sender, instance, created, update_fields=None, **kwargs):
+    """Move the row's facet counts from its old values to the saved ones"""
+    if not saves_facets(sender, update_fields):
+        return
+    state = facet_state(instance)
+    if state is False:
+        # Fields still deferred were not written, so the row holds the saved state
+        state = stored_state(instance)
+    apply_change(sender, None if created else instance._facet_state, state)
+    instance._facet_state = state
+
+
+@receiver(pre_delete, sender=CareerPath)
+@receiver(pre_delete, sender=CareerResource)
+def load_deferred_facet_state_before_delete(sender, instance, **kwargs):
+    if instance._facet_state is False:
+        instance._facet_state = stored_state(instance)
+
+
+@receiver(post_delete, sender=CareerPath)
+@receiver(post_delete, sender=CareerResource)
+def remove_facet_counts(sender, instance, **kwargs):
+    """Drop the deleted row from the facet counts"""
+    apply_change(sender, instance._facet_state, None)
+
+
+@receiver(connection_created)
+def watch_primary_writes(sender, connection, **kwargs):
+    """Pin the thread to the primary after statements that write to it"""
+    if connection.alias == PRIMARY and mark_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(mark_writes)
+
+
+@receiver([post_save, post_delete], sender=Token)
+def forget_cached_token(sender, instance, **kwargs):
+    """Revoke a deleted or replaced token from the authentication cache"""
+    forget_token(instance.key)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, instance, **kwargs):
+    """Drop the cached user and tokens after a password change, deactivation or deletion"""
+    forget_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=AssessmentResult)
+def bump_owner_generation(sender, instance, **kwargs):
+    """Mark the owner's cached "me" response as stale"""
+    bump_user_generation(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def bump_user_data_generation(sender, instance, **kwargs):
+    bump_user_generation(instance.pk)
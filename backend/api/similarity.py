@@ -0,0 +1,562 @@
+"""
+Precomputed similar careers.
+
+Every active CareerPath is encoded as a vector: TF-IDF weights of the words
+in its description and required skills, hashed into ``TEXT_BUCKETS``
+columns (sublinear term frequency, L2-normalized), followed by one-hot
+columns for its categorical fields. The groups are scaled so the dot
+product of two vectors is the weighted sum (``SIMILARITY_WEIGHTS``) of the
+text cosine similarity and of the categorical fields that match, a score
+between 0 and 1.
+
+The ``SIMILAR_LIMIT`` best neighbours of every career are stored in the
+SimilarCareer table, so serving ``career-paths/<id>/similar/`` is a single
+indexed lookup. ``build_similar_careers`` recomputes the whole table,
+tokenizing and scoring blocks of careers on a forked process pool for
+large catalogs. Its document frequencies are stored in the cache and kept
+until the next full build, so every process scores with the same IDF and
+scores of lists written at different times stay comparable.
+
+After a career changes, ``update_similar_careers`` recomputes only the
+lists that can change: the career's own, those that listed it, and those
+whose last neighbour it now outscores. Each process keeps the catalog
+vectors and the weakest stored score of every list in a
+``SimilarityIndex``, tagged with the SimilarCareer generation; an update
+re-reads only the changed careers. Every update bumps the generation and
+logs the careers it changed and the lists it rewrote under the new
+generation, which other processes replay to patch their own index (a full
+build, or a gap in the log, makes them rebuild it instead). The careers
+saved in one transaction share one update, and the ``similar`` response
+cache is keyed on the SimilarCareer generation.
+"""
+import functools
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+from django.core.cache import cache
+from django.db import connections, transaction
+
+from .caching import bump_generation, get_generation
+from .matching import STOPWORDS, skill_tokens, tokenize
+from .models import CareerPath, SimilarCareer
+from .replicas import PRIMARY
+from .serializers import CareerSummarySerializer
+from .tasks import run_after_commit
+
+
+# Hashed columns for description and skill words
+TEXT_BUCKETS = 512
+
+# Share of the score from each feature group; they add up to 1
+SIMILARITY_WEIGHTS = {
+    'text': 0.6,
+    'category': 0.2,
+    'work_environment': 0.1,
+    'education_level': 0.05,
+    'growth_outlook': 0.05,
+}
+
+CATEGORICAL_FIELDS = ['category', 'work_environment', 'education_level', 'growth_outlook']
+
+# Fields read for each career: id, the two text fields, then CATEGORICAL_FIELDS
+ROW_FIELDS = ('id', 'description', 'required_skills', *CATEGORICAL_FIELDS)
+
+# Neighbours stored per career
+SIMILAR_LIMIT = 10
+
+# Catalog size from which the bulk build uses a process pool by default
+PARALLEL_THRESHOLD = 5000
+
+# Score entries computed at once (rows x catalog size), bounding memory per worker
+BLOCK_ENTRIES = 2 ** 24
+
+WRITE_BATCH_SIZE = 2000
+
+# Document frequencies of the last full build, so every process scores with the same IDF
+IDF_KEY = 'api:similarity:idf'
+
+# Careers an update changed and lists it rewrote, per SimilarCareer generation
+CHANGES_KEY = 'api:similarity:changes:{}'
+CHANGE_LOG_TIMEOUT = 24 * 60 * 60
+
+# Generations an index replays from the change log before rebuilding instead
+MAX_REPLAY = 1000
+
+
+def text_bucket(token):
+    return zlib.crc32(token.encode('utf-8')) % TEXT_BUCKETS
+
+
+def term_counts(description, required_skills):
+    """Hashed term counts of a career's description and required skills"""
+    counts = Counter(text_bucket(token) for token in tokenize(description or '') if token not in STOPWORDS)
+    counts.update(text_bucket(token) for token in skill_tokens(
+        required_skills if isinstance(required_skills, list) else []
+    ))
+    return counts
+
+
+def chunk_terms(texts):
+    """Term counts of (description, required_skills) pairs as flat (lengths, buckets, counts) arrays"""
+    lengths, buckets, counts = [], [], []
+    for description, required_skills in texts:
+        terms = term_counts(description, required_skills)
+        lengths.append(len(terms))
+        buckets.extend(terms.keys())
+        counts.extend(terms.values())
+    return (
+        np.array(lengths, dtype=np.int64), np.array(buckets, dtype=np.int64), np.array(counts, dtype=np.float32)
+    )
+
+
+def merge_terms(chunks):
+    chunks = list(chunks)
+    if not chunks:
+        return chunk_terms([])
+    return tuple(np.concatenate(arrays) for arrays in zip(*chunks))
+
+
+def categorical_columns():
+    """Map (field, value) to the one-hot column after the text buckets"""
+    columns = {}
+    for field_name in CATEGORICAL_FIELDS:
+        for value, _label in CareerPath._meta.get_field(field_name).choices:
+            columns[(field_name, value)] = TEXT_BUCKETS + len(columns)
+    return columns
+
+
+class CareerVectorizer:
+    """Turns career rows into similarity vectors, with document frequencies fixed when fitted"""
+
+    def __init__(self, document_count, document_frequencies):
+        self.document_count = int(document_count)
+        self.document_frequencies = np.asarray(document_frequencies, dtype=np.int64)
+        self.idf = (np.log((1 + self.document_count) / (1 + self.document_frequencies)) + 1).astype(np.float32)
+        self.columns = categorical_columns()
+        self.width = TEXT_BUCKETS + len(self.columns)
+
+    @classmethod
+    def fit(cls, terms):
+        lengths, buckets, _ = terms
+        return cls(len(lengths), np.bincount(buckets, minlength=TEXT_BUCKETS))
+
+    def state(self):
+        """Picklable arguments that recreate this vectorizer"""
+        return self.document_count, self.document_frequencies.tolist()
+
+    def transform(self, rows, terms):
+        """Matrix of the vectors of ``rows`` (ROW_FIELDS tuples) from their ``chunk_terms``"""
+        lengths, buckets, counts = terms
+        matrix = np.zeros((len(rows), self.width), dtype=np.float32)
+        row_indexes = np.repeat(np.arange(len(rows)), lengths)
+        matrix[row_indexes, buckets] = (1 + np.log(counts)) * self.idf[buckets]
+
+        text = matrix[:, :TEXT_BUCKETS]
+        norms = np.linalg.norm(text, axis=1, keepdims=True)
+        np.divide(text, norms, out=text, where=norms > 0)
+        text *= math.sqrt(SIMILARITY_WEIGHTS['text'])
+
+        for row_index, row in enumerate(rows):
+            for field_name, value in zip(CATEGORICAL_FIELDS, row[3:]):
+                column = self.columns.get((field_name, value))
+                if column is not None:
+                    matrix[row_index, column] = math.sqrt(SIMILARITY_WEIGHTS[field_name])
+        return matrix
+
+
+def shared_vectorizer(terms):
+    """The vectorizer of the last full build, or one fitted on ``terms`` and stored if there is none"""
+    state = cache.get(IDF_KEY)
+    if state is None:
+        cache.add(IDF_KEY, CareerVectorizer.fit(terms).state(), timeout=None)
+        # Another process may have stored its own first
+        state = cache.get(IDF_KEY) or CareerVectorizer.fit(terms).state()
+    return CareerVectorizer(*state)
+
+
+def top_neighbours(matrix, indexes, limit):
+    """(positions, scores) of the ``limit`` best neighbours of the rows at ``indexes``, best first"""
+    scores = matrix[indexes] @ matrix.T
+    # A career is not its own neighbour
+    scores[np.arange(len(indexes)), indexes] = -np.inf
+    limit = min(limit, matrix.shape[0] - 1)
+    if limit <= 0:
+        return np.empty((len(indexes), 0), dtype=np.int64), np.empty((len(indexes), 0), dtype=np.float32)
+    candidates = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+    # Ties keep catalog order
+    candidates.sort(axis=1)
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def weakest_scores(scores):
+    """Score of the last of SIMILAR_LIMIT neighbours per row of ``top_neighbours`` output, 0 for shorter lists"""
+    if scores.shape[1] < SIMILAR_LIMIT:
+        return np.zeros(scores.shape[0], dtype=np.float32)
+    return np.maximum(scores[:, SIMILAR_LIMIT - 1], 0)
+
+
+def block_size(count):
+    return max(1, min(count, BLOCK_ENTRIES // max(count, 1)))
+
+
+# The matrix forked pool workers score against; set before the pool starts
+_pool_matrix = None
+
+
+def score_block(block):
+    start, stop, limit = block
+    return top_neighbours(_pool_matrix, np.arange(start, stop), limit)
+
+
+@contextmanager
+def worker_map(workers):
+    """``map`` over a forked process pool, or the builtin ``map`` for one worker or inside a transaction"""
+    if (workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods()
+            or any(connection.in_atomic_block for connection in connections.all())):
+        yield map
+        return
+    # Forked workers must not inherit open database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        yield pool.map
+
+
+def neighbour_rows(career_ids, ids, positions, scores):
+    """(career_id, similar_id, rank, score) rows from ``top_neighbours`` output, skipping scores of zero"""
+    for career_id, row_positions, row_scores in zip(career_ids, positions, scores):
+        rank = 0
+        for position, score in zip(row_positions.tolist(), row_scores.tolist()):
+            if score <= 0:
+                break
+            rank += 1
+            yield (career_id, ids[position], rank, round(score, 6))
+
+
+def write_neighbours(rows, career_ids=None):
+    """Replace the stored neighbours of ``career_ids`` (all careers if None) with ``rows``"""
+    connection = connections[PRIMARY]
+    columns = ', '.join(
+        connection.ops.quote_name(SimilarCareer._meta.get_field(name).column)
+        for name in ('career', 'similar', 'rank', 'score')
+    )
+    # Plain tuples: model instances would cost more than the scoring on large catalogs
+    insert = (
+        f'INSERT INTO {connection.ops.quote_name(SimilarCareer._meta.db_table)} ({columns}) '
+        f'VALUES (%s, %s, %s, %s)'
+    )
+    with transaction.atomic(using=PRIMARY):
+        stored = SimilarCareer.objects.using(PRIMARY)
+        if career_ids is None:
+            stored.all().delete()
+        else:
+            career_ids = list(career_ids)
+            for start in range(0, len(career_ids), WRITE_BATCH_SIZE):
+                stored.filter(career_id__in=career_ids[start:start + WRITE_BATCH_SIZE]).delete()
+        rows = iter(rows)
+        with connection.cursor() as cursor:
+            while batch := list(itertools.islice(rows, WRITE_BATCH_SIZE)):
+                cursor.executemany(insert, batch)
+
+
+def catalog_rows():
+    return list(
+        CareerPath.objects.using(PRIMARY).filter(is_active=True).order_by('id').values_list(*ROW_FIELDS)
+    )
+
+
+def build_similar_careers(workers=None, limit=SIMILAR_LIMIT, chunk_size=2000):
+    """
+    Recompute the whole SimilarCareer table; returns the number of careers.
+
+    ``workers`` defaults to the CPU count from PARALLEL_THRESHOLD careers on
+    and to 1 (no process pool) below.
+    """
+    global _pool_matrix
+    rows = catalog_rows()
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(rows) >= PARALLEL_THRESHOLD else 1
+
+    texts = [(row[1], row[2]) for row in rows]
+    with worker_map(workers) as map_chunks:
+        terms = merge_terms(map_chunks(chunk_terms, [
+            texts[start:start + chunk_size] for start in range(0, len(texts), chunk_size)
+        ]))
+    vectorizer = CareerVectorizer.fit(terms)
+    cache.set(IDF_KEY, vectorizer.state(), timeout=None)
+    matrix = vectorizer.transform(rows, terms)
+
+    size = block_size(len(rows))
+    blocks = [(start, min(start + size, len(rows)), limit) for start in range(0, len(rows), size)]
+    _pool_matrix = matrix
+    try:
+        with worker_map(workers) as map_blocks:
+            results = list(map_blocks(score_block, blocks))
+    finally:
+        _pool_matrix = None
+
+    ids = [row[0] for row in rows]
+    write_neighbours(itertools.chain.from_iterable(
+        neighbour_rows(ids[start:stop], ids, positions, scores)
+        for (start, stop, _), (positions, scores) in zip(blocks, results)
+    ))
+    # No change log entry: other processes rebuild their index with the new document frequencies
+    version = bump_generation(SimilarCareer)
+    if limit == SIMILAR_LIMIT:
+        thresholds = np.concatenate([weakest_scores(scores) for _, scores in results] or [np.zeros(0)])
+        similarity_index.seed(version, ids, matrix, vectorizer, thresholds)
+    else:
+        similarity_index.invalidate()
+    return len(rows)
+
+
+class SimilarityIndex:
+    """
+    In-process career vectors for incremental SimilarCareer updates.
+
+    Holds the vector of every career and the score of its weakest stored
+    neighbour, at a SimilarCareer generation. Rows of deactivated or
+    deleted careers are zeroed rather than removed and new careers are
+    appended, so an update only re-reads the careers that changed.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._vectorizer = None
+        self._ids = []
+        self._positions = {}
+        # Buffers with room for appended careers; the first len(self._ids) rows are in use
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._thresholds = np.zeros(0, dtype=np.float32)
+        self._active = np.zeros(0, dtype=bool)
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the index so it is rebuilt on next use"""
+        with self._lock:
+            self._version = None
+
+    def seed(self, version, ids, matrix, vectorizer, thresholds):
+        """Adopt the vectors and neighbour scores of a full build"""
+        with self._lock:
+            self._set_rows(ids, matrix, vectorizer)
+            self._thresholds[:] = thresholds
+            self._version = version
+
+    def _set_rows(self, ids, matrix, vectorizer):
+        self._vectorizer = vectorizer
+        self._ids = list(ids)
+        self._positions = {career_id: position for position, career_id in enumerate(self._ids)}
+        self._matrix = matrix
+        self._thresholds = np.zeros(len(self._ids), dtype=np.float32)
+        self._active = np.ones(len(self._ids), dtype=bool)
+
+    def _build(self, version):
+        rows = catalog_rows()
+        terms = chunk_terms([(row[1], row[2]) for row in rows])
+        vectorizer = shared_vectorizer(terms)
+        self._set_rows([row[0] for row in rows], vectorizer.transform(rows, terms), vectorizer)
+        self._load_thresholds()
+        self._version = version
+
+    def _sync(self):
+        """
+        Catch up with the current SimilarCareer generation and return it.
+
+        Updates from other processes are replayed from the change log; a
+        full build (which may refit the document frequencies), an evicted
+        log entry or a long gap rebuilds the index from the catalog.
+        """
+        version = get_generation(SimilarCareer)
+        if version == self._version:
+            return version
+        if self._version is not None and 0 < version - self._version <= MAX_REPLAY:
+            keys = [CHANGES_KEY.format(generation) for generation in range(self._version + 1, version + 1)]
+            changes = cache.get_many(keys)
+            if len(changes) == len(keys):
+                changed, rewritten = set(), set()
+                for career_ids, affected in changes.values():
+                    changed.update(career_ids)
+                    rewritten.update(affected)
+                self._patch(changed)
+                self._load_thresholds(changed | rewritten)
+                self._version = version
+                return version
+        self._build(version)
+        return version
+
+    def _append(self, career_ids):
+        count, needed = len(self._ids), len(self._ids) + len(career_ids)
+        if needed > self._matrix.shape[0]:
+            capacity = max(needed, 2 * self._matrix.shape[0])
+            matrix = np.zeros((capacity, self._vectorizer.width), dtype=np.float32)
+            matrix[:count] = self._matrix[:count]
+            thresholds = np.zeros(capacity, dtype=np.float32)
+            thresholds[:count] = self._thresholds[:count]
+            active = np.zeros(capacity, dtype=bool)
+            active[:count] = self._active[:count]
+            self._matrix, self._thresholds, self._active = matrix, thresholds, active
+        for career_id in career_ids:
+            self._positions[career_id] = len(self._ids)
+            self._ids.append(career_id)
+
+    def _patch(self, career_ids):
+        """Re-read the changed careers; inactive or deleted ones get a zero vector"""
+        career_ids = sorted(career_ids)
+        active = CareerPath.objects.using(PRIMARY).filter(is_active=True).order_by('id')
+        rows = []
+        for start in range(0, len(career_ids), WRITE_BATCH_SIZE):
+            rows.extend(active.filter(pk__in=career_ids[start:start + WRITE_BATCH_SIZE]).values_list(*ROW_FIELDS))
+        vectors = self._vectorizer.transform(rows, chunk_terms([(row[1], row[2]) for row in rows]))
+        for career_id in career_ids:
+            position = self._positions.get(career_id)
+            if position is not None:
+                self._matrix[position] = 0
+                self._active[position] = False
+        self._append([row[0] for row in rows if row[0] not in self._positions])
+        for row, vector in zip(rows, vectors):
+            position = self._positions[row[0]]
+            self._matrix[position] = vector
+            self._active[position] = True
+
+    def _load_thresholds(self, career_ids=None):
+        """Read the weakest stored neighbour score of ``career_ids`` (every career if None)"""
+        weakest = SimilarCareer.objects.using(PRIMARY).filter(rank=SIMILAR_LIMIT).order_by()
+        if career_ids is None:
+            self._thresholds[:] = 0
+            batches = [weakest]
+        else:
+            career_ids = [career_id for career_id in career_ids if career_id in self._positions]
+            self._thresholds[[self._positions[career_id] for career_id in career_ids]] = 0
+            batches = [
+                weakest.filter(career_id__in=career_ids[start:start + WRITE_BATCH_SIZE])
+                for start in range(0, len(career_ids), WRITE_BATCH_SIZE)
+            ]
+        for batch in batches:
+            for career_id, score in batch.values_list('career_id', 'score').iterator(chunk_size=WRITE_BATCH_SIZE):
+                position = self._positions.get(career_id)
+                if position is not None:
+                    self._thresholds[position] = score
+
+    def update(self, career_ids, listed_by=()):
+        """Recompute the neighbour lists that changes to ``career_ids`` can affect"""
+        career_ids = set(career_ids)
+        with self._lock:
+            version = self._sync()
+            self._patch(career_ids)
+            count = len(self._ids)
+            matrix, active = self._matrix[:count], self._active[:count]
+
+            affected = set(listed_by) | set(
+                SimilarCareer.objects.using(PRIMARY).filter(similar_id__in=career_ids)
+                .order_by().values_list('career_id', flat=True)
+            )
+            changed = [
+                self._positions[career_id] for career_id in career_ids
+                if career_id in self._positions and active[self._positions[career_id]]
+            ]
+            if changed:
+                affected.update(self._ids[position] for position in changed)
+                # Careers whose weakest stored neighbour scores below a changed career
+                best = (matrix[changed] @ matrix.T).max(axis=0)
+                affected.update(self._ids[position] for position in np.flatnonzero(best > self._thresholds[:count]))
+
+            affected = [
+                career_id for career_id in affected
+                if career_id in self._positions and active[self._positions[career_id]]
+            ]
+            results = []
+            size = block_size(count)
+            for start in range(0, len(affected), size):
+                block = affected[start:start + size]
+                block_positions = np.array([self._positions[career_id] for career_id in block])
+                positions, scores = top_neighbours(matrix, block_positions, SIMILAR_LIMIT)
+                self._thresholds[block_positions] = weakest_scores(scores)
+                results.append(neighbour_rows(block, self._ids, positions, scores))
+            write_neighbours(itertools.chain.from_iterable(results), career_ids | set(affected))
+
+            generation = bump_generation(SimilarCareer)
+            cache.set(CHANGES_KEY.format(generation), (sorted(career_ids), sorted(affected)), CHANGE_LOG_TIMEOUT)
+            # With another update in between, the next use replays both from the log
+            self._version = generation if generation == version + 1 else version
+
+
+similarity_index = SimilarityIndex()
+
+
+def update_similar_careers(career_ids, listed_by=()):
+    """
+    Recompute the neighbour lists that changes to ``career_ids`` can affect.
+
+    ``listed_by`` are careers known to list them, for deletes whose
+    SimilarCareer rows are already gone.
+    """
+    similarity_index.update(career_ids, listed_by)
+
+
+# The batch of changes of the current thread's transaction
+_pending = threading.local()
+
+
+class PendingUpdate:
+    """Changes saved in one transaction, handed to a single update once it commits"""
+
+    def __init__(self):
+        # (on_commit callback, career IDs, listed_by) per change
+        self.changes = []
+        self.flushed = False
+
+    def flush(self):
+        if getattr(_pending, 'batch', None) is self:
+            _pending.batch = None
+        # Every change registers a callback; the first one to run sends the batch
+        if self.flushed:
+            return
+        self.flushed = True
+        career_ids, listed_by = set(), set()
+        for _, changed, listed in self.changes:
+            career_ids |= changed
+            listed_by |= listed
+        run_after_commit(update_similar_careers, career_ids, listed_by)
+
+
+def schedule_update(career_ids, listed_by=()):
+    """
+    Update the lists affected by ``career_ids`` once the current transaction commits.
+
+    Changes saved in one transaction are coalesced into a single update.
+    A rollback drops the on_commit callbacks registered inside it; the
+    changes whose callback is gone are left out of the batch when the next
+    change is scheduled. (A savepoint rolled back after the last change of
+    a committed transaction still has its careers updated, which only
+    recomputes their lists needlessly.)
+    """
+    batch = getattr(_pending, 'batch', None)
+    if batch is not None:
+        registered = {id(callback) for _, callback, _ in transaction.get_connection().run_on_commit}
+        batch.changes = [change for change in batch.changes if id(change[0]) in registered]
+        if not batch.changes:
+            batch = None
+    if batch is None:
+        batch = _pending.batch = PendingUpdate()
+    callback = functools.partial(batch.flush)
+    batch.changes.append((callback, set(career_ids), set(listed_by)))
+    transaction.on_commit(callback)
+
+
+def similar_careers(career_id, limit=SIMILAR_LIMIT):
+    """Stored neighbours of a career that are still active, best first, with their careers joined in"""
+    return list(
+        SimilarCareer.objects.filter(career_id=career_id, similar__is_active=True).select_related('similar')
+        .only('score', 'rank', 'similar', *(f'similar__{field}' for field in CareerSummarySerializer.Meta.fields))
+        .order_by('rank')[:limit]
+    )
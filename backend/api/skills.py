@@ -0,0 +1,181 @@
+"""
+Inverted skill index over CareerPath.required_skills.
+
+Skills are normalized into a shared vocabulary and every vocabulary entry
+keeps a posting list (set of career IDs). Matching a skill list against the
+catalog only touches the posting lists of the requested skills, so it never
+scans the career table or the serialized JSON column.
+
+The index is built lazily from the database and records the CareerPath
+generation it was read at; it is rebuilt on the next use after the
+generation moves, which with a shared cache includes writes made by other
+processes. The save/delete signals also patch it in place in the process
+that wrote.
+"""
+import math
+import re
+import threading
+from collections import Counter
+
+from .caching import get_generation
+from .models import CareerPath
+from .replicas import PRIMARY
+
+
+MATCH_METHODS = ('jaccard', 'weighted')
+
+SEPARATOR_RE = re.compile(r'[^a-z0-9+#]+')
+
+
+def normalize_skill(skill):
+    """Canonical vocabulary key for a skill label ('Problem-Solving' -> 'problem solving')"""
+    text = str(skill).lower().replace('&', ' and ')
+    return SEPARATOR_RE.sub(' ', text).strip()
+
+
+def normalize_skills(skills):
+    """Normalized, de-duplicated skill set from a list of labels"""
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    if not isinstance(skills, (list, tuple, set, frozenset)):
+        return frozenset()
+    return frozenset(key for key in (normalize_skill(s) for s in skills if s) if key)
+
+
+class SkillIndex:
+    """In-memory posting lists from normalized skill to career IDs"""
+
+    def __init__(self):
+        self._postings = None
+        self._career_skills = {}
+        self._labels = {}
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _ensure_built(self):
+        if self._postings is None or self._version != get_generation(CareerPath):
+            self._build()
+
+    def _build(self):
+        # Read before the rows, so a write during the read leaves the index stale
+        version = get_generation(CareerPath)
+        postings = {}
+        career_skills = {}
+        labels = {}
+        rows = CareerPath.objects.using(PRIMARY).filter(is_active=True).values_list('id', 'required_skills')
+        for career_id, required_skills in rows.iterator(chunk_size=2000):
+            skills = normalize_skills(required_skills)
+            career_skills[career_id] = skills
+            for skill in skills:
+                postings.setdefault(skill, set()).add(career_id)
+            for label in required_skills if isinstance(required_skills, list) else []:
+                labels.setdefault(normalize_skill(label), str(label).strip())
+        self._postings = postings
+        self._career_skills = career_skills
+        self._labels = labels
+        self._version = version
+
+    def rebuild(self):
+        """Rebuild every posting list from the active career paths"""
+        with self._lock:
+            self._build()
+
+    def invalidate(self):
+        """Drop the index so it is rebuilt on next use"""
+        with self._lock:
+            self._postings = None
+            self._career_skills = {}
+            self._labels = {}
+
+    def _remove(self, career_id):
+        for skill in self._career_skills.pop(career_id, ()):
+            posting = self._postings.get(skill)
+            if posting is not None:
+                posting.discard(career_id)
+                if not posting:
+                    del self._postings[skill]
+
+    def update_career(self, career):
+        """Re-index a single career after it was saved"""
+        with self._lock:
+            if self._postings is None:
+                return
+            self._remove(career.pk)
+            if not career.is_active:
+                return
+            skills = normalize_skills(career.required_skills)
+            self._career_skills[career.pk] = skills
+            for skill in skills:
+                self._postings.setdefault(skill, set()).add(career.pk)
+            for label in career.required_skills if isinstance(career.required_skills, list) else []:
+                self._labels.setdefault(normalize_skill(label), str(label).strip())
+
+    def remove_career(self, career_id):
+        """Drop a deleted career from every posting list"""
+        with self._lock:
+            if self._postings is not None:
+                self._remove(career_id)
+
+    def vocabulary(self):
+        """Known skills with the number of active careers requiring each"""
+        with self._lock:
+            self._ensure_built()
+            return sorted(
+                ({'skill': self._labels.get(skill, skill), 'key': skill, 'careers': len(posting)}
+                 for skill, posting in self._postings.items()),
+                key=lambda entry: (-entry['careers'], entry['key']),
+            )
+
+    def careers_with(self, skill):
+        """Posting list for a single skill"""
+        with self._lock:
+            self._ensure_built()
+            return frozenset(self._postings.get(normalize_skill(skill), ()))
+
+    def match(self, skills, method='jaccard', limit=20):
+        """
+        Rank careers by overlap with a skill list.
+
+        Returns ``(career_id, score, matched_skills)`` tuples, best match first.
+        ``jaccard`` scores |Q & S| / |Q | S|; ``weighted`` does the same with
+        each skill weighted by its inverse document frequency, so rare skills
+        count for more than ubiquitous ones like "communication".
+        """
+        if method not in MATCH_METHODS:
+            raise ValueError(f"Unknown match method '{method}'")
+        query = normalize_skills(skills)
+        if not query:
+            return []
+
+        with self._lock:
+            self._ensure_built()
+            overlap = Counter()
+            for skill in query:
+                overlap.update(self._postings.get(skill, ()))
+            if not overlap:
+                return []
+
+            total = len(self._career_skills) or 1
+            idf = {}
+
+            def weight(skill):
+                if skill not in idf:
+                    idf[skill] = math.log(1 + total / (1 + len(self._postings.get(skill, ()))))
+                return idf[skill]
+
+            matches = []
+            for career_id, shared in overlap.items():
+                career_skills = self._career_skills[career_id]
+                matched = query & career_skills
+                if method == 'jaccard':
+                    score = shared / (len(query) + len(career_skills) - shared)
+                else:
+                    union = query | career_skills
+                    score = sum(weight(s) for s in matched) / sum(weight(s) for s in union)
+                matches.append((career_id, score, sorted(self._labels.get(s, s) for s in matched)))
+
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit] if limit else matches
+
+
+skill_index = SkillIndex()
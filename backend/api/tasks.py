@@ -0,0 +1,93 @@
+"""
+Background recommendation jobs.
+
+An asynchronous assessment submit stores the AssessmentResult with
+``recommendation_status='pending'`` and hands its ID to a thread pool once
+the transaction commits. The database row is the job record: a worker fills
+in ``recommended_careers`` and flips the status to ``ready`` (or ``failed``),
+and ``process_pending_recommendations`` picks up rows whose worker died with
+the process, so no external broker is needed.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .caching import bump_user_generation
+from .matching import matcher
+from .models import AssessmentResult
+
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATION_LIMIT = 5
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'API_RECOMMENDATION_WORKERS', 4),
+                    thread_name_prefix='recommendations',
+                )
+    return _executor
+
+
+def compute_recommendations(result_id):
+    """Score a pending result and store its recommendations"""
+    user_id = None
+    try:
+        row = AssessmentResult.objects.filter(
+            pk=result_id, recommendation_status='pending'
+        ).values_list('answers', 'user_id').first()
+        if row is None:
+            return False
+        answers, user_id = row
+        recommendations = matcher.recommend(answers, limit=RECOMMENDATION_LIMIT)
+        AssessmentResult.objects.filter(pk=result_id, recommendation_status='pending').update(
+            recommended_careers=[r['id'] for r in recommendations],
+            recommendation_status='ready',
+        )
+        return True
+    except Exception:
+        logger.exception('Computing recommendations for result %s failed', result_id)
+        AssessmentResult.objects.filter(pk=result_id).update(recommendation_status='failed')
+        return False
+    finally:
+        # update() sends no signals
+        bump_user_generation(user_id)
+
+
+def _run_in_worker(func, *args):
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Background task %s%r failed', func.__name__, args)
+    finally:
+        close_old_connections()
+
+
+def run_after_commit(func, *args):
+    """
+    Run ``func(*args)`` on the worker pool once the current transaction commits.
+
+    With ``API_TASKS_EAGER`` the job runs inline instead, which keeps tests
+    and single-process scripts deterministic.
+    """
+    if getattr(settings, 'API_TASKS_EAGER', False):
+        transaction.on_commit(lambda: func(*args))
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, func, *args))
+
+
+def enqueue_recommendations(result_id):
+    """Compute recommendations for a result after the current transaction commits"""
+    run_after_commit(compute_recommendations, result_id)
@@ -1,3 +1,1954 @@
-from django.test import TestCase
+import csv
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+from urllib.error import HTTPError
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .benchmarks import ScenarioContext, compare, percentile, run_in_process
+from .caching import bump_generation, get_generation, get_user_generation, mark_replicas_synced, replica_generations
+from .catalog_import import CatalogImporter
+from .exports import export_results
+from .facets import rebuild_counts, stored_counts
+from .fastpath import RowEncoder
+from .matching import matcher
+from .metrics import RouteHistograms, quantile, registry as metrics_registry
+from .models import (
+    CareerPath, CareerAssessment, AssessmentResult, CareerResource, UserProfile, MaterializedRecommendation,
+    FacetCount, SimilarCareer
+)
+from .questions import compile_questions
+from .recommendations import refresh_owner, sync_careers
+from .replicas import PIN_COOKIE, ReplicaRouter, reset_pin, use_primary
+from .salaries import salary_index
+from .sampling import featured_sampler
+from .sample_data import SAMPLE_ASSESSMENT, generate_catalog, random_answers
+from .search import MemorySearchBackend, get_search_backend
+from .similarity import (
+    CHANGES_KEY, SIMILAR_LIMIT, SimilarityIndex, build_similar_careers, catalog_rows, similarity_index, update_similar_careers,
+)
+from .skills import skill_index, normalize_skill
+from .writes import WriteQueue, create_result
+
+
+def reset_caches():
+    """Drop caches and in-process indexes, which do not see test transaction rollbacks"""
+    for alias in settings.CACHES:
+        caches[alias].clear()
+    matcher.invalidate()
+    skill_index.invalidate()
+    salary_index.invalidate()
+    similarity_index.invalidate()
+
+
+def create_career(**overrides):
+    data = {
+        'title': 'Software Developer',
+        'description': 'Design, develop, and maintain software applications and systems.',
+        'category': 'technology',
+        'salary_range_min': 60000,
+        'salary_range_max': 120000,
+        'education_level': 'bachelors',
+        'required_skills': ['Programming', 'Problem Solving', 'Teamwork', 'Communication'],
+        'growth_outlook': 'high',
+        'work_environment': 'office',
+    }
+    data.update(overrides)
+    return CareerPath.objects.create(**data)
+
+
+def create_sample_careers():
+    return [
+        create_career(),
+        create_career(
+            title='Registered Nurse', category='healthcare', work_environment='hospital',
+            salary_range_min=50000, salary_range_max=80000,
+            required_skills=['Patient Care', 'Medical Knowledge', 'Empathy', 'Critical Thinking'],
+        ),
+        create_career(
+            title='Financial Analyst', category='finance', growth_outlook='medium',
+            salary_range_min=55000, salary_range_max=95000,
+            required_skills=['Financial Modeling', 'Excel', 'Analytical Thinking'],
+        ),
+    ]
+
+
+class CareerMatcherTests(TestCase):
+    """
+    Tests for the vectorized career matching engine.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+
+    def test_recommend_ranks_best_match_first(self):
+        answers = ['Hospital or clinical setting', 'Helping and caring for others', ['Medical knowledge']]
+        recommendations = matcher.recommend(answers, limit=2)
+        self.assertEqual([r['id'] for r in recommendations][0], self.nurse.id)
+        self.assertEqual(len(recommendations), 2)
+        self.assertGreaterEqual(recommendations[0]['score'], recommendations[1]['score'])
+
+    def test_vectorize_reads_bigrams_and_salary(self):
+        vector = matcher.vectorize(['High school diploma', '$70,000 - $90,000'])
+        self.assertEqual(vector[matcher.columns[('education_level', 'high_school')]], 1.0)
+        self.assertEqual(vector[matcher.columns[('salary', 2)]], 1.0)
+        self.assertEqual(vector[matcher.columns[('salary', 1)]], 0.0)
+
+    def test_matrix_rebuilt_after_career_changes(self):
+        self.assertEqual(len(matcher.snapshot()), 3)
+        self.nurse.is_active = False
+        self.nurse.save()
+        self.assertNotIn(self.nurse.id, matcher.snapshot().ids)
+        self.analyst.delete()
+        self.assertEqual(len(matcher.snapshot()), 1)
+
+    def test_matrix_follows_writes_from_other_processes(self):
+        snapshot = matcher.snapshot()
+        self.assertIs(matcher.snapshot(), snapshot)
+        # Another worker's write: no local signal, only the shared generation moves
+        CareerPath.objects.filter(pk=self.nurse.pk).update(is_active=False)
+        self.assertIs(matcher.snapshot(), snapshot)
+        bump_generation(CareerPath)
+        self.assertNotIn(self.nurse.id, matcher.snapshot().ids)
+
+
+class AssessmentSubmitTests(APITestCase):
+    """
+    Tests for assessment submission and recommendations.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+        self.assessment = CareerAssessment.objects.create(
+            title='Career Interest Assessment', description='Find matching careers.',
+        )
+
+    def test_submit_stores_recommendations(self):
+        response = self.client.post(
+            f'/api/assessments/{self.assessment.id}/submit/',
+            {
+                'assessment_id': self.assessment.id,
+                'answers': ['Office setting with regular hours', 'Solving complex problems',
+                            ['Programming and coding']],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        result = AssessmentResult.objects.get(id=response.data['id'])
+        self.assertEqual(result.recommended_careers[0], self.developer.id)
+        self.assertEqual(len(result.recommended_careers), 3)
+        self.assertEqual(result.recommendation_status, 'ready')
+
+    @override_settings(API_TASKS_EAGER=True)
+    def test_async_submit_returns_accepted_and_completes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/assessments/{self.assessment.id}/submit/?async=true',
+                {'assessment_id': self.assessment.id, 'answers': ['Hospital or clinical setting'],
+                 'session_id': 'abc'},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['recommendation_status'], 'pending')
+        self.assertEqual(response['Location'], response.data['status_url'])
+
+        status_response = self.client.get(response.data['status_url'] + '&wait=1')
+        self.assertEqual(status_response.data['recommendation_status'], 'ready')
+        self.assertEqual(status_response.data['recommended_careers'][0], self.nurse.id)
+
+    def test_pending_results_are_processed_by_command(self):
+        result = AssessmentResult.objects.create(
+            assessment=self.assessment, answers=['Analyzing data and numbers'],
+            recommendation_status='pending',
+        )
+        call_command('process_pending_recommendations', stdout=StringIO())
+        result.refresh_from_db()
+        self.assertEqual(result.recommendation_status, 'ready')
+        self.assertEqual(result.recommended_careers[0], self.analyst.id)
+
+
+class SkillIndexTests(APITestCase):
+    """
+    Tests for the inverted skill index and skill matching endpoints.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+        self.scientist = create_career(
+            title='Data Scientist', education_level='masters',
+            required_skills=['Statistics', 'Python', 'Machine Learning', 'Problem-Solving'],
+        )
+
+    def test_normalize_skill(self):
+        self.assertEqual(normalize_skill('  Problem-Solving '), 'problem solving')
+        self.assertEqual(normalize_skill('R&D'), 'r and d')
+
+    def test_by_skills_ranks_by_overlap(self):
+        response = self.client.get('/api/career-paths/by-skills/', {'skills': 'python,problem solving'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.data], [self.scientist.id, self.developer.id])
+        self.assertEqual(response.data[0]['matched_skills'], ['Problem-Solving', 'Python'])
+        self.assertAlmostEqual(response.data[0]['match_score'], 2 / 4)
+
+    def test_by_skills_applies_filters_and_validates(self):
+        response = self.client.get('/api/career-paths/by-skills/',
+                                   {'skills': 'problem solving', 'education_level': 'masters'})
+        self.assertEqual([c['id'] for c in response.data], [self.scientist.id])
+        self.assertEqual(self.client.get('/api/career-paths/by-skills/').status_code, 400)
+        response = self.client.get('/api/career-paths/by-skills/', {'skills': 'python', 'method': 'cosine'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_index_follows_career_changes(self):
+        self.assertEqual(skill_index.careers_with('Empathy'), {self.nurse.id})
+        self.nurse.required_skills = ['Patient Care']
+        self.nurse.save()
+        self.assertEqual(skill_index.careers_with('Empathy'), set())
+        self.scientist.delete()
+        self.assertEqual(skill_index.careers_with('python'), set())
+
+    def test_index_follows_writes_from_other_processes(self):
+        self.assertEqual(skill_index.careers_with('Empathy'), {self.nurse.id})
+        CareerPath.objects.filter(pk=self.nurse.pk).update(required_skills=['Patient Care'])
+        bump_generation(CareerPath)
+        self.assertEqual(skill_index.careers_with('Empathy'), set())
+
+    def test_by_skills_loads_only_returned_careers(self):
+        for index in range(30):
+            create_career(title=f'Python Developer {index}', required_skills=['Python'])
+        skill_index.careers_with('python')
+        params = []
+
+        def record(execute, sql, sql_params, many, context):
+            params.append(len(sql_params or ()))
+            return execute(sql, sql_params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = self.client.get('/api/career-paths/by-skills/', {'skills': 'python', 'limit': 5})
+        self.assertEqual(len(response.data), 5)
+        # One query checks the ranked IDs against the filters, one loads the five winners
+        self.assertEqual(len(params), 2)
+        self.assertLessEqual(params[1], 5)
+
+    def test_profile_matching_careers(self):
+        user = User.objects.create_user('student', password='secret-pass')
+        UserProfile.objects.create(user=user, skills=['Excel', 'Financial modeling'])
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/profiles/me/matching-careers/', {'method': 'weighted'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['id'] for c in response.data], [self.analyst.id])
+
+
+class FeaturedCareerTests(APITestCase):
+    """
+    Tests for the featured career sampler.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.careers = create_sample_careers()
+        for index in range(7):
+            create_career(title=f'Career {index}')
+
+    def test_featured_returns_distinct_active_careers(self):
+        response = self.client.get('/api/career-paths/featured/')
+        self.assertEqual(response.status_code, 200)
+        ids = [c['id'] for c in response.data]
+        self.assertEqual(len(ids), 6)
+        self.assertEqual(len(set(ids)), 6)
+
+    def test_featured_uses_single_query_once_warm(self):
+        self.client.get('/api/career-paths/featured/')
+        with self.assertNumQueries(1):
+            self.client.get('/api/career-paths/featured/')
+
+    def test_seed_and_rotation_are_stable(self):
+        first = self.client.get('/api/career-paths/featured/', {'seed': 'abc'}).data
+        self.assertEqual(first, self.client.get('/api/career-paths/featured/', {'seed': 'abc'}).data)
+        response = self.client.get('/api/career-paths/featured/', {'rotation': 3600})
+        self.assertIn('max-age=', response['Cache-Control'])
+        self.assertEqual(self.client.get('/api/career-paths/featured/', {'rotation': 0}).status_code, 400)
+
+    def test_sampler_sees_career_writes(self):
+        for career in CareerPath.objects.exclude(pk=self.careers[0].pk):
+            career.delete()
+        ids = [c['id'] for c in self.client.get('/api/career-paths/featured/').data]
+        self.assertEqual(ids, [self.careers[0].id])
+
+
+class ResponseCacheTests(APITestCase):
+    """
+    Tests for the versioned catalog response cache.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.careers = create_sample_careers()
+        self.resource = CareerResource.objects.create(
+            title='How to Write a Winning Resume', content='A guide.', resource_type='guide',
+            category='resume', difficulty_level='beginner', is_featured=True,
+        )
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self.client.get('/api/career-paths/', {'category': 'technology'})
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/career-paths/', {'category': 'technology'})
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+        other = self.client.get('/api/career-paths/', {'category': 'finance'})
+        self.assertEqual(other['X-Cache'], 'MISS')
+
+    def test_write_invalidates_cached_responses(self):
+        self.client.get('/api/resources/featured/')
+        self.resource.title = 'Resume Basics'
+        self.resource.save()
+        response = self.client.get('/api/resources/featured/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data[0]['title'], 'Resume Basics')
+
+    def test_conditional_request_returns_not_modified(self):
+        response = self.client.get('/api/career-paths/categories/')
+        with self.assertNumQueries(0):
+            revalidated = self.client.get('/api/career-paths/categories/',
+                                          HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.careers[0].delete()
+        changed = self.client.get('/api/career-paths/categories/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+
+
+class FullTextSearchTests(APITestCase):
+    """
+    Tests for the full-text search index and filter backend.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+        self.resume = CareerResource.objects.create(
+            title='How to Write a Winning Resume', resource_type='guide', category='resume',
+            difficulty_level='beginner', tags=['resume', 'job search'],
+            content='A comprehensive guide to crafting a professional resume that stands out to employers.',
+        )
+        self.interview = CareerResource.objects.create(
+            title='Interview Preparation Checklist', resource_type='tool', category='interview',
+            difficulty_level='beginner', tags=['interview', 'preparation'],
+            content='Essential steps to prepare for any job interview, including reviewing your resume.',
+        )
+
+    def test_search_ranks_title_matches_first_with_snippets(self):
+        response = self.client.get('/api/resources/', {'search': 'resume'})
+        results = response.data['results']
+        self.assertEqual([r['id'] for r in results], [self.resume.id, self.interview.id])
+        self.assertIn('<mark>resume</mark>', results[0]['search_snippet'])
+        self.assertGreater(results[0]['search_score'], results[1]['search_score'])
+
+    def test_search_prefix_and_filters(self):
+        response = self.client.get('/api/career-paths/', {'search': 'patient ca', 'category': 'healthcare'})
+        self.assertEqual([r['id'] for r in response.data['results']], [self.nurse.id])
+        response = self.client.get('/api/career-paths/', {'search': 'patient', 'category': 'finance'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_index_follows_writes(self):
+        self.interview.content = 'Practice answering common questions.'
+        self.interview.save()
+        response = self.client.get('/api/resources/', {'search': 'resume'})
+        self.assertEqual([r['id'] for r in response.data['results']], [self.resume.id])
+        self.resume.delete()
+        self.assertEqual(self.client.get('/api/resources/', {'search': 'resume'}).data['results'], [])
+
+    def test_memory_backend_matches_fts_ranking(self):
+        backend = MemorySearchBackend()
+        hits = backend.search(CareerResource, 'resume')
+        self.assertEqual([hit.pk for hit in hits], [self.resume.id, self.interview.id])
+        self.assertIn('<mark>resume</mark>', hits[0].snippet)
+        self.assertEqual([hit.pk for hit in backend.search(CareerPath, 'financ')], [self.analyst.id])
+        nurse_id = self.nurse.pk
+        self.nurse.delete()
+        backend.remove(CareerPath, nurse_id)
+        self.assertEqual(backend.search(CareerPath, 'patient'), [])
+
+    def test_memory_backend_follows_writes_from_other_processes(self):
+        backend = MemorySearchBackend()
+        self.assertEqual([hit.pk for hit in backend.search(CareerPath, 'patient')], [self.nurse.id])
+        CareerPath.objects.filter(pk=self.nurse.pk).update(description='Hospital ward work.', required_skills=[])
+        bump_generation(CareerPath)
+        self.assertEqual(backend.search(CareerPath, 'patient'), [])
+
+    def test_search_combined_with_filters_sees_every_match(self):
+        CareerPath.objects.bulk_create([
+            CareerPath(
+                title=f'Analyst {index}', description='Analyst role.',
+                category='healthcare' if index < 10 else 'finance', education_level='bachelors', growth_outlook='medium', work_environment='office', required_skills=[],
+            )
+            for index in range(600)
+        ])
+        get_search_backend().rebuild(CareerPath)
+
+        response = self.client.get('/api/career-paths/', {'search': 'analyst', 'category': 'healthcare'})
+        self.assertEqual(response.data['count'], 10)
+        self.assertTrue(all(r['category'] == 'healthcare' for r in response.data['results']))
+        self.assertIn('<mark>Analyst</mark>', response.data['results'][0]['search_snippet'])
+        # The 600 new careers plus the sample Financial Analyst
+        self.assertEqual(self.client.get('/api/career-paths/', {'search': 'analyst'}).data['count'], 601)
+
+        backend = MemorySearchBackend()
+        self.assertEqual(backend.filter(CareerPath.objects.filter(category='healthcare'), 'analyst').count(), 10)
+        self.assertEqual(backend.filter(CareerPath.objects.all(), 'analyst').count(), 601)
+
+        # Broad matches neither bind one parameter per ID nor rank every one
+        params = []
+
+        def record(execute, sql, sql_params, many, context):
+            params.append(len(sql_params or ()))
+            return execute(sql, sql_params, many, context)
+        with patch('api.search.MAX_ID_PARAMS', 100), patch('api.search.MAX_RANKED_IDS', 5):
+            with connection.execute_wrapper(record):
+                matched = backend.filter(CareerPath.objects.all(), 'analyst').order_by('search_rank', 'pk')
+                matches = list(matched.values_list('pk', flat=True))
+        self.assertEqual(len(matches), 601)
+        self.assertEqual(matches[:5], [hit.pk for hit in backend.search(CareerPath, 'analyst', limit=5)])
+        self.assertEqual(matches[5:], sorted(matches[5:]))
+        self.assertLess(params[0], 20)
+
+
+class KeysetPaginationTests(APITestCase):
+    """
+    Tests for the keyset pagination mode.
+    """
+
+    def setUp(self):
+        reset_caches()
+        assessment = CareerAssessment.objects.create(title='Quiz', description='Quiz')
+        self.results = [
+            AssessmentResult.objects.create(assessment=assessment, session_id='abc')
+            for _ in range(25)
+        ]
+
+    def collect(self, url, params):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append(response.data)
+            if not response.data['next']:
+                return pages
+            response = self.client.get(response.data['next'])
+
+    def test_walks_results_in_keyset_order(self):
+        pages = self.collect('/api/assessment-results/',
+                             {'session_id': 'abc', 'pagination': 'keyset', 'page_size': 10})
+        self.assertEqual([len(page['results']) for page in pages], [10, 10, 5])
+        ids = [row['id'] for page in pages for row in page['results']]
+        expected = AssessmentResult.objects.order_by('-completed_at', 'id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get('/api/assessment-results/',
+                                {'session_id': 'abc', 'pagination': 'keyset', 'page_size': 10}).data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+
+    def test_deep_pages_cost_same_queries(self):
+        params = {'session_id': 'abc', 'pagination': 'keyset', 'page_size': 5}
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get('/api/assessment-results/', params)
+        for _ in range(3):
+            response = self.client.get(response.data['next'])
+        with CaptureQueriesContext(connection) as deep_page:
+            self.client.get(response.data['next'])
+        self.assertEqual(len(deep_page), len(first_page))
+        self.assertNotIn('COUNT(', ' '.join(q['sql'] for q in deep_page.captured_queries))
+        self.assertNotIn('OFFSET', ' '.join(q['sql'] for q in deep_page.captured_queries))
+
+    def test_ordering_with_nulls_and_invalid_cursor(self):
+        create_sample_careers()
+        create_career(title='Volunteer', salary_range_min=None, salary_range_max=None)
+        create_career(title='Apprentice', salary_range_min=None, salary_range_max=None)
+        pages = self.collect('/api/career-paths/',
+                             {'pagination': 'keyset', 'page_size': 2, 'ordering': '-salary_range_min'})
+        titles = [row['title'] for page in pages for row in page['results']]
+        # NULL salaries sort last when descending, tie-broken by id
+        self.assertEqual(titles, ['Software Developer', 'Financial Analyst', 'Registered Nurse',
+                                  'Volunteer', 'Apprentice'])
+        response = self.client.get('/api/career-paths/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkSubmitTests(APITestCase):
+    """
+    Tests for bulk assessment submission.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+        self.assessment = CareerAssessment.objects.create(
+            title='Quiz', description='Quiz', questions=[{'id': 1}, {'id': 2}],
+        )
+        self.url = f'/api/assessments/{self.assessment.id}/bulk-submit/'
+        self.client.force_authenticate(User.objects.create_user('teacher', password='secret-pass', is_staff=True))
+
+    def read_lines(self, response):
+        return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+    def test_json_array_upload(self):
+        rows = [
+            {'answers': ['Hospital or clinical setting'], 'session_id': 'student-1'},
+            {'answers': 'not a list'},
+            {'answers': ['Analyzing data and numbers', 'Excel']},
+        ]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 200)
+        lines = self.read_lines(response)
+        self.assertEqual([line.get('row') for line in lines[:3]], [0, 1, 2])
+        self.assertIn('errors', lines[1])
+        self.assertEqual(lines[-1], {'created': 2, 'failed': 1})
+        nurse_result = AssessmentResult.objects.get(id=lines[0]['id'])
+        self.assertEqual(nurse_result.session_id, 'student-1')
+        self.assertEqual(nurse_result.recommended_careers[0], self.nurse.id)
+
+    def test_ndjson_upload_in_chunks(self):
+        body = '\n'.join(
+            [json.dumps({'answers': ['Programming and coding']})] * 3 + ['{broken']
+        )
+        with patch('api.bulk.BULK_CHUNK_SIZE', 2):
+            response = self.client.generic('POST', self.url, body, content_type='application/x-ndjson')
+            lines = self.read_lines(response)
+        self.assertEqual(lines[-1], {'created': 3, 'failed': 1})
+        self.assertIn('Invalid JSON', lines[3]['errors']['non_field_errors'][0])
+        self.assertEqual(AssessmentResult.objects.filter(assessment=self.assessment).count(), 3)
+
+    def test_requires_staff_and_array(self):
+        self.assertEqual(self.client.post(self.url, {'answers': []}, format='json').status_code, 400)
+        # Other users could otherwise write results into any session
+        self.client.force_authenticate(User.objects.create_user('student', password='secret-pass'))
+        rows = [{'answers': ['Programming and coding'], 'session_id': 'someone-else'}]
+        self.assertEqual(self.client.post(self.url, rows, format='json').status_code, 403)
+        self.assertFalse(AssessmentResult.objects.filter(session_id='someone-else').exists())
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(self.url, [], format='json').status_code, 403)
+
+
+@override_settings(API_TASKS_EAGER=True)
+class MaterializedRecommendationTests(APITestCase):
+    """
+    Tests for materialized per-user recommendations.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+        self.assessment = CareerAssessment.objects.create(title='Quiz', description='Quiz')
+        self.user = User.objects.create_user('student', password='secret-pass')
+        self.client.force_authenticate(self.user)
+
+    def create_result(self, answers, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AssessmentResult.objects.create(assessment=self.assessment, answers=answers, **kwargs)
+
+    def test_new_result_materializes_ranked_rows(self):
+        result = self.create_result(['Hospital or clinical setting'], user=self.user)
+        rows = list(MaterializedRecommendation.objects.filter(user=self.user))
+        self.assertEqual(rows[0].career_id, self.nurse.id)
+        self.assertEqual([row.rank for row in rows], list(range(1, len(rows) + 1)))
+        self.assertEqual(rows[0].assessment_result_id, result.id)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/recommendations/')
+        self.assertEqual(response.data[0]['career_id'], self.nurse.id)
+        self.assertEqual(response.data[0]['title'], 'Registered Nurse')
+
+    def test_career_changes_patch_or_recompute_owners(self):
+        self.create_result(['Hospital or clinical setting', 'Programming and coding'], user=self.user)
+        self.nurse.title = 'Nurse Practitioner'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nurse.save()
+        self.assertEqual(
+            MaterializedRecommendation.objects.get(user=self.user, career=self.nurse).career_title,
+            'Nurse Practitioner'
+        )
+
+        self.nurse.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nurse.save()
+        self.assertFalse(MaterializedRecommendation.objects.filter(career=self.nurse).exists())
+        self.assertTrue(MaterializedRecommendation.objects.filter(user=self.user).exists())
+
+    def test_scored_field_changes_rescore_owners(self):
+        self.create_result(['Hospital or clinical setting'], user=self.user)
+        before = MaterializedRecommendation.objects.get(user=self.user, rank=1)
+        self.assertEqual(before.career_id, self.nurse.id)
+
+        # Display-only edits are patched without recomputing
+        self.nurse.title = 'Nurse Practitioner'
+        with patch('api.signals.refresh_owners') as refresh, self.captureOnCommitCallbacks(execute=True):
+            self.nurse.save()
+        refresh.assert_not_called()
+
+        self.nurse.category = 'finance'
+        self.nurse.work_environment = 'office'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nurse.save()
+        after = MaterializedRecommendation.objects.filter(user=self.user, career=self.nurse).first()
+        self.assertTrue(after is None or after.score < before.score)
+
+    def test_bulk_import_rescores_owners(self):
+        self.create_result(['Hospital or clinical setting'], user=self.user)
+        before = MaterializedRecommendation.objects.get(user=self.user, career=self.nurse).score
+        CareerPath.objects.filter(pk=self.nurse.pk).update(category='finance', work_environment='office')
+        bump_generation(CareerPath)
+        sync_careers([self.nurse.id], rescored_ids=[self.nurse.id])
+        after = MaterializedRecommendation.objects.filter(user=self.user, career=self.nurse).first()
+        self.assertTrue(after is None or after.score < before)
+
+    def test_profile_change_refreshes_only_that_user(self):
+        other = User.objects.create_user('other', password='secret-pass')
+        self.create_result(['Office setting with regular hours'], user=other)
+        other_rows = list(MaterializedRecommendation.objects.filter(user=other).values_list('id', flat=True))
+
+        profile = UserProfile.objects.create(user=self.user)
+        self.assertFalse(MaterializedRecommendation.objects.filter(user=self.user).exists())
+        profile.skills = ['Financial Modeling', 'Excel']
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(MaterializedRecommendation.objects.filter(user=self.user).first().career_id, self.analyst.id)
+        self.assertEqual(
+            list(MaterializedRecommendation.objects.filter(user=other).values_list('id', flat=True)), other_rows
+        )
+
+    def test_anonymous_session_is_filled_lazily(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/recommendations/').data, [])
+        AssessmentResult.objects.bulk_create([
+            AssessmentResult(assessment=self.assessment, answers=['Analyzing data and numbers'], session_id='s1')
+        ])
+        response = self.client.get('/api/recommendations/', {'session_id': 's1'})
+        self.assertEqual(response.data[0]['career_id'], self.analyst.id)
+        self.assertTrue(MaterializedRecommendation.objects.filter(session_id='s1').exists())
+
+    def test_owner_without_matches_is_remembered(self):
+        self.client.force_authenticate(None)
+        AssessmentResult.objects.create(assessment=self.assessment, answers=[], session_id='s2')
+        self.assertEqual(self.client.get('/api/recommendations/', {'session_id': 's2'}).data, [])
+        # The rows and the latest result are read; nothing is recomputed or written
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get('/api/recommendations/', {'session_id': 's2'}).data, [])
+
+        AssessmentResult.objects.bulk_create([
+            AssessmentResult(assessment=self.assessment, answers=['Hospital or clinical setting'], session_id='s2')
+        ])
+        response = self.client.get('/api/recommendations/', {'session_id': 's2'})
+        self.assertEqual(response.data[0]['career_id'], self.nurse.id)
+
+    def test_ranks_are_unique_per_owner(self):
+        self.create_result(['Hospital or clinical setting'], user=self.user)
+        row = MaterializedRecommendation.objects.filter(user=self.user).first()
+        row.pk = None
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            row.save()
+
+
+SAMPLE_QUESTIONS = [
+    {'id': 1, 'question': 'What type of work environment do you prefer?', 'type': 'multiple_choice',
+     'options': ['Office setting with regular hours', 'Hospital or clinical setting']},
+    {'id': 2, 'question': 'Which skills do you feel most confident in?', 'type': 'multiple_select',
+     'options': ['Programming and coding', 'Medical knowledge', 'Creative design']},
+    {'id': 3, 'question': 'Anything else?', 'type': 'text'},
+]
+
+
+class QuestionSchemaTests(APITestCase):
+    """
+    Tests for compiled question schemas and answer validation.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+        self.assessment = CareerAssessment.objects.create(
+            title='Quiz', description='Quiz', questions=SAMPLE_QUESTIONS,
+        )
+        self.url = f'/api/assessments/{self.assessment.id}/submit/'
+
+    def test_schema_accepts_positional_and_keyed_answers(self):
+        schema = compile_questions(self.assessment)
+        self.assertIs(schema, compile_questions(self.assessment))
+        self.assertEqual(schema.errors(['Office setting with regular hours', ['Programming and coding'], 'Hi']), [])
+        self.assertEqual(schema.errors({'2': ['Medical knowledge'], '1': None}), [])
+
+    def test_schema_rejects_bad_answers(self):
+        schema = compile_questions(self.assessment)
+        self.assertIn('not a valid option', schema.errors(['Underwater'])[0])
+        self.assertIn('at most 3', schema.errors(['a', 'b', 'c', 'd'])[0])
+        self.assertIn('duplicate', schema.errors([None, ['Creative design', 'Creative design']])[0])
+        self.assertIn('Unknown question', schema.errors({'9': 'x'})[0])
+        self.assertIn('longer than', schema.errors([None, None, 'x' * 501])[0])
+
+    def test_submit_validates_without_extra_queries(self):
+        matcher.snapshot()
+        payload = {'assessment_id': self.assessment.id,
+                   'answers': ['Hospital or clinical setting', ['Medical knowledge']]}
+        # Fetch the assessment, insert the result
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.post(self.url, {'answers': ['Underwater']}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('answers', response.data)
+        response = self.client.post(self.url, {'assessment_id': 999, 'answers': ['x']}, format='json')
+        self.assertIn('assessment_id', response.data)
+
+    def test_oversized_submission_is_rejected(self):
+        response = self.client.post(self.url, {'answers': ['x' * (70 * 1024)]}, format='json')
+        self.assertEqual(response.status_code, 413)
+
+    def test_malformed_content_length_is_rejected(self):
+        response = self.client.post(self.url, {'answers': ['x']}, format='json', CONTENT_LENGTH='12abc')
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryCountTests(APITestCase):
+    """
+    Tests that list endpoints issue a fixed number of queries whatever the page size.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.careers = create_sample_careers()
+        self.user = User.objects.create_user('student', password='secret-pass')
+        career_ids = [career.id for career in self.careers]
+        for number in range(12):
+            assessment = CareerAssessment.objects.create(title=f'Quiz {number}', description='Quiz')
+            AssessmentResult.objects.create(
+                assessment=assessment, answers=['Excel'], user=self.user, recommended_careers=career_ids,
+            )
+            AssessmentResult.objects.create(
+                assessment=assessment, answers=['Excel'], session_id='abc', recommended_careers=career_ids[:1],
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries), response
+
+    def assertStableQueryCount(self, url):
+        separator = '&' if '?' in url else '?'
+        small, _ = self.count_queries(f'{url}{separator}page_size=1')
+        large, response = self.count_queries(f'{url}{separator}page_size=20')
+        self.assertEqual(small, large, url)
+        return large, response
+
+    def test_result_lists(self):
+        self.assertStableQueryCount('/api/assessment-results/?session_id=abc')
+        self.assertStableQueryCount('/api/assessment-results/?session_id=abc&pagination=keyset')
+        self.client.force_authenticate(self.user)
+        queries, response = self.assertStableQueryCount('/api/assessment-results/')
+        self.assertEqual(queries, 2)
+        self.assertEqual(response.data['results'][0]['assessment_title'], 'Quiz 11')
+        self.assertEqual(response.data['results'][0]['user_username'], 'student')
+
+    def test_expand_careers_uses_one_query(self):
+        self.client.force_authenticate(self.user)
+        queries, response = self.assertStableQueryCount('/api/assessment-results/?expand=careers')
+        self.assertEqual(queries, 3)
+        careers = response.data['results'][0]['careers']
+        self.assertEqual([career['id'] for career in careers], [career.id for career in self.careers])
+        self.assertEqual(set(careers[0]), {
+            'id', 'title', 'category', 'salary_range_min', 'salary_range_max', 'growth_outlook'
+        })
+        self.assertNotIn('careers', self.client.get('/api/assessment-results/').data['results'][0])
+
+        result_id = response.data['results'][0]['id']
+        detail = self.client.get(f'/api/assessment-results/{result_id}/?expand=careers')
+        self.assertEqual(len(detail.data['careers']), 3)
+
+    def test_profile_is_one_query(self):
+        UserProfile.objects.create(user=self.user, current_career_path=self.careers[0])
+        self.client.force_authenticate(self.user)
+        queries, response = self.count_queries('/api/profiles/me/')
+        self.assertEqual(queries, 1)
+        self.assertEqual(response.data['current_career_path']['id'], self.careers[0].id)
+        self.assertStableQueryCount('/api/profiles/')
+
+    def test_admin_changelists(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'secret-pass')
+        self.client.force_login(admin_user)
+        UserProfile.objects.create(user=self.user, current_career_path=self.careers[0])
+        for url in ['/django-admin/api/assessmentresult/', '/django-admin/api/userprofile/']:
+            # The first request also loads (and caches) the session user
+            self.client.get(url)
+            first, _ = self.count_queries(url)
+            UserProfile.objects.create(
+                user=User.objects.create_user(f'extra-{url[-8:-1]}'), current_career_path=self.careers[1]
+            )
+            AssessmentResult.objects.create(
+                assessment=CareerAssessment.objects.create(title='Extra', description='Extra'),
+                answers=[], user=admin_user,
+            )
+            second, _ = self.count_queries(url)
+            self.assertEqual(first, second, url)
+
+
+class SparseFieldsetTests(APITestCase):
+    """
+    Tests for sparse fieldsets and lean list representations.
+    """
+
+    def setUp(self):
+        reset_caches()
+        create_sample_careers()
+        for number in range(3):
+            CareerResource.objects.create(
+                title=f'Guide {number}', content='Long body. ' * 500, resource_type='guide',
+                category='resume', difficulty_level='beginner', tags=['resume'],
+            )
+        self.assessment = CareerAssessment.objects.create(
+            title='Quiz', description='Quiz', instructions='Answer all.', questions=SAMPLE_QUESTIONS,
+        )
+
+    def get_with_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [query['sql'] for query in queries.captured_queries]
+
+    def test_resource_list_defers_content(self):
+        response, queries = self.get_with_queries('/api/resources/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('content', response.data['results'][0])
+        self.assertIn('tags', response.data['results'][0])
+        self.assertFalse(any('"content"' in sql for sql in queries))
+
+        detail = self.client.get(f"/api/resources/{response.data['results'][0]['id']}/")
+        self.assertIn('content', detail.data)
+
+    def test_assessment_list_omits_questions(self):
+        listed = self.client.get('/api/assessments/').data['results'][0]
+        self.assertNotIn('questions', listed)
+        self.assertNotIn('instructions', listed)
+        self.assertEqual(len(self.client.get(f'/api/assessments/{self.assessment.id}/').data['questions']), 3)
+
+    def test_fields_and_omit(self):
+        response, queries = self.get_with_queries('/api/career-paths/?fields=id,title')
+        self.assertEqual([set(row) for row in response.data['results']], [{'id', 'title'}] * 3)
+        self.assertFalse(any('"description"' in sql for sql in queries))
+
+        row = self.client.get('/api/career-paths/?omit=description,required_skills').data['results'][0]
+        self.assertNotIn('description', row)
+        self.assertIn('category', row)
+
+        detail = self.client.get(f"/api/resources/{CareerResource.objects.first().id}/?fields=title,content")
+        self.assertEqual(set(detail.data), {'title', 'content'})
+
+    def test_keyset_pages_with_sparse_fields(self):
+        response, queries = self.get_with_queries('/api/career-paths/?pagination=keyset&page_size=2&fields=id')
+        self.assertEqual(len(queries), 1)
+        following = self.client.get(response.data['next'])
+        self.assertEqual([set(row) for row in following.data['results']], [{'id'}])
+
+    def test_by_skills_ignores_fields_when_loading(self):
+        skill_index.careers_with('programming')
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/career-paths/by-skills/?skills=Programming,Excel&fields=id,title')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+        self.assertIn('description', response.data[0])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/resources/?fields=title,content')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('content', response.data['fields'][0])
+        self.assertEqual(self.client.get('/api/career-paths/?omit=nope').status_code, 400)
+
+
+class FastListTests(APITestCase):
+    """
+    Tests that the values() list path renders exactly what the serializers do.
+    """
+
+    urls = [
+        '/api/career-paths/',
+        '/api/career-paths/?category=technology&ordering=-salary_range_min',
+        '/api/career-paths/?pagination=keyset&page_size=2',
+        '/api/career-paths/?search=nurse',
+        '/api/career-paths/?fields=id,title,created_at',
+        '/api/career-paths/featured/?seed=7',
+        '/api/resources/',
+        '/api/resources/?pagination=keyset&page_size=1',
+        '/api/resources/featured/',
+    ]
+
+    def setUp(self):
+        reset_caches()
+        create_sample_careers()
+        for number, featured in enumerate([True, False]):
+            CareerResource.objects.create(
+                title=f'Guide {number}', content='Body', resource_type='guide', category='resume',
+                difficulty_level='beginner', tags=['résumé', number], is_featured=featured,
+            )
+
+    def fetch(self, url):
+        caches['api'].clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_matches_serializer_output(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                with override_settings(API_FAST_LIST=False):
+                    expected = self.fetch(url)
+                fast = self.fetch(url)
+                self.assertEqual(json.loads(fast.content), json.loads(expected.content))
+                self.assertEqual(fast.content, expected.content)
+
+    def test_keyset_cursor_from_value_rows(self):
+        with patch('api.fastpath.RowEncoder.encode', autospec=True, side_effect=RowEncoder.encode) as encode:
+            first = self.fetch('/api/career-paths/?pagination=keyset&page_size=2')
+        encode.assert_called_once()
+        second = self.fetch(first.data['next'])
+        self.assertEqual([row['title'] for row in second.data['results']], ['Software Developer'])
+
+    def test_stdlib_encoder_fallback(self):
+        with patch('api.fastpath.orjson', None):
+            fallback = self.fetch('/api/resources/')
+        self.assertEqual(fallback.content, self.fetch('/api/resources/').content)
+
+
+class ResultExportTests(APITestCase):
+    """
+    Tests for the streaming assessment result export.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.quiz = CareerAssessment.objects.create(title='Quiz', description='Quiz')
+        self.survey = CareerAssessment.objects.create(title='Survey', description='Survey')
+        self.results = [
+            AssessmentResult.objects.create(
+                assessment=self.quiz, answers=['Excel', ['a, "b"']], recommended_careers=[1, 2], session_id='s1',
+            ),
+            AssessmentResult.objects.create(assessment=self.survey, answers=['Empathy'], recommended_careers=[3]),
+        ]
+        AssessmentResult.objects.filter(pk=self.results[0].pk).update(completed_at='2025-01-15T10:00:00Z')
+        AssessmentResult.objects.filter(pk=self.results[1].pk).update(completed_at='2025-02-01T09:30:00Z')
+        self.client.force_authenticate(User.objects.create_user('counselor', is_staff=True))
+
+    def export(self, query=''):
+        response = self.client.get(f'/api/assessment-results/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [result.id for result in self.results])
+        self.assertEqual(rows[0]['assessment_title'], 'Quiz')
+        self.assertEqual(rows[0]['answers'], ['Excel', ['a, "b"']])
+        self.assertEqual(rows[0]['completed_at'], '2025-01-15T10:00:00Z')
+
+    def test_csv_and_columns(self):
+        rows = list(csv.DictReader(StringIO(self.export('?output=csv'))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(json.loads(rows[0]['answers']), ['Excel', ['a, "b"']])
+        self.assertEqual(rows[1]['recommended_careers'], '[3]')
+
+        chunks = [json.loads(line) for line in self.export('?output=columns').splitlines()]
+        self.assertEqual(len(chunks), 1)
+        self.assertEqual(chunks[0]['assessment_title'], ['Quiz', 'Survey'])
+        chunks = [json.loads(line) for line in export_results('columns', chunk_size=1)]
+        self.assertEqual([chunk['id'] for chunk in chunks], [[self.results[0].id], [self.results[1].id]])
+
+    def test_filters(self):
+        rows = [json.loads(line) for line in self.export(f'?assessment={self.survey.id}').splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.results[1].id])
+        rows = [json.loads(line) for line in self.export('?since=2025-01-01&until=2025-01-31').splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.results[0].id])
+        self.assertEqual(self.export('?since=2025-02-01T09:30:01Z'), '')
+
+        invalid = self.client.get('/api/assessment-results/export/?since=yesterday&output=xml')
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(set(invalid.data), {'since', 'output'})
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(User.objects.create_user('student'))
+        self.assertEqual(self.client.get('/api/assessment-results/export/').status_code, 403)
+
+    def test_command(self):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'export_assessment_results', '--format', 'csv', '--since', '2025-02-01', '--chunk-size', '1',
+            stdout=stdout, stderr=stderr,
+        )
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'assessment_id', 'assessment_title'])
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Wrote 2 lines', stderr.getvalue())
+
+
+CATALOG_CSV = """title,description,category,salary_range_min,salary_range_max,education_level,required_skills,growth_outlook,work_environment
+Astronomer,Studies the universe.,Science,"90,000",150000,phd,Physics;Mathematics,stable,laboratory
+Welder,Joins metal parts.,engineering,40000,60000,certification,Welding|Blueprint Reading,medium,field
+Astrologer,Reads the stars.,mysticism,,,high_school,,declining,remote
+Baker,Bakes bread.,other,25000,40000,high_school,Baking,stable,office
+"""
+
+
+class CatalogImportTests(TestCase):
+    """
+    Tests for the bulk catalog import command.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def run_import(self, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_catalog', *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_csv_import_validates_and_refreshes_indexes(self):
+        output, errors = self.run_import(self.write('catalog.csv', CATALOG_CSV), '--model', 'careers')
+        self.assertIn('3 created, 0 updated, 0 unchanged, 1 invalid', output)
+        self.assertIn('Line 4: category: "mysticism" is not a valid choice.', errors)
+
+        astronomer = CareerPath.objects.get(title='Astronomer')
+        self.assertEqual(astronomer.category, 'science')
+        self.assertEqual(astronomer.salary_range_min, 90000)
+        self.assertEqual(CareerPath.objects.get(title='Welder').required_skills, ['Welding', 'Blueprint Reading'])
+        self.assertIn('Welding', [entry['skill'] for entry in skill_index.vocabulary()])
+        self.assertEqual(self.client.get('/api/career-paths/?search=universe').data['results'][0]['id'], astronomer.id)
+
+    def test_reimport_only_writes_changes(self):
+        path = self.write('catalog.csv', CATALOG_CSV)
+        self.run_import(path, '--model', 'careers')
+        baker = CareerPath.objects.get(title='Baker')
+        user = User.objects.create_user('student')
+        MaterializedRecommendation.objects.create(
+            user=user, career=baker, career_title='Baker', career_category='other', score=0.5, rank=1,
+        )
+
+        changed = CATALOG_CSV.replace('Bakes bread.,other', 'Bakes bread and pastry.,business')
+        with CaptureQueriesContext(connection) as queries:
+            output, _ = self.run_import(self.write('changed.csv', changed), '--model', 'careers')
+        self.assertIn('0 created, 1 updated, 2 unchanged, 1 invalid', output)
+        self.assertEqual(CareerPath.objects.get(title='Baker').category, 'business')
+        # category is scored, so the owner is recomputed (from no inputs) rather than patched
+        self.assertFalse(MaterializedRecommendation.objects.filter(user=user).exists())
+        self.assertEqual(sum('INSERT INTO "api_careerpath"' in query['sql'] for query in queries), 0)
+
+    def test_dry_run_writes_nothing(self):
+        records = '\n'.join(json.dumps({
+            'title': f'Guide {number}', 'content': 'Body', 'resource_type': 'guide', 'category': 'resume',
+            'difficulty_level': 'beginner', 'tags': ['a'], 'is_featured': 'yes',
+        }) for number in range(3))
+        output, _ = self.run_import(self.write('resources.ndjson', records), '--model', 'resources', '--dry-run')
+        self.assertIn('[dry run] Read 3 records', output)
+        self.assertIn('3 created', output)
+        self.assertFalse(CareerResource.objects.exists())
+
+    def test_resumes_from_checkpoint(self):
+        path = self.write('catalog.csv', CATALOG_CSV)
+        checkpoint = os.path.join(self.directory.name, 'import.checkpoint')
+        original_apply = CatalogImporter.apply
+        calls = []
+
+        def failing_apply(importer, batch, stats):
+            calls.append(batch)
+            if len(calls) == 2:
+                raise RuntimeError('Interrupted')
+            return original_apply(importer, batch, stats)
+
+        with patch.object(CatalogImporter, 'apply', failing_apply), self.assertRaises(RuntimeError):
+            self.run_import(path, '--model', 'careers', '--batch-size', '1', '--checkpoint', checkpoint)
+        with open(checkpoint) as handle:
+            self.assertEqual(json.load(handle)['records'], 1)
+        self.assertEqual(list(CareerPath.objects.values_list('title', flat=True)), ['Astronomer'])
+
+        output, _ = self.run_import(path, '--model', 'careers', '--batch-size', '1', '--checkpoint', checkpoint)
+        self.assertIn('Resuming after 1 records', output)
+        self.assertIn('2 created', output)
+        self.assertEqual(CareerPath.objects.count(), 3)
+        self.assertFalse(os.path.exists(checkpoint))
+
+
+class FacetCountTests(APITestCase):
+    """
+    Tests for facet counters and the facets endpoints.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+
+    def counts(self, field):
+        return dict(FacetCount.objects.filter(
+            model='api.careerpath', field=field, count__gt=0
+        ).values_list('value', 'count'))
+
+    def test_counters_follow_saves_and_deletes(self):
+        self.assertEqual(self.counts('category'), {'technology': 1, 'healthcare': 1, 'finance': 1})
+
+        self.nurse.category = 'technology'
+        self.nurse.save()
+        self.assertEqual(self.counts('category'), {'technology': 2, 'finance': 1})
+
+        self.analyst.is_active = False
+        self.analyst.save(update_fields=['is_active'])
+        self.assertEqual(self.counts('category'), {'technology': 2})
+        self.assertEqual(self.counts('growth_outlook'), {'high': 2})
+
+        CareerPath.objects.only('title').get(pk=self.developer.pk).delete()
+        self.assertEqual(self.counts('category'), {'technology': 1})
+
+        counts = {row[:3]: row[3] for row in FacetCount.objects.values_list('model', 'field', 'value', 'count')}
+        rebuild_counts(CareerPath)
+        rebuilt = {row[:3]: row[3] for row in FacetCount.objects.values_list('model', 'field', 'value', 'count')}
+        self.assertEqual({key: count for key, count in counts.items() if count}, rebuilt)
+
+    def test_deferred_saves_read_back_one_row(self):
+        nurse = CareerPath.objects.only('title').get(pk=self.nurse.pk)
+        nurse.category = 'technology'
+        with patch('api.facets.rebuild_counts') as rebuild, CaptureQueriesContext(connection) as queries:
+            nurse.save()
+        rebuild.assert_not_called()
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(self.counts('category'), {'technology': 2, 'finance': 1})
+
+        analyst = CareerPath.objects.only('title').get(pk=self.analyst.pk)
+        analyst.title = 'Senior Analyst'
+        analyst.save()
+        self.assertEqual(self.counts('category'), {'technology': 2, 'finance': 1})
+        analyst.delete()
+        self.assertEqual(self.counts('category'), {'technology': 2})
+
+    def test_unfiltered_facets_read_counter_table(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/career-paths/facets/')
+        self.assertEqual(response.data['total'], 3)
+        category = {entry['value']: entry['count'] for entry in response.data['facets']['category']}
+        self.assertEqual(category['technology'], 1)
+        self.assertEqual(category['education'], 0)
+        self.assertEqual(
+            [entry['value'] for entry in response.data['facets']['work_environment']],
+            [value for value, _ in CareerPath._meta.get_field('work_environment').choices],
+        )
+
+    def test_filtered_facets_aggregate_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/career-paths/facets/?growth_outlook=high')
+        self.assertEqual(response.data['total'], 2)
+        category = {entry['value']: entry['count'] for entry in response.data['facets']['category']}
+        self.assertEqual((category['technology'], category['healthcare'], category['finance']), (1, 1, 0))
+
+        response = self.client.get('/api/career-paths/facets/?search=nurse')
+        self.assertEqual(response.data['total'], 1)
+        self.assertEqual(self.client.get('/api/career-paths/facets/?category=bogus').status_code, 400)
+
+    def test_resource_facets_and_categories(self):
+        CareerResource.objects.create(
+            title='Resume Basics', content='Body', resource_type='guide', category='resume',
+            difficulty_level='beginner',
+        )
+        counts, total = stored_counts(CareerResource)
+        self.assertEqual((counts['resource_type'], total), ({'guide': 1}, 1))
+        self.assertEqual(self.client.get('/api/resources/categories/').data, ['resume'])
+        self.assertEqual(
+            sorted(self.client.get('/api/career-paths/categories/').data), ['finance', 'healthcare', 'technology']
+        )
+
+
+class SalaryRangeTests(APITestCase):
+    """
+    Tests for the salary band index, range filter and histogram.
+    """
+
+    def setUp(self):
+        reset_caches()
+        # Bands: developer 60-120k, nurse 50-80k, analyst 55-95k
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+        self.unpaid = create_career(title='Volunteer', salary_range_min=None, salary_range_max=None)
+
+    def titles(self, query):
+        response = self.client.get(f'/api/career-paths/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return sorted(career['title'] for career in response.data['results'])
+
+    def test_overlap_and_within(self):
+        self.assertEqual(self.titles('salary_min=85000&salary_max=100000'), ['Financial Analyst', 'Software Developer'])
+        self.assertEqual(self.titles('salary_max=52000'), ['Registered Nurse'])
+        self.assertEqual(
+            self.titles('salary_min=50000&salary_max=100000&salary_match=within'),
+            ['Financial Analyst', 'Registered Nurse'],
+        )
+        self.assertEqual(self.titles('salary_min=85000&category=finance'), ['Financial Analyst'])
+        self.assertEqual(self.client.get('/api/career-paths/?salary_min=9&salary_max=1').status_code, 400)
+        self.assertEqual(self.client.get('/api/career-paths/?salary_match=inside').status_code, 400)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(salary_index.search(130000), set())
+        self.nurse.salary_range_max = 150000
+        self.nurse.save()
+        self.assertEqual(salary_index.search(130000), {self.nurse.pk})
+        self.nurse.delete()
+        self.analyst.is_active = False
+        self.analyst.save()
+        self.assertEqual(salary_index.search(0, 1000000), {self.developer.pk})
+
+    def test_broad_range_uses_sql_predicate(self):
+        with patch('api.salaries.MAX_ID_FILTER', 1):
+            self.assertEqual(
+                self.titles('salary_min=85000&salary_max=100000'), ['Financial Analyst', 'Software Developer']
+            )
+            self.assertEqual(self.titles('salary_min=50000&salary_match=within'), [
+                'Financial Analyst', 'Registered Nurse', 'Software Developer',
+            ])
+
+    def test_sql_predicate_swaps_inverted_bands_like_the_index(self):
+        inverted = create_career(title='Inverted', salary_range_min=140000, salary_range_max=130000)
+        for query in ['salary_min=125000&salary_max=135000', 'salary_min=125000&salary_max=145000&salary_match=within']:
+            with patch('api.salaries.MAX_ID_FILTER', 0):
+                by_predicate = self.titles(query)
+            self.assertEqual(by_predicate, self.titles(query))
+            self.assertIn(inverted.title, by_predicate)
+
+    def test_index_follows_writes_from_other_processes(self):
+        self.assertEqual(salary_index.search(130000), set())
+        CareerPath.objects.filter(pk=self.nurse.pk).update(salary_range_max=150000)
+        bump_generation(CareerPath)
+        self.assertEqual(salary_index.search(130000), {self.nurse.pk})
+
+    def test_histogram(self):
+        response = self.client.get('/api/career-paths/salaries/?bucket_size=20000')
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            [(bucket['from'], bucket['count']) for bucket in response.data['buckets']],
+            [(40000, 2), (60000, 3), (80000, 3), (100000, 1), (120000, 1)],
+        )
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/career-paths/salaries/?bucket_size=20000&salary_max=58000')
+        self.assertEqual(response.data['count'], 2)
+        response = self.client.get('/api/career-paths/salaries/?growth_outlook=high&bucket_size=50000')
+        self.assertEqual(response.data['buckets'], [
+            {'from': 50000, 'to': 100000, 'count': 2}, {'from': 100000, 'to': 150000, 'count': 1},
+        ])
+        self.assertEqual(self.client.get('/api/career-paths/salaries/?bucket_size=10').status_code, 400)
+
+
+@override_settings(API_METRICS_IPS=('127.0.0.1',))
+class MetricsTests(APITestCase):
+    """
+    Tests for the request instrumentation middleware and /metrics.
+    """
+
+    def setUp(self):
+        reset_caches()
+        metrics_registry.reset()
+        create_sample_careers()
+
+    def test_records_per_route_metrics(self):
+        queries = []
+        with connection.execute_wrapper(lambda execute, *args: queries.append(args[0]) or execute(*args)):
+            self.client.get('/api/assessment-results/?session_id=abc')
+        self.client.get('/api/career-paths/')
+        self.client.get('/api/career-paths/')
+        self.client.get('/api/no-such-endpoint/')
+
+        snapshot = metrics_registry.snapshot()
+        # Series are per route name, not per path: unknown URLs fall through to Wagtail
+        self.assertEqual(set(snapshot), {'assessmentresult-list', 'careerpath-list', 'wagtail_serve'})
+        durations, _ = snapshot['careerpath-list']['api_request_duration_seconds']
+        self.assertEqual(sum(durations), 2)
+        self.assertEqual(snapshot['assessmentresult-list']['api_db_queries'][1], len(queries))
+        self.assertGreater(snapshot['careerpath-list']['api_serializer_duration_seconds'][1], 0)
+        self.assertGreater(snapshot['assessmentresult-list']['api_serializer_duration_seconds'][1], 0)
+        self.assertGreater(snapshot['careerpath-list']['api_response_bytes'][1], 100)
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('# TYPE api_request_duration_seconds histogram', text)
+        self.assertIn('api_request_duration_seconds_count{route="careerpath-list"} 2', text)
+        self.assertIn('api_db_queries_bucket{route="careerpath-list",le="+Inf"} 2', text)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='203.0.113.9').status_code, 403)
+
+    @override_settings(API_METRICS_IPS=())
+    def test_metrics_are_staff_only_by_default(self):
+        # Behind a same-host proxy every request arrives from loopback
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.client.force_login(User.objects.create_user('ops', is_staff=True))
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_exited_threads_are_folded_into_one_total(self):
+        histograms = RouteHistograms()
+        values = (0.01, 2, 0.001, 0.001, 512)
+        for _ in range(20):
+            thread = threading.Thread(target=histograms.observe, args=(values,))
+            thread.start()
+            thread.join()
+        histograms.observe(values)
+        self.assertLessEqual(len(histograms._shards), 2)
+        counts, total = histograms.snapshot()['api_db_queries']
+        self.assertEqual((sum(counts), total), (21, 42.0))
+
+    def test_report_command(self):
+        self.client.get('/api/career-paths/')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'metrics.txt')
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(self.client.get('/metrics').content.decode())
+
+        stdout = StringIO()
+        call_command('metrics_report', path, '--metric', 'queries', stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertIn('p95', lines[0])
+        self.assertTrue(lines[1].startswith('careerpath-list'))
+
+    def test_report_command_explains_refused_scrape(self):
+        url = 'http://127.0.0.1:8000/metrics'
+        refused = HTTPError(url, 403, 'Forbidden', {}, None)
+        with patch('api.management.commands.metrics_report.urlopen', side_effect=refused):
+            with self.assertRaisesMessage(CommandError, 'API_METRICS_IPS'):
+                call_command('metrics_report', stdout=StringIO())
+
+    def test_quantile_interpolates_within_bucket(self):
+        buckets = [(0.1, 50), (0.2, 100), (math.inf, 100)]
+        self.assertAlmostEqual(quantile(buckets, 0.5), 0.1)
+        self.assertAlmostEqual(quantile(buckets, 0.95), 0.19)
+        self.assertEqual(quantile([(1.0, 10), (math.inf, 20)], 0.99), 1.0)
+        self.assertIsNone(quantile([(1.0, 0), (math.inf, 0)], 0.5))
+
+
+class BenchmarkTests(TestCase):
+    """
+    Tests for synthetic data generation and the benchmark helpers.
+    """
+
+    def setUp(self):
+        reset_caches()
+
+    def test_generate_catalog_and_run_in_process(self):
+        assessment = generate_catalog(careers=30, resources=20, results=12)
+        self.assertEqual(CareerPath.objects.count(), 30)
+        self.assertEqual(CareerResource.objects.count(), 20)
+        self.assertEqual(AssessmentResult.objects.filter(assessment=assessment).count(), 12)
+        self.assertEqual(sum(FacetCount.objects.filter(
+            model='api.careerpath', field='category'
+        ).values_list('count', flat=True)), 30)
+
+        context = ScenarioContext(
+            list(CareerPath.objects.values_list('id', flat=True)), assessment.id, ['synthetic-000000'], pages=1,
+        )
+        results = run_in_process(context, ['careers-list', 'career-detail', 'assessment-submit'], requests=3)
+        for summary in results.values():
+            self.assertEqual((summary['requests'], summary['errors']), (3, 0))
+            self.assertGreaterEqual(summary['p99_ms'], summary['p50_ms'])
+        self.assertEqual(results['career-detail']['queries'], 1)
+
+    def test_compare_flags_regressions(self):
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 99), 4)
+        baseline = {'inprocess': {'careers-list': {'p95_ms': 10.0, 'throughput': 100.0, 'queries': 2}}}
+        current = {'inprocess': {'careers-list': {'p95_ms': 11.0, 'throughput': 70.0, 'queries': 3}}}
+        regressed = {row[2]: row[-1] for row in compare(current, baseline, threshold=0.2)}
+        self.assertEqual(regressed, {'p95_ms': False, 'throughput': True, 'queries': True})
+
+
+class WriteQueueTests(TransactionTestCase):
+    """
+    Tests for group-committed AssessmentResult inserts.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.assessment = CareerAssessment.objects.create(title='Queue', questions=[])
+
+    def test_create_result_through_queue(self):
+        created = []
+
+        def receiver(sender, instance, **kwargs):
+            if kwargs['created']:
+                created.append(instance.pk)
+
+        post_save.connect(receiver, sender=AssessmentResult)
+        self.addCleanup(post_save.disconnect, receiver, sender=AssessmentResult)
+
+        results = []
+        with override_settings(API_WRITE_QUEUE=True):
+            threads = [
+                threading.Thread(target=lambda n=n: results.append(create_result(
+                    assessment_id=self.assessment.id, answers=[], session_id=f'queue-{n}'
+                )))
+                for n in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result.pk for result in results))
+        self.assertEqual(AssessmentResult.objects.filter(assessment=self.assessment).count(), 8)
+        self.assertEqual(sorted(created), sorted(result.pk for result in results))
+
+    def test_failed_row_only_fails_its_own_request(self):
+        write_queue = WriteQueue(max_delay=0.05)
+        good = write_queue.submit(AssessmentResult(assessment_id=self.assessment.id, answers=[]))
+        bad = write_queue.submit(AssessmentResult(assessment_id=self.assessment.id + 1000, answers=[]))
+        with self.assertLogs('api.writes', 'ERROR'):
+            self.assertIsNotNone(good.result(timeout=10).pk)
+            with self.assertRaises(IntegrityError):
+                bad.result(timeout=10)
+        self.assertEqual(AssessmentResult.objects.count(), 1)
+
+    def test_saved_directly_inside_transaction(self):
+        with override_settings(API_WRITE_QUEUE=True), transaction.atomic():
+            result = create_result(assessment_id=self.assessment.id, answers=[])
+            self.assertTrue(AssessmentResult.objects.filter(pk=result.pk).exists())
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite stress test')
+    def test_stress_sqlite_writes(self):
+        completed = subprocess.run(
+            [sys.executable, 'manage.py', 'stress_sqlite_writes', '--processes', '2', '--writers', '4',
+             '--requests', '10'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=300,
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn('0 lock errors', completed.stdout)
+
+
+# Eager tasks: background jobs writing to the shared in-memory database would hit table locks
+@override_settings(API_DB_REPLICAS=['replica'], API_TASKS_EAGER=True)
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    Tests for catalog reads from a replica, with a second in-memory database as the replica.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.assessment = CareerAssessment.objects.create(**SAMPLE_ASSESSMENT)
+        self.developer = create_career()
+        default = connections['default']
+        connections['replica'] = type(default)(
+            {**default.settings_dict, 'NAME': 'file:replica?mode=memory&cache=shared'}, alias='replica'
+        )
+        self.addCleanup(self.drop_replica)
+        self.sync_replica()
+        # Start like a fresh request, not pinned by the writes above
+        reset_pin()
+
+    @staticmethod
+    def drop_replica():
+        connections['replica'].connection.close()
+        del connections['replica']
+
+    def sync_replica(self):
+        generations = replica_generations()
+        for alias in ('default', 'replica'):
+            connections[alias].ensure_connection()
+        connections['default'].connection.backup(connections['replica'].connection)
+        mark_replicas_synced(generations)
+
+    def test_routes_catalog_reads_to_replicas(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(CareerPath), 'replica')
+        self.assertEqual(router.db_for_read(AssessmentResult), 'default')
+        self.assertEqual(router.db_for_write(CareerPath), 'default')
+        with use_primary():
+            self.assertEqual(router.db_for_read(CareerPath), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'api'))
+        self.assertIsNone(router.allow_migrate('default', 'api'))
+
+    def test_lagging_replica_and_read_your_writes(self):
+        nurse = create_career(title='Registered Nurse', category='healthcare')
+
+        # The replica has not seen the new career yet
+        response = self.client.get('/api/career-paths/')
+        self.assertEqual([row['id'] for row in response.data['results']], [self.developer.id])
+        self.assertEqual(self.client.get(f'/api/career-paths/{nurse.id}/').status_code, 404)
+
+        # Submitting reads and writes on the primary, then pins this client to it
+        response = self.client.post(
+            f'/api/assessments/{self.assessment.id}/submit/',
+            json.dumps({
+                'answers': random_answers(random.Random(1), SAMPLE_ASSESSMENT['questions']), 'session_id': 'pinned',
+            }),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get(f'/api/career-paths/{nurse.id}/').status_code, 200)
+
+        # Other clients read from the replica until it catches up
+        self.client.cookies.pop(PIN_COOKIE)
+        reset_caches()
+        self.assertEqual(self.client.get(f'/api/career-paths/{nurse.id}/').status_code, 404)
+        self.sync_replica()
+        self.assertEqual(self.client.get(f'/api/career-paths/{nurse.id}/').status_code, 200)
+
+    def test_lagging_replica_responses_are_not_cached(self):
+        self.assertEqual(self.client.get('/api/career-paths/')['X-Cache'], 'MISS')
+        nurse = create_career(title='Registered Nurse', category='healthcare')
+        reset_pin()
+
+        # Read from a replica that has not seen the write: served, but not stored
+        response = self.client.get('/api/career-paths/')
+        self.assertEqual((response['X-Cache'], response.data['count']), ('BYPASS', 1))
+        self.assertEqual(self.client.get('/api/career-paths/')['X-Cache'], 'BYPASS')
+
+        self.sync_replica()
+        response = self.client.get('/api/career-paths/')
+        self.assertEqual((response['X-Cache'], response.data['count']), ('MISS', 2))
+        self.assertEqual(self.client.get('/api/career-paths/')['X-Cache'], 'HIT')
+        self.assertIn(nurse.id, [row['id'] for row in response.data['results']])
+
+    def test_only_requests_that_wrote_pin_the_client(self):
+        self.client.force_login(User.objects.create_user('ada'))
+        # The first visit creates the profile
+        self.assertIn(PIN_COOKIE, self.client.get('/api/profiles/me/').cookies)
+        self.client.cookies.pop(PIN_COOKIE)
+        # Later visits only look it up through get_or_create
+        self.assertNotIn(PIN_COOKIE, self.client.get('/api/profiles/me/').cookies)
+
+    def test_featured_ids_are_read_from_the_primary(self):
+        nurse = create_career(title='Registered Nurse', category='healthcare')
+        reset_pin()
+        _, ids = featured_sampler.active_ids()
+        self.assertIn(nurse.id, ids)
+
+
+# Queries that resolve a token, a session or the user behind them
+AUTH_QUERY = re.compile(r'FROM "(?:authtoken_token|django_session|auth_user)"')
+
+
+class CachedAuthenticationTests(APITestCase):
+    """
+    Tests for the cached token and session authentication path.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.user = User.objects.create_user(username='ada', password='first-password')
+        self.token = Token.objects.create(user=self.user)
+
+    def auth_queries(self, url='/api/profiles/me/', status_code=200):
+        executed = []
+        with connection.execute_wrapper(lambda execute, sql, *args: executed.append(sql) or execute(sql, *args)):
+            self.response = self.client.get(url)
+        self.assertEqual(self.response.status_code, status_code)
+        return [sql for sql in executed if AUTH_QUERY.search(sql)]
+
+    def test_cached_token_needs_no_auth_queries(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(len(self.auth_queries()), 1)
+        self.assertEqual(self.auth_queries(), [])
+        self.assertEqual(self.auth_queries('/api/assessment-results/'), [])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_session_needs_no_auth_queries(self):
+        self.client.force_login(self.user)
+        self.auth_queries('/api/assessment-results/')
+        self.assertEqual(self.auth_queries('/api/assessment-results/'), [])
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_token_delete_revokes_cached_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.auth_queries()
+        self.token.delete()
+        self.auth_queries(status_code=403)
+        self.assertEqual(self.response.data['detail'], 'Invalid token.')
+
+    def test_password_change_and_deactivation_drop_cached_user(self):
+        self.client.force_login(self.user)
+        self.auth_queries()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.auth_queries()
+
+        self.user.set_password('second-password')
+        self.user.save()
+        # The token is looked up again; the session from before the change is logged out
+        self.assertTrue(self.auth_queries())
+        self.client.credentials()
+        self.auth_queries(status_code=403)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.user.is_active = False
+        self.user.save()
+        self.auth_queries(status_code=403)
+        self.assertEqual(self.response.data['detail'], 'User inactive or deleted.')
+
+
+@override_settings(API_TASKS_EAGER=True)
+class MeSummaryTests(APITestCase):
+    """
+    Tests for the consolidated "me" summary endpoint.
+    """
+    url = '/api/profiles/me/summary/'
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+        self.assessment = CareerAssessment.objects.create(title='Quiz', description='Quiz')
+        self.user = User.objects.create_user('student', password='secret-pass')
+        self.client.force_authenticate(self.user)
+
+    def create_result(self, answers):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AssessmentResult.objects.create(assessment=self.assessment, answers=answers, user=self.user)
+
+    def test_first_request_creates_profile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserProfile.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(response.data['profile']['user']['username'], 'student')
+        self.assertIsNone(response.data['latest_result'])
+        self.assertEqual(response.data['recommendations'], [])
+        # The plain "me" endpoint finds the same profile
+        self.assertEqual(self.client.get('/api/profiles/me/').data['id'], response.data['profile']['id'])
+
+    def test_summary_is_one_query_per_relation_and_cached_until_rows_change(self):
+        UserProfile.objects.create(user=self.user, current_career_path=self.developer)
+        self.create_result(['Programming and coding'])
+        latest = self.create_result(['Hospital or clinical setting'])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['profile']['current_career_path']['id'], self.developer.id)
+        self.assertEqual(response.data['latest_result']['id'], latest.id)
+        self.assertEqual(response.data['latest_result']['assessment_title'], 'Quiz')
+        self.assertEqual(response.data['recommendations'][0]['career_id'], self.nurse.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data, response.data)
+
+        self.client.patch('/api/profiles/me/', {'current_career_path_id': self.analyst.id}, format='json')
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['profile']['current_career_path']['id'], self.analyst.id)
+
+        latest = self.create_result(['Programming and coding'])
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['latest_result']['id'], latest.id)
+        self.assertEqual(response.data['recommendations'][0]['career_id'], self.developer.id)
+
+        self.analyst.title = 'Senior Financial Analyst'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.analyst.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['profile']['current_career_path']['title'], 'Senior Financial Analyst')
+
+
+    def test_summary_without_recommendations_is_cached(self):
+        self.create_result([])
+        self.assertEqual(self.client.get(self.url).data['recommendations'], [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data['recommendations'], [])
+
+    def test_unchanged_recommendations_are_not_rewritten(self):
+        self.create_result(['Hospital or clinical setting'])
+        generation = get_user_generation(self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            rows = refresh_owner(self.user.pk)
+        self.assertEqual(rows[0].career_id, self.nurse.id)
+        self.assertFalse([query for query in queries if not query['sql'].startswith('SELECT')])
+        self.assertEqual(get_user_generation(self.user.pk), generation)
+
+
+class SimilarCareerTests(APITestCase):
+    """
+    Tests for the precomputed similar-careers table and endpoint.
+    """
+
+    def setUp(self):
+        reset_caches()
+        self.developer, self.nurse, self.analyst = create_sample_careers()
+        self.engineer = create_career(
+            title='Data Engineer', description='Build and maintain data pipelines and software systems.',
+            required_skills=['Programming', 'SQL', 'Problem Solving'],
+        )
+        build_similar_careers()
+
+    def similar_ids(self, career):
+        return [row['id'] for row in self.client.get(f'/api/career-paths/{career.id}/similar/').data]
+
+    def rescored_table(self):
+        """The table after a fresh index recomputes every list with the stored document frequencies"""
+        with patch('api.similarity.similarity_index', SimilarityIndex()):
+            update_similar_careers(CareerPath.objects.values_list('id', flat=True))
+        return list(SimilarCareer.objects.order_by('career', 'rank').values_list('career', 'similar', 'score'))
+
+    @override_settings(API_TASKS_EAGER=True)
+    def save(self, career, **fields):
+        for name, value in fields.items():
+            setattr(career, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            career.save()
+
+    def test_build_ranks_neighbours_by_score(self):
+        rows = list(SimilarCareer.objects.filter(career=self.developer))
+        self.assertEqual([row.rank for row in rows], [1, 2, 3])
+        self.assertEqual(rows[0].similar_id, self.engineer.id)
+        self.assertEqual([row.score for row in rows], sorted((row.score for row in rows), reverse=True))
+        self.assertTrue(all(0 < row.score <= 1 for row in rows))
+        self.assertFalse(SimilarCareer.objects.filter(career=F('similar')).exists())
+
+    def test_endpoint_is_one_query(self):
+        url = f'/api/career-paths/{self.developer.id}/similar/'
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['id'], self.engineer.id)
+        self.assertEqual(response.data[0]['title'], 'Data Engineer')
+        self.assertIn('score', response.data[0])
+        self.assertEqual(len(self.client.get(url, {'limit': 1}).data), 1)
+        self.assertEqual(self.client.get('/api/career-paths/999999/similar/').status_code, 404)
+
+    def test_save_updates_affected_lists(self):
+        self.save(self.nurse, description='Develop software for hospital systems.', category='technology',
+                  work_environment='office', required_skills=['Programming', 'Problem Solving'])
+        self.assertEqual(self.similar_ids(self.nurse)[0], self.developer.id)
+        self.assertEqual(set(self.similar_ids(self.developer)[:2]), {self.engineer.id, self.nurse.id})
+
+        # Fields outside the vector leave the table alone
+        with CaptureQueriesContext(connection) as queries:
+            self.save(self.nurse, title='Clinical Software Developer')
+        self.assertFalse([query for query in queries if 'api_similarcareer' in query['sql']])
+
+    def test_deactivated_and_deleted_careers_leave_lists(self):
+        self.save(self.engineer, is_active=False)
+        self.assertNotIn(self.engineer.id, self.similar_ids(self.developer))
+        self.assertFalse(SimilarCareer.objects.filter(career=self.engineer).exists())
+        self.assertEqual(self.client.get(f'/api/career-paths/{self.engineer.id}/similar/').status_code, 404)
+
+        with override_settings(API_TASKS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            self.nurse.delete()
+        self.assertEqual(self.similar_ids(self.developer), [self.analyst.id])
+
+    def test_incremental_update_matches_full_rescore(self):
+        self.save(self.analyst, description='Maintain software and data systems.', required_skills=['SQL'])
+        with override_settings(API_TASKS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            create_career(title='Web Developer', required_skills=['Programming', 'HTML'])
+
+        incremental = list(SimilarCareer.objects.order_by('career', 'rank').values_list('career', 'similar', 'score'))
+        self.assertEqual(len({career for career, _, _ in incremental}), CareerPath.objects.count())
+        # Updates keep the document frequencies of the last full build, so they match a rescore with them
+        self.assertEqual(incremental, self.rescored_table())
+
+    def test_save_reads_only_changed_rows(self):
+        with patch('api.similarity.catalog_rows', wraps=catalog_rows) as read_catalog:
+            with CaptureQueriesContext(connection) as queries:
+                self.save(self.nurse, description='Develop software for hospital systems.')
+        read_catalog.assert_not_called()
+        self.assertFalse([query for query in queries if '"api_similarcareer"."rank" = ' in query['sql']])
+        self.assertEqual(self.similar_ids(self.nurse)[0], self.developer.id)
+
+        incremental = list(SimilarCareer.objects.order_by('career', 'rank').values_list('career', 'similar', 'score'))
+        self.assertEqual(incremental, self.rescored_table())
+
+    def test_updates_keep_document_frequencies_of_last_build(self):
+        scores = dict(SimilarCareer.objects.filter(career=self.developer).values_list('similar', 'score'))
+        # New careers with words of their own would change a refitted IDF
+        with override_settings(API_TASKS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            astronomers = [
+                create_career(title=f'Astronomer {number}', description='Observe stars and galaxies.',
+                              category='education', required_skills=['Astronomy']).id
+                for number in range(3)
+            ]
+        rescored = dict(SimilarCareer.objects.filter(career=self.developer).values_list('similar', 'score'))
+        # The developer's list was rewritten, with the engineer scored as before
+        self.assertTrue(set(astronomers) & set(rescored))
+        self.assertEqual(rescored[self.engineer.id], scores[self.engineer.id])
+
+    def test_updates_replay_changes_made_by_other_processes(self):
+        self.save(self.developer, required_skills=['Programming', 'Problem Solving', 'SQL'])
+        # Another process rewrites the engineer and updates the lists with its own index
+        CareerPath.objects.filter(pk=self.engineer.pk).update(
+            description='Care for patients on hospital wards.', category='healthcare', work_environment='hospital',
+        )
+        with patch('api.similarity.similarity_index', SimilarityIndex()):
+            update_similar_careers([self.engineer.id])
+        with patch('api.similarity.catalog_rows', wraps=catalog_rows) as read_catalog:
+            self.save(self.analyst, description='Maintain software and data systems.')
+        read_catalog.assert_not_called()
+
+        incremental = list(SimilarCareer.objects.order_by('career', 'rank').values_list('career', 'similar', 'score'))
+        self.assertEqual(incremental, self.rescored_table())
+
+        # Without the other update's log entry, the index is rebuilt from the catalog
+        CareerPath.objects.filter(pk=self.engineer.pk).update(description='Build data pipelines.')
+        with patch('api.similarity.similarity_index', SimilarityIndex()):
+            update_similar_careers([self.engineer.id])
+        caches['default'].delete(CHANGES_KEY.format(get_generation(SimilarCareer)))
+        with patch('api.similarity.catalog_rows', wraps=catalog_rows) as read_catalog:
+            self.save(self.analyst, description='Maintain software, data pipelines and systems.')
+        read_catalog.assert_called_once()
+
+    def test_saves_in_one_transaction_share_one_update(self):
+        with patch('api.similarity.update_similar_careers', wraps=update_similar_careers) as update:
+            with override_settings(API_TASKS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for career in (self.nurse, self.analyst):
+                        career.description = 'Develop software for hospital systems.'
+                        career.save()
+        self.assertEqual(update.call_count, 1)
+
+        incremental = list(SimilarCareer.objects.order_by('career', 'rank').values_list('career', 'similar', 'score'))
+        self.assertEqual(incremental, self.rescored_table())
+
+    def test_rolled_back_changes_are_not_updated(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            rolled_back = create_career(title='Rolled Back')
+            raise RuntimeError('Rolled back')
+        with patch('api.similarity.update_similar_careers') as update:
+            self.save(self.nurse, description='Develop software for hospital systems.')
+        (career_ids, _), _ = update.call_args
+        self.assertIn(self.nurse.id, career_ids)
+        self.assertNotIn(rolled_back.id, career_ids)
+
+    def test_similar_responses_follow_table_updates(self):
+        self.assertEqual(self.similar_ids(self.developer)[0], self.engineer.id)
+        CareerPath.objects.filter(pk=self.analyst.pk).update(
+            description=self.engineer.description, required_skills=self.engineer.required_skills,
+            category=self.engineer.category, work_environment=self.engineer.work_environment,
+            education_level=self.engineer.education_level, growth_outlook=self.engineer.growth_outlook,
+        )
+        update_similar_careers([self.analyst.id])
+        self.assertEqual(set(self.similar_ids(self.developer)[:2]), {self.engineer.id, self.analyst.id})
+
+    @skipUnless(sys.platform.startswith('linux'), 'needs fork-based process pools')
+    def test_process_pool_build_matches_serial_build(self):
+        generate_catalog(careers=60, resources=0, results=0)
+        build_similar_careers(workers=1)
+        serial = list(SimilarCareer.objects.order_by('career', 'rank').values_list('career', 'similar', 'score'))
+        self.assertEqual(len({career for career, _, _ in serial}), CareerPath.objects.filter(is_active=True).count())
+        self.assertLessEqual(max(rank for rank in SimilarCareer.objects.values_list('rank', flat=True)), SIMILAR_LIMIT)
+
+        build_similar_careers(workers=2)
+        pooled = list(SimilarCareer.objects.order_by('career', 'rank').values_list('career', 'similar', 'score'))
+        self.assertEqual(pooled, serial)
+
+
+# A plan step that reads a whole api_* table without using an index
+FULL_TABLE_SCAN = re.compile(r'^SCAN (?:TABLE )?(api_\w+)$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class QueryPlanTests(APITestCase):
+    """
+    Tests that every endpoint's queries are answered from an index.
+    """
+
+    anonymous_urls = [
+        '/api/career-paths/',
+        '/api/career-paths/?category=technology',
+        '/api/career-paths/?education_level=bachelors',
+        '/api/career-paths/?work_environment=office',
+        '/api/career-paths/?growth_outlook=high',
+        '/api/career-paths/?pagination=keyset',
+        '/api/career-paths/categories/',
+        '/api/career-paths/facets/',
+        '/api/career-paths/facets/?category=technology',
+        '/api/career-paths/?salary_min=50000&salary_max=90000',
+        '/api/career-paths/salaries/?category=technology',
+        '/api/career-paths/?search=software',
+        '/api/career-paths/by-skills/?skills=Excel',
+        '/api/assessments/',
+        '/api/assessment-results/?session_id=abc',
+        '/api/assessment-results/?session_id=abc&pagination=keyset',
+        '/api/resources/',
+        '/api/resources/?category=resume',
+        '/api/resources/?resource_type=guide',
+        '/api/resources/?difficulty_level=beginner',
+        '/api/resources/?is_featured=true',
+        '/api/resources/?pagination=keyset',
+        '/api/resources/featured/',
+        '/api/resources/categories/',
+        '/api/resources/facets/?resource_type=guide',
+        '/api/recommendations/?session_id=abc',
+    ]
+    authenticated_urls = [
+        '/api/assessment-results/',
+        '/api/assessment-results/?pagination=keyset',
+        '/api/profiles/me/',
+        '/api/recommendations/',
+    ]
+
+    def setUp(self):
+        reset_caches()
+        create_sample_careers()
+        self.user = User.objects.create_user('student', password='secret-pass')
+        UserProfile.objects.create(user=self.user, skills=['Excel'])
+        assessment = CareerAssessment.objects.create(title='Quiz', description='Quiz')
+        AssessmentResult.objects.create(assessment=assessment, answers=['Excel'], session_id='abc')
+        AssessmentResult.objects.create(assessment=assessment, answers=['Excel'], user=self.user)
+        CareerResource.objects.create(
+            title='Resume Guide', content='Write a resume.', resource_type='guide',
+            category='resume', difficulty_level='beginner', is_featured=True,
+        )
+
+    def full_scans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertLess(response.status_code, 400, url)
+        scans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+                if any(FULL_TABLE_SCAN.match(step) for step in plan):
+                    scans.append(f'{sql}\n  -> {plan}')
+        return scans
+
+    def test_anonymous_endpoints_use_indexes(self):
+        for url in self.anonymous_urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.full_scans(url), [])
+
+    def test_authenticated_endpoints_use_indexes(self):
+        self.client.force_authenticate(self.user)
+        for url in self.authenticated_urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.full_scans(url), [])
+
+    def test_pending_results_lookup_uses_index(self):
+        plan = AssessmentResult.objects.filter(recommendation_status='pending').values_list('id').explain()
+        self.assertIn('api_result_status_idx', plan)
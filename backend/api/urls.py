@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CareerPathViewSet, CareerAssessmentViewSet, AssessmentResultViewSet,
-    CareerResourceViewSet, UserProfileViewSet
+    CareerResourceViewSet, UserProfileViewSet, RecommendationViewSet
 )
 
 # Create router and register viewsets
@@ -12,6 +12,7 @@ router.register(r'assessments', CareerAssessmentViewSet, basename='assessment')
 router.register(r'assessment-results', AssessmentResultViewSet, basename='assessmentresult')
 router.register(r'resources', CareerResourceViewSet, basename='resource')
 router.register(r'profiles', UserProfileViewSet, basename='profile')
+router.register(r'recommendations', RecommendationViewSet, basename='recommendation')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,56 +1,219 @@
+import time
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.contrib.auth.models import User
 from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 
-from .models import CareerPath, CareerAssessment, AssessmentResult, CareerResource, UserProfile
+from .bulk import BulkInputError, bulk_submit, read_rows
+from .caching import CachedResponseMixin, cached_response
+from .exports import CONTENT_TYPES, export_results
+from .facets import FacetsMixin, facet_values
+from .fastpath import FastListMixin
+from .fieldsets import SparseFieldsetViewMixin
+from .matching import matcher
+from .metrics import InstrumentedViewMixin
+from .pagination import PageOrKeysetPagination
+from .profiles import me_payload
+from .questions import MAX_SUBMISSION_BYTES, compile_questions
+from .recommendations import get_recommendations
+from .salaries import DEFAULT_BUCKET_SIZE, SalaryRangeFilter, salary_index, salary_params
+from .sampling import featured_sampler
+from .search import FullTextSearchFilter
+from .similarity import SIMILAR_LIMIT, similar_careers
+from .models import CareerPath, CareerAssessment, AssessmentResult, CareerResource, SimilarCareer, UserProfile
 from .serializers import (
-    CareerPathSerializer, CareerAssessmentSerializer, AssessmentResultSerializer,
-    CareerResourceSerializer, UserProfileSerializer, AssessmentSubmissionSerializer,
-    CareerRecommendationSerializer
+    CareerPathSerializer, CareerAssessmentSerializer, CareerAssessmentListSerializer, AssessmentResultSerializer,
+    CareerResourceSerializer, CareerResourceListSerializer, UserProfileSerializer, AssessmentSubmissionSerializer,
+    CareerRecommendationSerializer, CareerMatchSerializer, MaterializedRecommendationSerializer,
+    ResultExportSerializer, SimilarCareerSerializer
 )
+from .skills import skill_index, MATCH_METHODS
+from .tasks import enqueue_recommendations, RECOMMENDATION_LIMIT
+from .writes import create_result
+
+
+FEATURED_CAREER_COUNT = 6
+
+# Ranked skill matches checked against the view filters per query
+MATCH_FILTER_CHUNK = 500
+
+# Long-polling limits for assessment-results/<id>/status/
+MAX_STATUS_WAIT = 30
+STATUS_POLL_INTERVAL = 0.25
+
 
+def skill_matches_response(queryset, skills, request):
+    """Rank careers in ``queryset`` by overlap with ``skills`` using the skill index"""
+    method = request.query_params.get('method', 'jaccard')
+    if method not in MATCH_METHODS:
+        return Response(
+            {'method': [f"Must be one of: {', '.join(MATCH_METHODS)}"]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
 
-class CareerPathViewSet(viewsets.ModelViewSet):
+    # Rank over the whole index, then check ranked chunks of IDs against the
+    # view filters and load only the careers that make the cut
+    matches = skill_index.match(skills, method=method, limit=None)
+    winners = []
+    for start in range(0, len(matches), MATCH_FILTER_CHUNK):
+        chunk = matches[start:start + MATCH_FILTER_CHUNK]
+        passing = set(
+            queryset.filter(pk__in=[career_id for career_id, _, _ in chunk]).order_by().values_list('pk', flat=True)
+        )
+        winners.extend(match for match in chunk if match[0] in passing)
+        if len(winners) >= limit:
+            break
+    winners = winners[:limit]
+
+    careers = queryset.in_bulk([career_id for career_id, _, _ in winners])
+    ranked = []
+    for career_id, score, matched_skills in winners:
+        career = careers[career_id]
+        career.match_score = round(score, 4)
+        career.matched_skills = matched_skills
+        ranked.append(career)
+    return Response(CareerMatchSerializer(ranked, many=True).data)
+
+
+class CareerPathViewSet(InstrumentedViewMixin, CachedResponseMixin, FacetsMixin, FastListMixin,
+                        SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for Career Path operations"""
     queryset = CareerPath.objects.filter(is_active=True)
     serializer_class = CareerPathSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SalaryRangeFilter, OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['category', 'education_level', 'growth_outlook', 'work_environment']
-    search_fields = ['title', 'description', 'required_skills']
+    facet_query_params = ('search', 'salary_min', 'salary_max')
     ordering_fields = ['title', 'created_at', 'salary_range_min']
     ordering = ['title']
+    pagination_class = PageOrKeysetPagination
+    keyset_ordering = ['title', 'id']
+    sparse_actions = ('list', 'retrieve', 'featured')
+
+    def get_cache_models(self):
+        # Neighbour lists are rewritten without touching CareerPath
+        if self.action == 'similar':
+            return [CareerPath, SimilarCareer]
+        return super().get_cache_models()
 
     @action(detail=False, methods=['get'])
+    @cached_response
     def categories(self, request):
         """Get all available career categories"""
-        categories = CareerPath.objects.filter(is_active=True).values_list('category', flat=True).distinct()
-        return Response(list(categories))
+        return Response(facet_values(CareerPath, 'category'))
 
     @action(detail=False, methods=['get'])
     def featured(self, request):
-        """Get featured career paths"""
-        featured_paths = self.get_queryset().order_by('?')[:6]  # Random 6 featured paths
-        serializer = self.get_serializer(featured_paths, many=True)
-        return Response(serializer.data)
+        """Get featured career paths (random 6, fixed per ?seed= or ?rotation=<seconds>)"""
+        max_age = None
+        rotation = request.query_params.get('rotation')
+        if rotation:
+            try:
+                rotation = int(rotation)
+                if rotation <= 0:
+                    raise ValueError
+            except ValueError:
+                return Response({'rotation': ['Must be a positive number of seconds.']},
+                                status=status.HTTP_400_BAD_REQUEST)
+            ids, max_age = featured_sampler.sample_window(FEATURED_CAREER_COUNT, rotation)
+        else:
+            ids = featured_sampler.sample(FEATURED_CAREER_COUNT, seed=request.query_params.get('seed'))
+
+        # One pk__in query, then restore the sampled order
+        response = Response(self.represent(self.get_queryset(), ids=ids))
+        if max_age:
+            patch_cache_control(response, public=True, max_age=max_age)
+        return response
 
+    @action(detail=False, methods=['get'], url_path='by-skills')
+    def by_skills(self, request):
+        """Get career paths ranked by overlap with ?skills=a,b,c"""
+        skills = [skill for value in request.query_params.getlist('skills') for skill in value.split(',')]
+        if not any(skill.strip() for skill in skills):
+            return Response({'skills': ['This query parameter is required.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return skill_matches_response(self.filter_queryset(self.get_queryset()), skills, request)
 
-class CareerAssessmentViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=['get'])
+    def skills(self, request):
+        """Get the normalized skill vocabulary with career counts"""
+        return Response(skill_index.vocabulary())
+
+    @action(detail=True, methods=['get'])
+    @cached_response
+    def similar(self, request, pk=None):
+        """Get the careers most similar to this one (precomputed, up to ?limit=10)"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', SIMILAR_LIMIT)), 1), SIMILAR_LIMIT)
+        except ValueError:
+            limit = SIMILAR_LIMIT
+        neighbours = similar_careers(int(pk), limit) if pk.isdigit() else []
+        # Only careers without neighbours cost a second query to tell them from missing ones
+        if not neighbours:
+            self.get_object()
+        return Response(SimilarCareerSerializer(neighbours, many=True).data)
+
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def salaries(self, request):
+        """Get salary histogram buckets for the careers matching the current filters"""
+        try:
+            bucket_size = int(request.query_params.get('bucket_size', DEFAULT_BUCKET_SIZE))
+            if bucket_size <= 0:
+                raise ValueError
+        except ValueError:
+            return Response({'bucket_size': ['Must be a positive whole number.']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        low, high, match = salary_params(request.query_params)
+        if any(request.query_params.get(name) for name in ['search', *self.filterset_fields]):
+            career_ids = set(self.filter_queryset(self.get_queryset()).order_by().values_list('pk', flat=True))
+        elif low is not None or high is not None:
+            # Only a salary range: answer from the index without a query
+            career_ids = salary_index.search(low, high, match)
+        else:
+            career_ids = None
+        try:
+            buckets = salary_index.histogram(career_ids, bucket_size=bucket_size)
+        except ValueError as exc:
+            return Response({'bucket_size': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        count = len(salary_index) if career_ids is None else len(career_ids)
+        return Response({'count': count, 'bucket_size': bucket_size, 'buckets': buckets})
+
+
+class CareerAssessmentViewSet(InstrumentedViewMixin, CachedResponseMixin, SparseFieldsetViewMixin,
+                              viewsets.ReadOnlyModelViewSet):
     """ViewSet for Career Assessment operations (read-only)"""
     queryset = CareerAssessment.objects.filter(is_active=True)
     serializer_class = CareerAssessmentSerializer
+    list_serializer_class = CareerAssessmentListSerializer
     permission_classes = [AllowAny]
 
     @action(detail=True, methods=['post'])
     def submit(self, request, pk=None):
-        """Submit assessment answers and get recommendations"""
+        """Submit assessment answers and get recommendations (?async=true computes them in the background)"""
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'detail': 'Invalid Content-Length header.'}, status=status.HTTP_400_BAD_REQUEST)
+        if content_length > MAX_SUBMISSION_BYTES:
+            return Response({'detail': 'Submission is too large.'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
         assessment = self.get_object()
-        serializer = AssessmentSubmissionSerializer(data=request.data)
+        serializer = AssessmentSubmissionSerializer(data=request.data, context={'assessment': assessment})
         
         if serializer.is_valid():
             # Create assessment result
@@ -63,62 +226,73 @@ class CareerAssessmentViewSet(viewsets.ReadOnlyModelViewSet):
             # Add user if authenticated
             if request.user.is_authenticated:
                 result_data['user'] = request.user
+
+            if self.wants_async(request):
+                result = create_result(recommendation_status='pending', **result_data)
+                enqueue_recommendations(result.id)
+                status_url = reverse('assessmentresult-status', args=[result.id], request=request)
+                if result.session_id and not request.user.is_authenticated:
+                    status_url = replace_query_param(status_url, 'session_id', result.session_id)
+                return Response(
+                    {'id': result.id, 'recommendation_status': result.recommendation_status,
+                     'status_url': status_url},
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': status_url}
+                )
             
-            result = AssessmentResult.objects.create(**result_data)
-            
-            # Generate recommendations (simplified logic)
+            # Score first so the result is written with a single INSERT
             recommendations = self.generate_recommendations(assessment, serializer.validated_data['answers'])
-            result.recommended_careers = [r['id'] for r in recommendations]
-            result.save()
+            result_data['recommended_careers'] = [r['id'] for r in recommendations]
+            result = create_result(**result_data)
             
             response_serializer = AssessmentResultSerializer(result)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    # Staff only: the rows are written to whatever session IDs the upload names
+    @action(detail=True, methods=['post'], url_path='bulk-submit', permission_classes=[IsAdminUser])
+    def bulk_submit(self, request, pk=None):
+        """Submit many completed assessments (JSON array or NDJSON); streams back one NDJSON line per row"""
+        assessment = self.get_object()
+        try:
+            rows = read_rows(request)
+        except BulkInputError as exc:
+            return Response({'non_field_errors': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        lines = bulk_submit(assessment, rows, compile_questions(assessment).errors)
+        return StreamingHttpResponse(lines, content_type='application/x-ndjson')
+
+    @staticmethod
+    def wants_async(request):
+        """Async mode via ?async=true or a 'Prefer: respond-async' header"""
+        if request.query_params.get('async', '').lower() in ('1', 'true', 'yes'):
+            return True
+        return 'respond-async' in request.headers.get('Prefer', '')
     
     def generate_recommendations(self, assessment, answers):
-        """Generate career recommendations based on answers (simplified logic)"""
-        # This is a simplified recommendation engine
-        # In a real application, you'd have more sophisticated logic
-        
-        # Get all career paths
-        career_paths = CareerPath.objects.filter(is_active=True)
-        
-        # Simple scoring based on answers (this would be more complex in reality)
-        scored_careers = []
-        for career in career_paths:
-            score = 0
-            
-            # Example scoring logic based on answer patterns
-            # You'd implement more sophisticated matching here
-            if len(answers) > 0:
-                score = len([a for a in answers if 'technology' in str(a).lower()]) * 2
-            
-            scored_careers.append({
-                'id': career.id,
-                'title': career.title,
-                'score': score,
-                'category': career.category
-            })
-        
-        # Sort by score and return top recommendations
-        scored_careers.sort(key=lambda x: x['score'], reverse=True)
-        return scored_careers[:5]
+        """Generate career recommendations based on answers"""
+        return matcher.recommend(answers, limit=RECOMMENDATION_LIMIT)
 
 
-class AssessmentResultViewSet(viewsets.ModelViewSet):
+class AssessmentResultViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """ViewSet for Assessment Result operations"""
     serializer_class = AssessmentResultSerializer
     permission_classes = [AllowAny]
+    pagination_class = PageOrKeysetPagination
+    keyset_ordering = ['-completed_at', 'id']
     
     def get_queryset(self):
         """Filter results based on user authentication"""
+        queryset = AssessmentResult.objects.select_related('assessment', 'user').only(
+            'id', 'user', 'assessment', 'answers', 'recommended_careers', 'recommendation_status',
+            'session_id', 'completed_at', 'assessment__title', 'user__username',
+        )
         if self.request.user.is_authenticated:
-            return AssessmentResult.objects.filter(user=self.request.user)
+            return queryset.filter(user=self.request.user)
         else:
             session_id = self.request.query_params.get('session_id')
             if session_id:
-                return AssessmentResult.objects.filter(session_id=session_id)
+                return queryset.filter(session_id=session_id)
             return AssessmentResult.objects.none()
     
     def perform_create(self, serializer):
@@ -126,52 +300,117 @@ class AssessmentResultViewSet(viewsets.ModelViewSet):
         if self.request.user.is_authenticated:
             serializer.save(user=self.request.user)
 
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Stream every assessment result as NDJSON, CSV or columnar chunks (?output=, ?assessment=, ?since=, ?until=)"""
+        params = ResultExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = params.validated_data
+        output = filters['output']
+        lines = export_results(
+            output, assessment_id=filters.get('assessment'), since=filters.get('since'), until=filters.get('until'),
+        )
+        extension = 'csv' if output == 'csv' else 'ndjson'
+        response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="assessment-results.{extension}"'
+        return response
+
+    @action(detail=True, methods=['get'], url_path='status', url_name='status')
+    def recommendation_status(self, request, pk=None):
+        """Get a result with its recommendation status; ?wait=<seconds> long-polls until ready"""
+        result = self.get_object()
+        try:
+            wait = min(max(float(request.query_params.get('wait', 0)), 0), MAX_STATUS_WAIT)
+        except ValueError:
+            wait = 0
+
+        deadline = time.monotonic() + wait
+        while result.recommendation_status == 'pending' and time.monotonic() < deadline:
+            time.sleep(STATUS_POLL_INTERVAL)
+            current = AssessmentResult.objects.filter(pk=result.pk).values_list(
+                'recommendation_status', flat=True
+            ).first()
+            if current != 'pending':
+                result.refresh_from_db()
+
+        return Response(self.get_serializer(result).data)
+
+
+class RecommendationViewSet(InstrumentedViewMixin, viewsets.GenericViewSet):
+    """ViewSet for materialized career recommendations"""
+    serializer_class = MaterializedRecommendationSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
 
-class CareerResourceViewSet(viewsets.ModelViewSet):
+    def list(self, request):
+        """Get ranked career recommendations for the current user (or ?session_id=)"""
+        if request.user.is_authenticated:
+            recommendations = get_recommendations(user_id=request.user.id)
+        else:
+            recommendations = get_recommendations(session_id=request.query_params.get('session_id'))
+        return Response(self.get_serializer(recommendations, many=True).data)
+
+
+class CareerResourceViewSet(InstrumentedViewMixin, CachedResponseMixin, FacetsMixin, FastListMixin,
+                            SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for Career Resource operations"""
     queryset = CareerResource.objects.filter(is_active=True)
     serializer_class = CareerResourceSerializer
+    list_serializer_class = CareerResourceListSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['resource_type', 'category', 'difficulty_level', 'is_featured']
-    search_fields = ['title', 'content', 'tags']
     ordering_fields = ['title', 'created_at', 'estimated_time']
     ordering = ['-is_featured', 'title']
+    pagination_class = PageOrKeysetPagination
+    keyset_ordering = ['-is_featured', 'title', 'id']
+    sparse_actions = ('list', 'retrieve', 'featured')
 
     @action(detail=False, methods=['get'])
+    @cached_response
     def featured(self, request):
         """Get featured resources"""
-        featured_resources = self.get_queryset().filter(is_featured=True)[:6]
-        serializer = self.get_serializer(featured_resources, many=True)
-        return Response(serializer.data)
+        return Response(self.represent(self.get_queryset().filter(is_featured=True)[:6]))
 
     @action(detail=False, methods=['get'])
+    @cached_response
     def categories(self, request):
         """Get all available resource categories"""
-        categories = CareerResource.objects.filter(is_active=True).values_list('category', flat=True).distinct()
-        return Response(list(categories))
+        return Response(facet_values(CareerResource, 'category'))
 
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """ViewSet for User Profile operations"""
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         """Users can only access their own profile"""
-        return UserProfile.objects.filter(user=self.request.user)
+        return UserProfile.objects.select_related('user', 'current_career_path').filter(
+            user=self.request.user
+        ).order_by('id')
     
     def perform_create(self, serializer):
         """Automatically assign user when creating profile"""
         serializer.save(user=self.request.user)
     
+    @action(detail=False, methods=['get'], url_path='me/matching-careers')
+    def matching_careers(self, request):
+        """Get career paths matching the current user's profile skills"""
+        profile = UserProfile.objects.filter(user=request.user).only('skills').first()
+        skills = profile.skills if profile else []
+        return skill_matches_response(CareerPath.objects.filter(is_active=True), skills, request)
+
+    @action(detail=False, methods=['get'], url_path='me/summary')
+    def summary(self, request):
+        """Current user's profile, current career path, latest assessment result and top recommendations"""
+        return Response(me_payload(request.user))
+
     @action(detail=False, methods=['get', 'patch'])
     def me(self, request):
         """Get or update current user's profile"""
-        try:
-            profile = UserProfile.objects.get(user=request.user)
-        except UserProfile.DoesNotExist:
-            profile = UserProfile.objects.create(user=request.user)
+        # get_or_create survives concurrent first requests racing to create the profile
+        profile, _ = self.get_queryset().get_or_create(user=request.user)
         
         if request.method == 'GET':
             serializer = self.get_serializer(profile)
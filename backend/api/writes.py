@@ -0,0 +1,144 @@
+"""
+Group-committed AssessmentResult inserts.
+
+SQLite takes one database-wide write lock per transaction, so under
+concurrent submits request threads queue up on the lock and pay a commit
+each. With ``API_WRITE_QUEUE`` on, ``create_result`` hands the unsaved row
+to a single writer thread per process instead. The writer takes whatever
+rows are waiting (up to ``API_WRITE_QUEUE_BATCH``, gathering for at most
+``API_WRITE_QUEUE_DELAY`` seconds), inserts them with one ``bulk_create``
+in one transaction, and the callers get their saved rows back with
+primary keys set.
+
+``bulk_create`` sends no model signals, so the writer sends ``pre_save``
+and ``post_save`` for every row itself, inside the group transaction;
+receivers that defer work with ``transaction.on_commit`` run once the group
+has committed, as they would after a plain ``save()``.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router, transaction
+from django.db.models.signals import post_save, pre_save
+
+from .models import AssessmentResult
+
+
+logger = logging.getLogger(__name__)
+
+# How long a request waits for its row to be written
+WRITE_TIMEOUT = 30
+
+
+class WriteQueue:
+    """Single writer thread inserting queued rows of ``model`` in groups"""
+
+    def __init__(self, model=AssessmentResult, max_batch=50, max_delay=0.002):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # A forked worker process inherits the object but not the thread
+        if self._thread is None or self._pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._pid != os.getpid():
+                    self._queue = queue.SimpleQueue()
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                    self._thread.start()
+
+    def submit(self, instance):
+        """Queue an unsaved instance; the Future resolves to it once committed"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((instance, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                close_old_connections()
+                self.write(batch)
+            except Exception:
+                # The group failed as a whole: retry row by row so one bad row
+                # only fails its own request
+                for item in batch:
+                    if not item[1].done():
+                        self.write([item], isolated=True)
+
+    def write(self, batch, isolated=False):
+        instances = [instance for instance, _ in batch]
+        using = router.db_for_write(self.model)
+        try:
+            with transaction.atomic(using=using):
+                for instance in instances:
+                    pre_save.send(sender=self.model, instance=instance, raw=False, using=using, update_fields=None)
+                self.model.objects.using(using).bulk_create(instances)
+                for instance in instances:
+                    post_save.send(sender=self.model, instance=instance, created=True, raw=False, using=using,
+                                   update_fields=None)
+        except Exception as exc:
+            if not isolated:
+                raise
+            logger.exception('Queued %s insert failed', self.model.__name__)
+            batch[0][1].set_exception(exc)
+            return
+        self.batches += 1
+        self.rows += len(instances)
+        for instance, future in batch:
+            future.set_result(instance)
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    global _write_queue
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteQueue(
+                    max_batch=getattr(settings, 'API_WRITE_QUEUE_BATCH', 50),
+                    max_delay=getattr(settings, 'API_WRITE_QUEUE_DELAY', 0.002),
+                )
+    return _write_queue
+
+
+def create_result(**fields):
+    """
+    Insert an AssessmentResult, through the write queue when it is enabled.
+
+    Inside a transaction the row is saved directly, since the writer thread
+    could not see or join the caller's uncommitted work.
+    """
+    instance = AssessmentResult(**fields)
+    in_transaction = connections[router.db_for_write(AssessmentResult)].in_atomic_block
+    if not getattr(settings, 'API_WRITE_QUEUE', False) or in_transaction:
+        instance.save()
+        return instance
+    return get_write_queue().submit(instance).result(timeout=WRITE_TIMEOUT)
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     "taggit",
     "django_filters",
     "rest_framework",
+    "rest_framework.authtoken",
     "grapple",
     "graphene_django",
     "django.contrib.admin",
@@ -53,6 +54,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
+    "api.replicas.PrimaryPinMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -96,6 +99,127 @@ DATABASES = {
     }
 }
 
+# SQLite production mode, for several worker processes writing to one file:
+# WAL journaling (readers never block the writer), synchronous=NORMAL (no
+# fsync per commit in WAL mode), a larger page cache, memory-mapped reads,
+# BEGIN IMMEDIATE transactions (take the write lock up front instead of
+# failing to upgrade a read lock) and a busy timeout, so writers wait for the
+# lock instead of raising "database is locked". It also turns on the
+# in-process write queue that group-commits AssessmentResult inserts (see
+# api.writes). Off by default here; production.py turns it on.
+
+SQLITE_PRODUCTION_MODE = os.environ.get("SQLITE_PRODUCTION_MODE", "0") == "1"
+
+SQLITE_PRODUCTION_OPTIONS = {
+    "init_command": (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA cache_size=-20000;"
+        "PRAGMA mmap_size=268435456;"
+        "PRAGMA temp_store=MEMORY"
+    ),
+    "transaction_mode": "IMMEDIATE",
+    # Seconds to wait for the write lock (SQLite busy timeout)
+    "timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 20)),
+}
+
+if SQLITE_PRODUCTION_MODE:
+    DATABASES["default"]["OPTIONS"] = SQLITE_PRODUCTION_OPTIONS
+
+# Read replicas for catalog reads (see api.replicas): a comma-separated list
+# of SQLite files (relative to BASE_DIR), each a copy of the primary kept up
+# to date with "manage.py sync_sqlite_replicas". They become the aliases
+# "replica1", "replica2", ..., opened read-only. A client that wrote reads
+# from the primary for API_DB_PIN_SECONDS afterwards.
+
+DATABASE_REPLICAS = [name for name in os.environ.get("DATABASE_REPLICAS", "").split(",") if name]
+
+for number, name in enumerate(DATABASE_REPLICAS, start=1):
+    DATABASES[f"replica{number}"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, name),
+        "OPTIONS": {"init_command": "PRAGMA query_only=ON"},
+        "TEST": {"MIRROR": "default"},
+    }
+
+API_DB_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
+API_DB_PIN_SECONDS = int(os.environ.get("API_DB_PIN_SECONDS", 10))
+
+DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# "default" holds small shared state such as the per-model generation
+# counters, "api" holds cached catalog responses (see api.caching). Both are
+# in-process by default; set API_CACHE_BACKEND to "file" or "redis" to share
+# them between worker processes.
+
+API_CACHE_BACKEND = os.environ.get("API_CACHE_BACKEND", "locmem")
+
+
+def _cache(name, timeout, max_entries):
+    if API_CACHE_BACKEND == "redis":
+        backend = {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+            "KEY_PREFIX": name,
+        }
+    elif API_CACHE_BACKEND == "file":
+        backend = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(BASE_DIR, ".cache", name),
+        }
+    else:
+        backend = {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": name,
+        }
+    backend.update({"TIMEOUT": timeout, "OPTIONS": {"MAX_ENTRIES": max_entries}})
+    return backend
+
+
+CACHES = {
+    "default": _cache("default", timeout=300, max_entries=10_000),
+    "api": _cache("api", timeout=int(os.environ.get("API_CACHE_TIMEOUT", 300)), max_entries=2_000),
+}
+
+
+# Full-text search backend for the catalog API (see api.search): "fts5",
+# "memory" or "auto" to use FTS5 whenever the SQLite search table exists.
+API_SEARCH_BACKEND = os.environ.get("API_SEARCH_BACKEND", "auto")
+
+
+# Worker threads computing recommendations for asynchronous assessment
+# submissions (see api.tasks).
+API_RECOMMENDATION_WORKERS = int(os.environ.get("API_RECOMMENDATION_WORKERS", 4))
+
+
+# Serve career and resource lists from values() rows encoded with orjson when
+# installed (see api.fastpath); set to 0 to use the model serializers.
+API_FAST_LIST = os.environ.get("API_FAST_LIST", "1") != "0"
+
+
+# Group-commit AssessmentResult inserts from a writer thread (see api.writes):
+# at most API_WRITE_QUEUE_BATCH rows per transaction, gathered for at most
+# API_WRITE_QUEUE_DELAY seconds. On with SQLITE_PRODUCTION_MODE.
+API_WRITE_QUEUE = os.environ.get("API_WRITE_QUEUE", "1" if SQLITE_PRODUCTION_MODE else "0") == "1"
+API_WRITE_QUEUE_BATCH = int(os.environ.get("API_WRITE_QUEUE_BATCH", 50))
+API_WRITE_QUEUE_DELAY = float(os.environ.get("API_WRITE_QUEUE_DELAY", 0.002))
+
+
+# Per-route latency, query and response size histograms (see api.metrics),
+# served at /metrics to staff users and to API_METRICS_IPS (empty by default:
+# behind a reverse proxy on the same host every request comes from loopback,
+# so only list addresses the proxy cannot forward from). Set API_METRICS=0
+# to turn the middleware off.
+API_METRICS = os.environ.get("API_METRICS", "1") != "0"
+API_METRICS_IPS = tuple(
+    ip.strip() for ip in os.environ.get("API_METRICS_IPS", "").split(",") if ip.strip()
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -116,6 +240,23 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Cached authentication (see api.authentication): the user a session or API
+# token resolves to is cached for API_AUTH_CACHE_TIMEOUT seconds and dropped
+# when the token is deleted or the user changes. Sessions are read through
+# the cache ("cached_db") when the cache is shared between processes, so a
+# logout is seen by every worker; with the in-process cache they stay in the
+# database. API_SESSION_ENGINE may also be "signed_cookies" or "db".
+
+AUTHENTICATION_BACKENDS = ["api.authentication.CachedModelBackend"]
+
+API_AUTH_CACHE_TIMEOUT = int(os.environ.get("API_AUTH_CACHE_TIMEOUT", 60))
+
+API_SESSION_ENGINE = os.environ.get(
+    "API_SESSION_ENGINE", "db" if API_CACHE_BACKEND == "locmem" else "cached_db"
+)
+SESSION_ENGINE = f"django.contrib.sessions.backends.{API_SESSION_ENGINE}"
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -203,7 +344,7 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
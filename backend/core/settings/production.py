@@ -8,6 +8,13 @@ DEBUG = False
 # See https://docs.djangoproject.com/en/5.2/ref/contrib/staticfiles/#manifeststaticfilesstorage
 STORAGES["staticfiles"]["BACKEND"] = "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
 
+# WAL journaling, busy timeout and the AssessmentResult write queue for
+# several gunicorn workers sharing db.sqlite3 (see base.py)
+SQLITE_PRODUCTION_MODE = os.environ.get("SQLITE_PRODUCTION_MODE", "1") == "1"
+if SQLITE_PRODUCTION_MODE and DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"]["OPTIONS"] = SQLITE_PRODUCTION_OPTIONS
+    API_WRITE_QUEUE = os.environ.get("API_WRITE_QUEUE", "1") == "1"
+
 try:
     from .local import *
 except ImportError: